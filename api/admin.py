@@ -6,5 +6,8 @@ admin.site.register(Actor)
 admin.site.register(Play)
 admin.site.register(TheatreHall)
 admin.site.register(Performance)
+admin.site.register(SeatInventory)
+admin.site.register(ScheduleSnapshot)
 admin.site.register(Reservation)
 admin.site.register(Ticket)
+admin.site.register(BookingRequest)
@@ -0,0 +1,219 @@
+"""
+Async (ASGI-native) list and retrieve for router routes.
+
+``async_read_urls`` replaces the list and detail routes of the given
+router prefixes with async views. GET list and retrieve requests are
+answered with the async ORM and a compiled ``ValuesSerializer``, so under
+ASGI they never leave the event loop. Every other request, and every GET
+the async path can not answer exactly like the viewset (browsable API,
+format suffixes, missing or invalid credentials, denied permissions),
+is handed to the unchanged sync viewset view. Throttles are checked
+once that is decided, so a request is only counted by one of them.
+
+Cache backends are called directly: the local memory and Redis
+clients answer well before a thread hop would.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from api.cache import CatalogCacheMixin, get_catalog_cache
+from user.authentication import StatelessJWTAuthentication
+
+READ_ACTIONS = ("list", "retrieve")
+
+
+async def aauthenticate(request, viewset_class):
+    """
+    The JWT authentication of the viewset with the async ORM,
+    (user, token) or None if the request is not authenticated
+    """
+    authentication = viewset_class.authentication_classes[0]()
+    if isinstance(authentication, StatelessJWTAuthentication):
+        # Never touches the database
+        try:
+            return authentication.authenticate(request)
+        except AuthenticationFailed:
+            return None
+    if not isinstance(authentication, JWTAuthentication):
+        return None
+
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except AuthenticationFailed:
+        return None
+    if jwt_settings.USER_ID_CLAIM not in token:
+        return None
+
+    user = await authentication.user_model.objects.filter(
+        **{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]}
+    ).afirst()
+    if user is None or not user.is_active:
+        return None
+    return user, token
+
+
+def _to_http_response(response):
+    """
+    Render a DRF response into a plain HttpResponse, Django would
+    render a response with a render() method in a thread
+    """
+    content = response.rendered_content
+    http_response = HttpResponse(content, status=response.status_code)
+    for header, value in response.items():
+        http_response[header] = value
+    return http_response
+
+
+async def _read_data(view, values_serializer):
+    queryset = view.filter_queryset(view.get_queryset())
+    rows = queryset.prefetch_related(None).values(*values_serializer.paths)
+
+    if view.action == "retrieve":
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            row = await rows.filter(
+                **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+            ).afirst()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if row is None:
+            # Same message as get_object_or_404
+            raise Http404(
+                f"No {queryset.model._meta.object_name} "
+                "matches the given query."
+            )
+        return (await values_serializer.aserialize([row]))[0]
+
+    paginator = view.paginator
+    if paginator is None:
+        return await values_serializer.aserialize(rows)
+
+    page = await paginator.apaginate_queryset(rows, view.request, view=view)
+    if page is None:
+        return await values_serializer.aserialize(rows)
+    return paginator.get_paginated_response(
+        await values_serializer.aserialize(page)
+    ).data
+
+
+async def read_response(sync_view, action, request, kwargs):
+    """
+    Response of a GET list or retrieve of the viewset,
+    None to leave the request to the sync view
+    """
+    authenticated = await aauthenticate(request, sync_view.cls)
+    if authenticated is None:
+        return None
+
+    drf_request = Request(request)
+    drf_request.user, drf_request.auth = authenticated
+
+    view = sync_view.cls(**sync_view.initkwargs)
+    view.action_map = sync_view.actions
+    view.action = action
+    view.request = drf_request
+    view.args = ()
+    view.kwargs = kwargs
+    view.format_kwarg = None
+    view.headers = view.default_response_headers
+
+    try:
+        renderer, media_type = view.perform_content_negotiation(drf_request)
+        view.check_permissions(drf_request)
+    except APIException:
+        return None
+    if not isinstance(renderer, JSONRenderer):
+        return None
+    drf_request.accepted_renderer = renderer
+    drf_request.accepted_media_type = media_type
+
+    get_values_serializer = getattr(view, "get_values_serializer", None)
+    values_serializer = get_values_serializer and get_values_serializer()
+    if values_serializer is None:
+        return None
+
+    # Last, so a request left to the sync view is only counted there
+    try:
+        view.check_throttles(drf_request)
+    except APIException as exc:
+        response = view.handle_exception(exc)
+        return _to_http_response(view.finalize_response(drf_request, response))
+
+    cache = cache_key = data = None
+    if isinstance(view, CatalogCacheMixin):
+        cache = get_catalog_cache()
+        cache_key = view.get_cache_key(drf_request)
+        data = cache.get(cache_key)
+
+    if data is None:
+        try:
+            data = await _read_data(view, values_serializer)
+        except (APIException, Http404) as exc:
+            response = view.handle_exception(exc)
+            return _to_http_response(
+                view.finalize_response(drf_request, response)
+            )
+        if cache is not None:
+            cache.set(cache_key, data)
+
+    response = view.finalize_response(drf_request, Response(data))
+    return _to_http_response(response)
+
+
+def async_read_view(sync_view):
+    """Async view in front of a viewset view made by a router"""
+    action = sync_view.actions.get("get")
+    run_sync = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        response = None
+        if (
+            request.method == "GET"
+            and action in READ_ACTIONS
+            and not kwargs.get("format")
+        ):
+            response = await read_response(sync_view, action, request, kwargs)
+        if response is None:
+            response = await run_sync(request, *args, **kwargs)
+        return response
+
+    view.cls = sync_view.cls
+    view.initkwargs = sync_view.initkwargs
+    view.actions = sync_view.actions
+    view.csrf_exempt = True
+    return view
+
+
+def async_read_urls(router, prefixes):
+    """Async list and detail routes of the given router prefixes"""
+    names = {
+        f"{basename}-{route}"
+        for prefix, viewset, basename in router.registry
+        if prefix in prefixes
+        for route in ("list", "detail")
+    }
+    return [
+        URLPattern(
+            url.pattern,
+            async_read_view(url.callback),
+            url.default_args,
+            url.name,
+        )
+        for url in router.urls
+        if url.name in names
+    ]
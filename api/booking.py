@@ -0,0 +1,301 @@
+"""
+Ticket booking.
+
+Every reservation checks its seats with one query and inserts its
+tickets with one INSERT, the ``Ticket`` unique together constraint
+being the last line of defence. ``BOOKING["STRATEGY"]`` picks how
+concurrent reservations of the same performance are serialized:
+
+* ``fail_fast``: no lock, a reservation losing a seat between the check
+  and the INSERT gets the lost seats back in the 400 payload.
+* ``lock``: ``SELECT ... FOR UPDATE`` on the seat inventory rows of the
+  performances, in id order. With ``SKIP_LOCKED`` a performance being
+  booked by another request answers 409 at once instead of waiting.
+* ``optimistic``: the inventory ``version`` read with the seat check is
+  compared and bumped in one UPDATE, a changed version means another
+  sale, the seats are checked again up to ``RETRIES`` times.
+"""
+import random
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+
+from api.holds import get_hold_store
+from api.inventory import (
+    ensure_inventory,
+    record_sold_tickets,
+    seats_changed,
+)
+from api.models import SeatInventory, Ticket
+
+DEFAULTS = {
+    "STRATEGY": "fail_fast",
+    "SKIP_LOCKED": False,
+    "RETRIES": 3,
+    # Seconds, doubled on every retry and jittered
+    "BACKOFF": 0.005,
+    # Accept reservations into a queue, see api.booking_queue
+    "QUEUED": False,
+    "QUEUE_BATCH_SIZE": 100,
+    # Seconds a client should wait before polling a pending request
+    "POLL_INTERVAL": 1,
+}
+
+SEAT_TAKEN_MESSAGE = UniqueTogetherValidator.message.format(
+    field_names=", ".join(Ticket._meta.unique_together[0])
+)
+SEAT_HELD_MESSAGE = "This seat is held by another customer."
+
+
+def get_setting(name):
+    return getattr(settings, "BOOKING", {}).get(name, DEFAULTS[name])
+
+
+class PerformanceBusy(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        "Seats of this performance are being booked, try again."
+    )
+    default_code = "performance_busy"
+
+
+def seat_key(ticket_data):
+    return (
+        ticket_data["performance"].id,
+        ticket_data["row"],
+        ticket_data["seat"],
+    )
+
+
+def validate_seats(tickets_data):
+    """Validate every requested seat against its performance hall"""
+    seats_by_performance = defaultdict(list)
+    for ticket_data in tickets_data:
+        seats_by_performance[ticket_data["performance"]].append(ticket_data)
+
+    for performance, performance_tickets in seats_by_performance.items():
+        theatre_hall = performance.theatre_hall
+        for ticket_data in performance_tickets:
+            Ticket.validate_ticket(
+                ticket_data["row"],
+                ticket_data["seat"],
+                theatre_hall,
+                ValidationError,
+            )
+
+
+def find_taken_seats(tickets_data):
+    """Return requested seats that are already sold, in a single query"""
+    requested = {seat_key(ticket_data) for ticket_data in tickets_data}
+    if not requested:
+        return set()
+
+    candidates = Ticket.objects.filter(
+        performance_id__in={key[0] for key in requested},
+        row__in={key[1] for key in requested},
+        seat__in={key[2] for key in requested},
+    ).values_list("performance_id", "row", "seat")
+
+    return requested.intersection(candidates)
+
+
+def find_held_seats(tickets_data, hold_id=None):
+    """Return requested seats locked by a seat hold other than hold_id"""
+    seats_by_performance = defaultdict(list)
+    for performance_id, row, seat in {
+        seat_key(ticket_data) for ticket_data in tickets_data
+    }:
+        seats_by_performance[performance_id].append((row, seat))
+
+    store = get_hold_store()
+    return {
+        (performance_id, *seat)
+        for performance_id, seats in seats_by_performance.items()
+        for seat, holder in store.holders(performance_id, seats).items()
+        if holder != hold_id
+    }
+
+
+def seats_taken_error(tickets_data, taken_seats, held_seats=()):
+    """
+    Build the same per-ticket payload the serializer unique together
+    validator produces, also flagging seats repeated within the request
+    and seats held by someone else
+    """
+    errors = []
+    seen = set()
+    for ticket_data in tickets_data:
+        key = seat_key(ticket_data)
+        if key in taken_seats or key in seen:
+            errors.append(
+                {api_settings.NON_FIELD_ERRORS_KEY: [SEAT_TAKEN_MESSAGE]}
+            )
+        elif key in held_seats:
+            errors.append(
+                {api_settings.NON_FIELD_ERRORS_KEY: [SEAT_HELD_MESSAGE]}
+            )
+        else:
+            errors.append({})
+        seen.add(key)
+
+    if not any(errors):
+        return None
+    return ValidationError({"tickets": errors}, code="unique")
+
+
+def check_seats(tickets_data, hold_id=None):
+    """Raise the per-ticket error payload if a seat is sold or held"""
+    error = seats_taken_error(
+        tickets_data,
+        find_taken_seats(tickets_data),
+        find_held_seats(tickets_data, hold_id),
+    )
+    if error:
+        raise error
+
+
+def recheck_holds(tickets_data, hold_id=None):
+    """
+    Raise if a seat was held after check_seats. Every strategy has locked
+    or updated the seat inventory rows by now, and a new hold checks the
+    sold seats under the same lock after acquiring them, so it either
+    shows up here or waits for this booking and finds its seats sold.
+    """
+    held_seats = find_held_seats(tickets_data, hold_id)
+    if held_seats:
+        raise seats_taken_error(tickets_data, set(), held_seats)
+
+
+def insert_tickets(reservation, tickets_data):
+    tickets = [
+        Ticket(reservation=reservation, **ticket_data)
+        for ticket_data in tickets_data
+    ]
+    try:
+        with transaction.atomic():
+            return Ticket.objects.bulk_create(tickets)
+    except IntegrityError:
+        # Another reservation sold one of the seats after our check.
+        raise seats_taken_error(
+            tickets_data, find_taken_seats(tickets_data)
+        ) or ValidationError({"tickets": [SEAT_TAKEN_MESSAGE]})
+
+
+def sold_per_performance(tickets_data):
+    return Counter(seat_key(ticket_data)[0] for ticket_data in tickets_data)
+
+
+def book_fail_fast(reservation, tickets_data, hold_id=None):
+    check_seats(tickets_data, hold_id)
+    tickets = insert_tickets(reservation, tickets_data)
+    record_sold_tickets(tickets)
+    return tickets
+
+
+def _lock_inventory(performance_ids):
+    # Always lock in the same order so two reservations never deadlock
+    return list(
+        SeatInventory.objects.select_for_update(
+            skip_locked=get_setting("SKIP_LOCKED")
+        )
+        .filter(performance_id__in=performance_ids)
+        .order_by("performance_id")
+        .values_list("performance_id", flat=True)
+    )
+
+
+def book_with_lock(reservation, tickets_data, hold_id=None):
+    performance_ids = sorted(sold_per_performance(tickets_data))
+    locked = _lock_inventory(performance_ids)
+    if len(locked) < len(performance_ids):
+        # Bulk created performances have no counter yet
+        ensure_inventory(set(performance_ids) - set(locked))
+        locked = _lock_inventory(performance_ids)
+    if len(locked) < len(performance_ids):
+        raise PerformanceBusy()
+    return book_fail_fast(reservation, tickets_data, hold_id)
+
+
+class _VersionChanged(Exception):
+    pass
+
+
+def _claim(performance_id, count, version):
+    return SeatInventory.objects.filter(
+        performance_id=performance_id, version=version
+    ).update(
+        tickets_sold=F("tickets_sold") + count, version=F("version") + 1
+    )
+
+
+def _claim_versions(sold, versions):
+    """Count the sale if no other one happened since versions were read"""
+    if len(sold) == 1:
+        # A single UPDATE needs no savepoint
+        ((performance_id, count),) = sold.items()
+        return bool(_claim(performance_id, count, versions[performance_id]))
+
+    try:
+        with transaction.atomic():
+            for performance_id, count in sold.items():
+                if not _claim(performance_id, count, versions[performance_id]):
+                    raise _VersionChanged()
+    except _VersionChanged:
+        return False
+    return True
+
+
+def _read_versions(performance_ids):
+    return dict(
+        SeatInventory.objects.filter(
+            performance_id__in=performance_ids
+        ).values_list("performance_id", "version")
+    )
+
+
+def book_optimistic(reservation, tickets_data, hold_id=None):
+    sold = sold_per_performance(tickets_data)
+    backoff = get_setting("BACKOFF")
+    for attempt in range(get_setting("RETRIES") + 1):
+        if attempt:
+            time.sleep(random.uniform(0, backoff * 2**attempt))
+        versions = _read_versions(sold)
+        if len(versions) < len(sold):
+            ensure_inventory(set(sold) - set(versions))
+            versions = _read_versions(sold)
+        check_seats(tickets_data, hold_id)
+        if _claim_versions(sold, versions):
+            tickets = insert_tickets(reservation, tickets_data)
+            seats_changed.send(sender=SeatInventory, changes=dict(sold))
+            return tickets
+    raise PerformanceBusy()
+
+
+STRATEGIES = {
+    "fail_fast": book_fail_fast,
+    "lock": book_with_lock,
+    "optimistic": book_optimistic,
+}
+
+
+def book_tickets(reservation, tickets_data, hold_id=None, strategy=None):
+    """
+    Create all tickets of a reservation and count them in the seat
+    inventory with the given or configured strategy.
+    Seats locked by a seat hold are only bookable with that hold_id.
+    Must be called inside a transaction.
+    """
+    validate_seats(tickets_data)
+    book = STRATEGIES[strategy or get_setting("STRATEGY")]
+    tickets = book(reservation, tickets_data, hold_id)
+    recheck_holds(tickets_data, hold_id)
+    if hold_id:
+        transaction.on_commit(lambda: get_hold_store().release(hold_id))
+    return tickets
@@ -0,0 +1,215 @@
+"""
+Queued booking for on-sale spikes.
+
+With ``BOOKING["QUEUED"]`` a valid reservation request is stored as a
+pending ``BookingRequest`` and answered at once with 202 and its status
+URL, instead of fighting for the seats of its performance during the
+request. Clients poll the status URL, pending requests are answered
+with ``Retry-After: BOOKING["POLL_INTERVAL"]``, no request waits on the
+server. ``drain`` books the pending requests performance by
+performance: a batch of one performance is one transaction with a
+single seat check and one INSERT of all its tickets. Requests losing a
+seat to an earlier one in the queue are rejected, the others confirmed.
+
+``manage.py drain_bookings --workers N`` runs N workers, each owning the
+performances whose id modulo N is its number. A request belongs to the
+performance of its first ticket, so a request spanning several
+performances competes for the seats of the others with the workers
+owning them, and with reservations made outside the queue. A seat lost
+that way fails the batch INSERT on the unique constraint, the batch then
+books its requests one by one.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Min
+from django.db.models.functions import Mod
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from api.booking import (
+    book_tickets,
+    find_held_seats,
+    find_taken_seats,
+    get_setting,
+    seat_key,
+    seats_taken_error,
+    validate_seats,
+)
+from api.holds import get_hold_store
+from api.inventory import record_sold_tickets
+from api.models import BookingRequest, Performance, Reservation, Ticket
+
+FINISHED_FIELDS = ("status", "reservation", "errors", "processed_at")
+
+
+def enqueue(user_id, validated_data):
+    """Store a validated reservation as a pending booking request"""
+    tickets_data = validated_data["tickets"]
+    validate_seats(tickets_data)
+    return BookingRequest.objects.create(
+        user_id=user_id,
+        performance=tickets_data[0]["performance"],
+        tickets=[
+            {
+                "performance": ticket_data["performance"].id,
+                "row": ticket_data["row"],
+                "seat": ticket_data["seat"],
+            }
+            for ticket_data in tickets_data
+        ],
+        hold=validated_data.get("hold", ""),
+    )
+
+
+def pending(worker=0, workers=1):
+    booking_requests = BookingRequest.objects.filter(
+        status=BookingRequest.Status.PENDING
+    )
+    if workers > 1:
+        booking_requests = booking_requests.alias(
+            shard=Mod("performance_id", workers)
+        ).filter(shard=worker)
+    return booking_requests
+
+
+def _reject(booking_request, errors):
+    booking_request.status = BookingRequest.Status.REJECTED
+    booking_request.reservation = None
+    booking_request.errors = errors
+
+
+def _confirm(booking_request, reservation):
+    booking_request.status = BookingRequest.Status.CONFIRMED
+    booking_request.reservation = reservation
+    booking_request.errors = None
+    if booking_request.hold:
+        transaction.on_commit(
+            lambda: get_hold_store().release(booking_request.hold)
+        )
+
+
+class _HeldAfterCheck(Exception):
+    pass
+
+
+def _book_together(accepted):
+    """
+    Book the requests with one conflict check and one INSERT each for
+    reservations and tickets, earlier requests winning shared seats
+    """
+    sold = find_taken_seats(
+        [ticket for _, tickets_data in accepted for ticket in tickets_data]
+    )
+    confirmed = []
+    for booking_request, tickets_data in accepted:
+        error = seats_taken_error(
+            tickets_data,
+            sold,
+            find_held_seats(tickets_data, booking_request.hold or None),
+        )
+        if error:
+            _reject(booking_request, error.detail)
+            continue
+        sold.update(seat_key(ticket_data) for ticket_data in tickets_data)
+        confirmed.append((booking_request, tickets_data))
+
+    reservations = Reservation.objects.bulk_create(
+        Reservation(user_id=booking_request.user_id)
+        for booking_request, _ in confirmed
+    )
+    tickets = Ticket.objects.bulk_create(
+        Ticket(reservation=reservation, **ticket_data)
+        for reservation, (_, tickets_data) in zip(reservations, confirmed)
+        for ticket_data in tickets_data
+    )
+    record_sold_tickets(tickets)
+    for booking_request, tickets_data in confirmed:
+        if find_held_seats(tickets_data, booking_request.hold or None):
+            # Held after the check, see api.booking.recheck_holds
+            raise _HeldAfterCheck()
+    for reservation, (booking_request, _) in zip(reservations, confirmed):
+        _confirm(booking_request, reservation)
+
+
+def _book_one(booking_request, tickets_data):
+    try:
+        with transaction.atomic():
+            reservation = Reservation.objects.create(
+                user_id=booking_request.user_id
+            )
+            # Lost seats fail the INSERT, the queue needs no lock
+            book_tickets(
+                reservation,
+                tickets_data,
+                hold_id=booking_request.hold or None,
+                strategy="fail_fast",
+            )
+    except ValidationError as error:
+        _reject(booking_request, error.detail)
+    else:
+        _confirm(booking_request, reservation)
+
+
+def book_batch(booking_requests):
+    """Book requests of one performance in the current transaction"""
+    performances = Performance.objects.select_related(
+        "theatre_hall"
+    ).in_bulk(
+        {
+            ticket["performance"]
+            for booking_request in booking_requests
+            for ticket in booking_request.tickets
+        }
+    )
+    processed_at = timezone.now()
+    accepted = []
+    for booking_request in booking_requests:
+        booking_request.processed_at = processed_at
+        try:
+            tickets_data = [
+                {**ticket, "performance": performances[ticket["performance"]]}
+                for ticket in booking_request.tickets
+            ]
+        except KeyError:
+            _reject(
+                booking_request, {"tickets": ["Performance does not exist."]}
+            )
+        else:
+            accepted.append((booking_request, tickets_data))
+
+    try:
+        with transaction.atomic():
+            _book_together(accepted)
+    except (IntegrityError, _HeldAfterCheck):
+        # A seat was sold or held outside the queue after the check,
+        # fall back to one savepoint per request to find out whose
+        for booking_request, tickets_data in accepted:
+            _book_one(booking_request, tickets_data)
+    BookingRequest.objects.bulk_update(booking_requests, FINISHED_FIELDS)
+
+
+def drain(batch_size=None, worker=0, workers=1):
+    """
+    Book up to batch_size pending requests of every performance owned
+    by the worker, oldest first, and return how many were processed
+    """
+    batch_size = batch_size or get_setting("QUEUE_BATCH_SIZE")
+    performance_ids = [
+        performance_id
+        for performance_id, _ in pending(worker, workers)
+        .values_list("performance_id")
+        .annotate(first=Min("id"))
+        .order_by("first")
+    ]
+
+    processed = 0
+    for performance_id in performance_ids:
+        with transaction.atomic():
+            # Skip requests a second drain of the same worker is booking
+            batch = list(
+                pending()
+                .select_for_update(skip_locked=True)
+                .filter(performance_id=performance_id)[:batch_size]
+            )
+            book_batch(batch)
+        processed += len(batch)
+    return processed
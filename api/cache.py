@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_CACHE_ALIAS = "catalog"
+
+
+def get_catalog_cache():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+def _version_key(model):
+    return f"catalog:version:{model._meta.label_lower}"
+
+
+def get_versions(models):
+    """
+    Current cache version of every model. A missing version (never set
+    or evicted) starts from a fresh timestamp so old entries never match.
+    """
+    cache = get_catalog_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    cache = get_catalog_cache()
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(model):
+    """Drop cached responses of the model now and again on commit"""
+    bump_version(model)
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate(sender)
+
+
+def _invalidate_on_m2m_change(sender, instance, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate(type(instance))
+        invalidate(kwargs["model"])
+
+
+def connect_invalidation(*models):
+    """Invalidate cached responses whenever one of the models changes"""
+    for model in models:
+        uid = f"catalog-cache-{model._meta.label_lower}"
+        post_save.connect(
+            _invalidate_on_change, sender=model, dispatch_uid=uid
+        )
+        post_delete.connect(
+            _invalidate_on_change, sender=model, dispatch_uid=uid
+        )
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(
+                _invalidate_on_m2m_change,
+                sender=field.remote_field.through,
+                dispatch_uid=f"{uid}-{field.name}",
+            )
+
+
+class CatalogCacheMixin:
+    """
+    Serve list and retrieve responses from the catalog cache.
+    Cached data is keyed by path, query params, serializer and the
+    versions of the models the response is built from.
+    """
+
+    cache_dependencies = ()
+
+    def get_cache_dependencies(self):
+        return (self.queryset.model, *self.cache_dependencies)
+
+    def get_cache_key(self, request):
+        serializer_class = self.get_serializer_class()
+        versions = get_versions(self.get_cache_dependencies())
+        query = sorted(request.query_params.lists())
+        digest = hashlib.md5(
+            f"{request.path}?{query}".encode(), usedforsecurity=False
+        ).hexdigest()
+
+        return (
+            f"catalog:response:{serializer_class.__module__}."
+            f"{serializer_class.__qualname__}:"
+            f"{'.'.join(map(str, versions))}:{digest}"
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_catalog_cache()
+        key = self.get_cache_key(request)
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
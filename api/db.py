@@ -0,0 +1,48 @@
+"""Database connection and pool state, for health checks"""
+import logging
+
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+def get_pool(connection):
+    """psycopg 3 pool of the connection, None if it does not use one"""
+    # Only the postgresql backend has a pool attribute
+    return getattr(connection, "pool", None)
+
+
+def pool_stats(connection):
+    pool = get_pool(connection)
+    if pool is None:
+        return None
+
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    in_use = size - stats.get("pool_available", 0)
+    return {
+        "min_size": pool.min_size,
+        "max_size": pool.max_size,
+        "size": size,
+        "in_use": in_use,
+        "waiting": stats.get("requests_waiting", 0),
+        # Share of the maximum pool size handed out to requests
+        "saturation": round(in_use / pool.max_size, 3),
+    }
+
+
+def database_health(alias):
+    connection = connections[alias]
+    health = {"vendor": connection.vendor, "available": True}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError:
+        # The error may name hosts and drivers, it is only logged
+        logger.exception("Database %s is unavailable", alias)
+        health["available"] = False
+
+    pool = pool_stats(connection)
+    if pool is not None:
+        health["pool"] = pool
+    return health
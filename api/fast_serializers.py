@@ -0,0 +1,298 @@
+"""
+Read-only serialization straight from ``QuerySet.values()`` rows.
+
+A ``ValuesSerializer`` is compiled once from the field declarations of an
+existing ``ModelSerializer`` and then builds the same data as that
+serializer, without instantiating models. Nested many relations are
+loaded with one ``.values()`` query each, like ``prefetch_related``.
+Serializers with fields it can not express (properties, method fields,
+dotted sources) are not compiled and keep the regular DRF path.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    RelatedField,
+    SlugRelatedField,
+)
+from rest_framework.response import Response
+
+OWNER = "_values_owner"
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class ValuesSerializer:
+    def __init__(self, serializer, model=None):
+        self.model = model or serializer.Meta.model
+        self.paths = []
+        self.relations = []
+        self.builders = self._compile_fields(serializer, self.model, "")
+        if self.relations:
+            self.pk_path = self._add_path(self.model._meta.pk.attname)
+
+    def _add_path(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+        return path
+
+    def _compile_fields(self, serializer, model, prefix):
+        return [
+            (name, self._compile_field(field, model, prefix))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+    def _compile_field(self, field, model, prefix):
+        source = field.source
+        if "." in source or source == "*":
+            raise UnsupportedField(field.field_name)
+
+        if isinstance(field, serializers.ListSerializer):
+            return self._compile_children(field, model, prefix)
+        if isinstance(field, ManyRelatedField):
+            return self._compile_many_related(field, model, prefix)
+        if isinstance(field, serializers.ModelSerializer):
+            return self._compile_nested(field, model, prefix)
+        if isinstance(field, SlugRelatedField):
+            related_model = self._get_model_field(model, source).related_model
+            self._get_concrete_field(related_model, field.slug_field)
+            return self._column(f"{prefix}{source}__{field.slug_field}")
+        if isinstance(field, PrimaryKeyRelatedField):
+            self._get_model_field(model, source)
+            return self._column(f"{prefix}{source}")
+        if isinstance(
+            field,
+            (RelatedField, serializers.BaseSerializer,
+             serializers.SerializerMethodField),
+        ):
+            raise UnsupportedField(field.field_name)
+
+        try:
+            self._get_concrete_field(model, source)
+        except UnsupportedField:
+            # Only annotations of the listed queryset itself are allowed
+            if prefix or hasattr(model, source):
+                raise
+        return self._column(f"{prefix}{source}", field.to_representation)
+
+    @staticmethod
+    def _get_model_field(model, name):
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise UnsupportedField(name)
+
+    def _get_concrete_field(self, model, name):
+        model_field = self._get_model_field(model, name)
+        if not model_field.concrete or model_field.is_relation:
+            raise UnsupportedField(name)
+        return model_field
+
+    def _slug_getter(self, model, slug_field):
+        """Columns to load and how to get the slug from a row of them"""
+        try:
+            attname = self._get_concrete_field(model, slug_field).attname
+        except UnsupportedField:
+            # A property computed from the row, ex. Actor.full_name
+            slug = getattr(model, slug_field, None)
+            if not isinstance(slug, property):
+                raise
+            columns = [
+                model_field.attname
+                for model_field in model._meta.concrete_fields
+            ]
+            return columns, lambda row: slug.fget(SimpleNamespace(**row))
+
+        return [attname], itemgetter(attname)
+
+    def _column(self, path, to_representation=None):
+        self._add_path(path)
+
+        def build(row, related):
+            value = row[path]
+            if value is None or to_representation is None:
+                return value
+            return to_representation(value)
+
+        return build
+
+    def _compile_nested(self, field, model, prefix):
+        model_field = self._get_model_field(model, field.source)
+        if not (model_field.many_to_one or model_field.one_to_one):
+            raise UnsupportedField(field.field_name)
+
+        builders = self._compile_fields(
+            field,
+            model_field.related_model,
+            f"{prefix}{field.source}__",
+        )
+        pk_path = self._add_path(f"{prefix}{field.source}")
+
+        def build(row, related):
+            if row[pk_path] is None:
+                return None
+            return {name: builder(row, related) for name, builder in builders}
+
+        return build
+
+    def _add_relation(self, query, child=None, to_representation=None):
+        """
+        ``query(ids)`` loads the related rows of the listed objects,
+        each built by the ``child`` serializer or ``to_representation``
+        """
+        index = len(self.relations)
+        self.relations.append((query, child, to_representation))
+
+        def build(row, related):
+            return related[index].get(row[self.pk_path], [])
+
+        return build
+
+    def _compile_children(self, field, model, prefix):
+        """Reverse foreign key, ex. Reservation.tickets"""
+        relation = self._get_model_field(model, field.source)
+        if prefix or not relation.one_to_many:
+            raise UnsupportedField(field.field_name)
+
+        child = ValuesSerializer(field.child, relation.related_model)
+        foreign_key = relation.field
+
+        def query(ids):
+            return relation.related_model._default_manager.filter(
+                **{f"{foreign_key.name}__in": ids}
+            ).values(*child.paths, **{OWNER: F(foreign_key.attname)})
+
+        return self._add_relation(query, child=child)
+
+    def _compile_many_related(self, field, model, prefix):
+        """Forward many to many, ex. Play.actors"""
+        relation = self._get_model_field(model, field.source)
+        if prefix or not relation.many_to_many or relation.auto_created:
+            raise UnsupportedField(field.field_name)
+
+        child = field.child_relation
+        related_model = relation.related_model
+        query_name = relation.related_query_name()
+
+        if isinstance(child, SlugRelatedField):
+            slug_field = child.slug_field
+        elif isinstance(child, PrimaryKeyRelatedField):
+            slug_field = related_model._meta.pk.name
+        else:
+            raise UnsupportedField(field.field_name)
+        columns, to_representation = self._slug_getter(
+            related_model, slug_field
+        )
+
+        def query(ids):
+            return related_model._default_manager.filter(
+                **{f"{query_name}__in": ids}
+            ).values(*columns, **{OWNER: F(query_name)})
+
+        return self._add_relation(query, to_representation=to_representation)
+
+    @staticmethod
+    def _group(rows, items):
+        grouped = defaultdict(list)
+        for row, item in zip(rows, items):
+            grouped[row[OWNER]].append(item)
+        return grouped
+
+    def _build(self, rows, related):
+        return [
+            {name: builder(row, related) for name, builder in self.builders}
+            for row in rows
+        ]
+
+    def serialize(self, rows):
+        """Build the serializer data for ``.values(*self.paths)`` rows"""
+        rows = list(rows)
+        related = []
+        ids = [row[self.pk_path] for row in rows] if self.relations else []
+        for query, child, to_representation in self.relations:
+            if not ids:
+                related.append({})
+                continue
+            related_rows = list(query(ids))
+            items = (
+                child.serialize(related_rows)
+                if child
+                else map(to_representation, related_rows)
+            )
+            related.append(self._group(related_rows, items))
+
+        return self._build(rows, related)
+
+    async def aserialize(self, rows):
+        """
+        ``serialize`` for async views, ``rows`` may be a values()
+        queryset, related rows are loaded with the async ORM
+        """
+        if hasattr(rows, "__aiter__"):
+            rows = [row async for row in rows]
+        rows = list(rows)
+        related = []
+        ids = [row[self.pk_path] for row in rows] if self.relations else []
+        for query, child, to_representation in self.relations:
+            if not ids:
+                related.append({})
+                continue
+            related_rows = [row async for row in query(ids)]
+            items = (
+                await child.aserialize(related_rows)
+                if child
+                else map(to_representation, related_rows)
+            )
+            related.append(self._group(related_rows, items))
+
+        return self._build(rows, related)
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    """Compiled serializer for the class, None if it can not be compiled"""
+    try:
+        return ValuesSerializer(serializer_class())
+    except UnsupportedField:
+        return None
+
+
+class FastListMixin:
+    """
+    List through a compiled ValuesSerializer when
+    the API_FAST_SERIALIZERS setting is on
+    """
+
+    def get_values_serializer(self):
+        if not getattr(settings, "API_FAST_SERIALIZERS", False):
+            return None
+        return get_values_serializer(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.prefetch_related(None).values(
+            *values_serializer.paths
+        )
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                values_serializer.serialize(page)
+            )
+
+        return Response(values_serializer.serialize(rows))
@@ -0,0 +1,214 @@
+"""
+Short-lived seat holds.
+
+A hold locks a set of seats of one performance for a user for
+``SEAT_HOLDS["TTL"]`` seconds, so the reservation confirming it can not
+lose those seats to another request. Two lock tables are available:
+
+* ``MemoryHoldStore`` keeps holds in the process, a background sweeper
+  thread reaps expired ones. Only correct with a single worker process.
+* ``CacheHoldStore`` keeps holds in a Django cache. With a Redis cache
+  every worker shares it and expired holds are reaped by the key TTL.
+  The cache must never evict keys before they expire, an evicted hold
+  silently frees its seats: use the dedicated "state" alias on a Redis
+  with ``maxmemory-policy noeviction``, never an LRU or culling cache.
+
+A new hold is acquired in the store before the sold seats are checked,
+under the seat inventory row locks every booking takes or updates
+before re-checking holds (see ``api.booking.book_tickets``). A booking
+and a hold of the same seat therefore never both succeed.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    "STORE": "api.holds.MemoryHoldStore",
+    "CACHE_ALIAS": "state",
+    "TTL": 300,
+    "SWEEP_INTERVAL": 30,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "SEAT_HOLDS", {}).get(name, DEFAULTS[name])
+
+
+def new_hold(user_id, performance_id, seats, ttl=None):
+    ttl = ttl or get_setting("TTL")
+    return {
+        "id": uuid.uuid4().hex,
+        "user": user_id,
+        "performance": performance_id,
+        "seats": sorted(tuple(seat) for seat in seats),
+        "expires_at": time.time() + ttl,
+    }
+
+
+class MemoryHoldStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds = {}
+        self._seats = {}
+
+    def _is_live(self, hold_id, now):
+        hold = self._holds.get(hold_id)
+        return hold is not None and hold["expires_at"] > now
+
+    def acquire(self, hold):
+        """Lock all seats of the hold or none, return conflicting seats"""
+        performance_id = hold["performance"]
+        now = time.time()
+        with self._lock:
+            conflicts = [
+                seat
+                for seat in hold["seats"]
+                if self._is_live(
+                    self._seats.get((performance_id, *seat)), now
+                )
+            ]
+            if not conflicts:
+                self._holds[hold["id"]] = hold
+                for seat in hold["seats"]:
+                    self._seats[(performance_id, *seat)] = hold["id"]
+        return conflicts
+
+    def get(self, hold_id):
+        with self._lock:
+            if self._is_live(hold_id, time.time()):
+                return self._holds[hold_id]
+        return None
+
+    def holders(self, performance_id, seats):
+        """{seat: hold id} of the live holds on the given seats"""
+        now = time.time()
+        with self._lock:
+            return {
+                seat: self._seats[(performance_id, *seat)]
+                for seat in seats
+                if self._is_live(
+                    self._seats.get((performance_id, *seat)), now
+                )
+            }
+
+    def _release(self, hold_id):
+        hold = self._holds.pop(hold_id, None)
+        if hold is None:
+            return
+        for seat in hold["seats"]:
+            key = (hold["performance"], *seat)
+            if self._seats.get(key) == hold_id:
+                del self._seats[key]
+
+    def release(self, hold_id):
+        with self._lock:
+            self._release(hold_id)
+
+    def sweep(self):
+        """Drop expired holds, return how many were reaped"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                hold_id
+                for hold_id, hold in self._holds.items()
+                if hold["expires_at"] <= now
+            ]
+            for hold_id in expired:
+                self._release(hold_id)
+        return len(expired)
+
+
+class CacheHoldStore:
+    def __init__(self):
+        self.cache = caches[get_setting("CACHE_ALIAS")]
+
+    @staticmethod
+    def _hold_key(hold_id):
+        return f"seat-hold:{hold_id}"
+
+    @staticmethod
+    def _seat_key(performance_id, seat):
+        row, seat = seat
+        return f"seat-hold:{performance_id}:{row}:{seat}"
+
+    def acquire(self, hold):
+        ttl = max(int(hold["expires_at"] - time.time()), 1)
+        acquired = []
+        conflicts = []
+        for seat in hold["seats"]:
+            key = self._seat_key(hold["performance"], seat)
+            if self.cache.add(key, hold["id"], ttl):
+                acquired.append(key)
+            else:
+                conflicts.append(seat)
+
+        if conflicts:
+            self.cache.delete_many(acquired)
+        else:
+            self.cache.set(self._hold_key(hold["id"]), hold, ttl)
+        return conflicts
+
+    def get(self, hold_id):
+        hold = self.cache.get(self._hold_key(hold_id))
+        if hold is None or hold["expires_at"] <= time.time():
+            return None
+        return hold
+
+    def holders(self, performance_id, seats):
+        keys = {self._seat_key(performance_id, seat): seat for seat in seats}
+        return {
+            keys[key]: hold_id
+            for key, hold_id in self.cache.get_many(keys).items()
+        }
+
+    def release(self, hold_id):
+        hold = self.cache.get(self._hold_key(hold_id))
+        if hold is None:
+            return
+        keys = [
+            self._seat_key(hold["performance"], seat)
+            for seat in hold["seats"]
+        ]
+        owned = [
+            key
+            for key, owner in self.cache.get_many(keys).items()
+            if owner == hold_id
+        ]
+        self.cache.delete_many([*owned, self._hold_key(hold_id)])
+
+    def sweep(self):
+        # Keys expire on their own
+        return 0
+
+
+class HoldSweeper(threading.Thread):
+    """Daemon thread reaping expired holds of a store"""
+
+    def __init__(self, store, interval):
+        super().__init__(name="seat-hold-sweeper", daemon=True)
+        self.store = store
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.store.sweep()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_hold_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = import_string(get_setting("STORE"))()
+            interval = get_setting("SWEEP_INTERVAL")
+            if interval and isinstance(_store, MemoryHoldStore):
+                HoldSweeper(_store, interval).start()
+        return _store
@@ -0,0 +1,323 @@
+"""
+Bulk catalog import.
+
+A season file has one performance per record, as JSON lines or CSV::
+
+    {"play": "Hamlet", "description": "...", "genres": ["Drama"],
+     "actors": ["Anna Orsted"], "theatre_hall": "Blue", "rows": 20,
+     "seats_in_row": 20, "show_time": "2024-09-24T19:00"}
+
+In CSV files ``genres`` and ``actors`` are ``|`` separated. Genres,
+actors, plays and halls are matched by name (actors by first and last
+name), performances by play, hall and show time. Records are imported
+in batches, each with a handful of ``IN`` lookups and ``bulk_create``
+calls in one transaction, so running a file twice creates nothing new.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.cache import invalidate
+from api.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    SeatInventory,
+    TheatreHall,
+)
+from api.schedule import mark_performances_stale
+
+LIST_SEPARATOR = "|"
+
+
+class CatalogImportError(ValueError):
+    """A record of the season file can not be imported"""
+
+    def __init__(self, line, message):
+        super().__init__(f"Record {line}: {message}")
+
+
+def _split(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in (value or "").split(LIST_SEPARATOR)]
+
+
+def _actor_key(actor):
+    if isinstance(actor, dict):
+        return actor["first_name"], actor["last_name"]
+    first_name, _, last_name = actor.strip().partition(" ")
+    return first_name, last_name.strip()
+
+
+def _show_time(value):
+    show_time = parse_datetime(value or "")
+    if show_time is None:
+        raise ValueError(f"invalid show_time {value!r}")
+    if timezone.is_aware(show_time) and not settings.USE_TZ:
+        show_time = timezone.make_naive(show_time)
+    return show_time
+
+
+def read_records(path, file_format=None):
+    """Yield (line number, record) of a .csv or .jsonl season file"""
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".")
+    with open(path, encoding="utf-8", newline="") as season_file:
+        if file_format == "csv":
+            # Line 1 is the header
+            yield from enumerate(csv.DictReader(season_file), start=2)
+        elif file_format in ("jsonl", "ndjson", "json"):
+            for line, text in enumerate(season_file, start=1):
+                if text.strip():
+                    yield line, json.loads(text)
+        else:
+            raise ValueError(f"Unknown season file format {file_format!r}")
+
+
+def parse_record(line, record):
+    try:
+        rows = record.get("rows")
+        seats_in_row = record.get("seats_in_row")
+        return {
+            "line": line,
+            "play": record["play"].strip(),
+            "description": record.get("description") or "",
+            "genres": [name for name in _split(record.get("genres")) if name],
+            "actors": [
+                _actor_key(actor)
+                for actor in _split(record.get("actors"))
+                if actor
+            ],
+            "theatre_hall": record["theatre_hall"].strip(),
+            "rows": int(rows) if rows else None,
+            "seats_in_row": int(seats_in_row) if seats_in_row else None,
+            "show_time": _show_time(record["show_time"]),
+        }
+    except (KeyError, AttributeError, ValueError) as ex:
+        raise CatalogImportError(line, f"{type(ex).__name__}: {ex}") from ex
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        # Natural key: id of everything seen so far, these tables are
+        # small next to the performances
+        self.genres = {}
+        self.actors = {}
+        self.halls = {}
+        self.plays = {}
+        # (play id, related id) pairs known to be linked
+        self.links = {"genres": set(), "actors": set()}
+        self.created = dict.fromkeys(
+            ("genres", "actors", "theatre_halls", "plays", "performances"), 0
+        )
+
+    def _resolve(self, cache, keys, lookup, create, counter):
+        """Fill cache with the ids of keys, creating the missing rows"""
+        missing = {key for key in keys if key not in cache}
+        if not missing:
+            return
+        cache.update(lookup(missing))
+        to_create = [key for key in missing if key not in cache]
+        if to_create:
+            create(to_create)
+            cache.update(lookup(set(to_create)))
+            self.created[counter] += len(to_create)
+
+    def _resolve_genres(self, batch):
+        self._resolve(
+            self.genres,
+            {name for record in batch for name in record["genres"]},
+            lambda names: {
+                name: pk
+                for pk, name in Genre.objects.filter(
+                    name__in=names
+                ).values_list("id", "name")
+            },
+            lambda names: Genre.objects.bulk_create(
+                [Genre(name=name) for name in names]
+            ),
+            "genres",
+        )
+
+    def _resolve_actors(self, batch):
+        def lookup(keys):
+            actors = Actor.objects.filter(
+                first_name__in={first_name for first_name, _ in keys},
+                last_name__in={last_name for _, last_name in keys},
+            ).values_list("id", "first_name", "last_name")
+            return {
+                (first_name, last_name): pk
+                for pk, first_name, last_name in actors
+                if (first_name, last_name) in keys
+            }
+
+        self._resolve(
+            self.actors,
+            {key for record in batch for key in record["actors"]},
+            lookup,
+            lambda keys: Actor.objects.bulk_create(
+                [
+                    Actor(first_name=first_name, last_name=last_name)
+                    for first_name, last_name in keys
+                ]
+            ),
+            "actors",
+        )
+
+    def _resolve_halls(self, batch):
+        sizes = {}
+        for record in batch:
+            if record["rows"] and record["seats_in_row"]:
+                sizes.setdefault(
+                    record["theatre_hall"],
+                    (record["rows"], record["seats_in_row"]),
+                )
+
+        def create(names):
+            for name in names:
+                if name not in sizes:
+                    line = next(
+                        record["line"]
+                        for record in batch
+                        if record["theatre_hall"] == name
+                    )
+                    raise CatalogImportError(
+                        line,
+                        f"new theatre hall {name!r} needs rows and "
+                        "seats_in_row",
+                    )
+            TheatreHall.objects.bulk_create(
+                [
+                    TheatreHall(
+                        name=name, rows=sizes[name][0],
+                        seats_in_row=sizes[name][1],
+                    )
+                    for name in names
+                ]
+            )
+
+        self._resolve(
+            self.halls,
+            {record["theatre_hall"] for record in batch},
+            lambda names: {
+                name: pk
+                for pk, name in TheatreHall.objects.filter(
+                    name__in=names
+                ).values_list("id", "name")
+            },
+            create,
+            "theatre_halls",
+        )
+
+    def _resolve_plays(self, batch):
+        descriptions = {
+            record["play"]: record["description"] for record in batch
+        }
+        self._resolve(
+            self.plays,
+            set(descriptions),
+            lambda names: {
+                name: pk
+                for pk, name in Play.objects.filter(
+                    name__in=names
+                ).values_list("id", "name")
+            },
+            lambda names: Play.objects.bulk_create(
+                [
+                    Play(name=name, description=descriptions[name])
+                    for name in names
+                ]
+            ),
+            "plays",
+        )
+
+    def _link(self, field, batch, related_ids, key):
+        """Add the missing play - genre or play - actor rows"""
+        through = getattr(Play, field).through
+        links = {
+            (self.plays[record["play"]], related_ids[related])
+            for record in batch
+            for related in record[field]
+        } - self.links[field]
+        # The through tables are unique on the pair
+        through.objects.bulk_create(
+            [
+                through(play_id=play_id, **{key: related_id})
+                for play_id, related_id in links
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.links[field] |= links
+
+    def _create_performances(self, batch):
+        keys = {
+            (
+                self.plays[record["play"]],
+                self.halls[record["theatre_hall"]],
+                record["show_time"],
+            )
+            for record in batch
+        }
+        existing = set(
+            Performance.objects.filter(
+                play_id__in={play_id for play_id, _, _ in keys},
+                show_time__in={show_time for _, _, show_time in keys},
+            ).values_list("play_id", "theatre_hall_id", "show_time")
+        )
+        new = [
+            Performance(
+                play_id=play_id,
+                theatre_hall_id=theatre_hall_id,
+                show_time=show_time,
+            )
+            for play_id, theatre_hall_id, show_time in sorted(keys - existing)
+        ]
+        Performance.objects.bulk_create(new, batch_size=self.batch_size)
+        # bulk_create sends no post_save to create the seat inventory
+        # and refresh the schedule
+        SeatInventory.objects.bulk_create(
+            [
+                SeatInventory(performance_id=performance.pk)
+                for performance in new
+            ],
+            batch_size=self.batch_size,
+        )
+        mark_performances_stale([performance.pk for performance in new])
+        self.created["performances"] += len(new)
+
+    def import_batch(self, batch):
+        with transaction.atomic():
+            self._resolve_genres(batch)
+            self._resolve_actors(batch)
+            self._resolve_halls(batch)
+            self._resolve_plays(batch)
+            self._link("genres", batch, self.genres, "genre_id")
+            self._link("actors", batch, self.actors, "actor_id")
+            self._create_performances(batch)
+
+    def run(self, records, checkpoint=None):
+        """
+        Import (line, record) pairs, skipping the lines up to the
+        checkpoint. Yields the last line of each committed batch.
+        """
+        if checkpoint is not None:
+            records = (
+                (line, record) for line, record in records if line > checkpoint
+            )
+        parsed = (parse_record(line, record) for line, record in records)
+        try:
+            while batch := list(islice(parsed, self.batch_size)):
+                self.import_batch(batch)
+                yield batch[-1]["line"]
+        finally:
+            for model in (Genre, Actor, TheatreHall, Play, Performance):
+                invalidate(model)
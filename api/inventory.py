@@ -0,0 +1,117 @@
+from collections import Counter
+
+from django.db.models import Count, F
+from django.dispatch import Signal
+
+from api.models import Performance, SeatInventory, Ticket
+
+# Sent with changes={performance_id: tickets sold, negative if released}
+# after the counters are updated
+seats_changed = Signal()
+
+
+def record_sold_tickets(tickets):
+    """
+    Add freshly created tickets to the per-performance sold counters.
+    Must run in the same transaction as the ticket INSERT, tickets
+    created with save() are added by ``api.signals``, bulk_create
+    callers call it themselves.
+    """
+    sold = Counter(ticket.performance_id for ticket in tickets)
+    for performance_id, count in sold.items():
+        updated = SeatInventory.objects.filter(
+            performance_id=performance_id
+        ).update(
+            tickets_sold=F("tickets_sold") + count, version=F("version") + 1
+        )
+        if not updated:
+            SeatInventory.objects.create(
+                performance_id=performance_id,
+                tickets_sold=Ticket.objects.filter(
+                    performance_id=performance_id
+                ).count(),
+            )
+    seats_changed.send(sender=SeatInventory, changes=dict(sold))
+
+
+def _release_seat(performance_id):
+    SeatInventory.objects.filter(
+        performance_id=performance_id, tickets_sold__gt=0
+    ).update(tickets_sold=F("tickets_sold") - 1, version=F("version") + 1)
+    seats_changed.send(sender=SeatInventory, changes={performance_id: -1})
+
+
+def record_released_ticket(ticket):
+    _release_seat(ticket.performance_id)
+
+
+def record_moved_ticket(ticket, from_performance_id):
+    """Move a ticket saved with another performance to its new counter"""
+    _release_seat(from_performance_id)
+    record_sold_tickets([ticket])
+
+
+def ensure_inventory(performance_ids):
+    """Create the missing counters of bulk created performances"""
+    missing = set(performance_ids) - set(
+        SeatInventory.objects.filter(
+            performance_id__in=performance_ids
+        ).values_list("performance_id", flat=True)
+    )
+    if missing:
+        SeatInventory.objects.bulk_create(
+            (
+                SeatInventory(performance_id=performance_id, tickets_sold=sold)
+                for performance_id, sold in count_sold_tickets(
+                    missing
+                ).items()
+            ),
+            ignore_conflicts=True,
+        )
+
+
+def count_sold_tickets(performance_ids=None):
+    """Return {performance_id: sold} computed from the Ticket rows"""
+    performances = Performance.objects.all()
+    if performance_ids is not None:
+        performances = performances.filter(id__in=performance_ids)
+
+    return dict(
+        performances.annotate(sold=Count("tickets")).values_list("id", "sold")
+    )
+
+
+def find_drift(performance_ids=None):
+    """Return {performance_id: (stored, actual)} for every wrong counter"""
+    actual = count_sold_tickets(performance_ids)
+    stored = dict(
+        SeatInventory.objects.filter(
+            performance_id__in=actual.keys()
+        ).values_list("performance_id", "tickets_sold")
+    )
+
+    return {
+        performance_id: (stored.get(performance_id), sold)
+        for performance_id, sold in actual.items()
+        if stored.get(performance_id) != sold
+    }
+
+
+def rebuild_inventory(performance_ids=None):
+    """Recount sold tickets and store the result, return fixed ids"""
+    drift = find_drift(performance_ids)
+    for performance_id, (_, sold) in drift.items():
+        SeatInventory.objects.update_or_create(
+            performance_id=performance_id,
+            defaults={"tickets_sold": sold},
+        )
+    if drift:
+        seats_changed.send(
+            sender=SeatInventory,
+            changes={
+                performance_id: sold - (stored or 0)
+                for performance_id, (stored, sold) in drift.items()
+            },
+        )
+
+    return sorted(drift)
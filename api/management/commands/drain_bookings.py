@@ -0,0 +1,83 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.booking_queue import drain
+
+
+class Command(BaseCommand):
+    help = "Book the reservations accepted in queued booking mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker threads, each owning a share of the performances",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            help="Requests of one performance booked per transaction",
+        )
+        parser.add_argument(
+            "--poll_seconds",
+            type=float,
+            default=0.5,
+            help="Pause of an idle worker before looking at the queue again",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop when the queue is empty instead of waiting for more",
+        )
+
+    def work(self, worker, options):
+        processed = 0
+        while not self.stopping.is_set():
+            batch = drain(options["batch_size"], worker, options["workers"])
+            processed += batch
+            if batch:
+                continue
+            if options["once"]:
+                break
+            self.stopping.wait(options["poll_seconds"])
+        self.processed[worker] = processed
+
+    def work_in_thread(self, worker, options):
+        try:
+            self.work(worker, options)
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        self.processed = [0] * workers
+        self.stopping = threading.Event()
+        started = time.monotonic()
+
+        # Worker 0 runs in the main thread
+        threads = [
+            threading.Thread(
+                target=self.work_in_thread, args=(worker, options)
+            )
+            for worker in range(1, workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self.work(0, options)
+        except KeyboardInterrupt:
+            # The other workers stop after their current batch
+            self.stopping.set()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {sum(self.processed)} booking requests in "
+                f"{time.monotonic() - started:.1f}s"
+            )
+        )
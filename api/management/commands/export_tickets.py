@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import FORMATS, export_chunks, sold_tickets
+from api.serializers import TicketExportSerializer
+
+
+class Command(BaseCommand):
+    help = "Stream sold tickets as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(FORMATS), default="csv"
+        )
+        parser.add_argument("--performance", type=int)
+        parser.add_argument("--theatre_hall", type=int)
+        parser.add_argument("--date_from", help="Sold on or after, ISO date")
+        parser.add_argument("--date_to", help="Sold on or before, ISO date")
+        parser.add_argument(
+            "--output", help="File to write to instead of stdout"
+        )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            help="Rows per database round trip, EXPORT_CHUNK_SIZE by default",
+        )
+
+    def handle(self, *args, **options):
+        filters = TicketExportSerializer(
+            data={
+                name: options[name]
+                for name in TicketExportSerializer().fields
+                if options[name] is not None
+            }
+        )
+        if not filters.is_valid():
+            raise CommandError(filters.errors)
+
+        chunks = export_chunks(
+            sold_tickets(**filters.validated_data),
+            options["format"],
+            options["chunk_size"],
+        )
+        if options["output"]:
+            with open(
+                options["output"], "w", encoding="utf-8", newline=""
+            ) as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
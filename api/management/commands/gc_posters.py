@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.posters import POSTERS_DIR, poster_references
+from api.storage import TEMP_NAME, is_content_addressed, poster_storage
+
+
+class Command(BaseCommand):
+    help = "Delete poster blobs and variants no performance refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace_seconds",
+            type=int,
+            default=3600,
+            help="Keep files written or reused more recently than this, "
+            "their rows may not be committed yet",
+        )
+        parser.add_argument(
+            "--dry_run",
+            action="store_true",
+            help="Only list the files that would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        storage = poster_storage()
+        if not storage.exists(POSTERS_DIR):
+            self.stdout.write(self.style.SUCCESS("No posters stored"))
+            return
+
+        references = poster_references()
+        cutoff = timezone.now() - timedelta(seconds=options["grace_seconds"])
+        orphans = [
+            name
+            for name in storage.walk(POSTERS_DIR)
+            if (is_content_addressed(name) or TEMP_NAME.search(name))
+            and name not in references
+            and storage.get_modified_time(name) < cutoff
+        ]
+
+        for name in orphans:
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {len(orphans)} orphaned files, "
+                f"{len(references)} files in use"
+            )
+        )
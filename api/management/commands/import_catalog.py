@@ -0,0 +1,96 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import CatalogImporter, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import plays, actors, genres, halls and performances from a "
+        "season file (.jsonl or .csv)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Season file format, by default from the file extension",
+        )
+        parser.add_argument("--batch_size", type=int, default=5000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file, <path>.checkpoint by default",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and read the file from the start",
+        )
+
+    @staticmethod
+    def file_state(path):
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load_checkpoint(self, checkpoint_path, state):
+        try:
+            with open(checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+
+        if checkpoint["file"] != state:
+            # Records are matched by natural key, starting over is safe
+            self.stdout.write(
+                self.style.WARNING(
+                    "Season file changed since the checkpoint, "
+                    "importing it from the start"
+                )
+            )
+            return None
+        self.stdout.write(f"Resuming after record {checkpoint['line']}")
+        return checkpoint["line"]
+
+    @staticmethod
+    def save_checkpoint(checkpoint_path, state, line):
+        temp_path = f"{checkpoint_path}.tmp"
+        with open(temp_path, "w") as checkpoint_file:
+            json.dump({"file": state, "line": line}, checkpoint_file)
+        os.replace(temp_path, checkpoint_path)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        state = self.file_state(path)
+        checkpoint = (
+            None
+            if options["restart"]
+            else self.load_checkpoint(checkpoint_path, state)
+        )
+
+        importer = CatalogImporter(batch_size=options["batch_size"])
+        started = time.monotonic()
+        try:
+            for line in importer.run(
+                read_records(path, options["format"]), checkpoint
+            ):
+                self.save_checkpoint(checkpoint_path, state, line)
+                self.stdout.write(f"Imported up to record {line}")
+        except ValueError as ex:
+            # Committed batches are kept, the checkpoint points past them
+            raise CommandError(ex) from ex
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        created = ", ".join(
+            f"{count} {name}" for name, count in importer.created.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.inventory import find_drift, rebuild_inventory
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the seat inventory against the Ticket rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted counters, exit with 1 if any",
+        )
+        parser.add_argument(
+            "--performance",
+            type=int,
+            nargs="*",
+            dest="performance_ids",
+            help="Limit to these performance ids",
+        )
+
+    def handle(self, *args, **options):
+        performance_ids = options["performance_ids"]
+
+        if options["check"]:
+            drift = find_drift(performance_ids)
+            for performance_id, (stored, actual) in sorted(drift.items()):
+                self.stdout.write(
+                    f"Performance {performance_id}: "
+                    f"stored {stored}, actual {actual}"
+                )
+            if drift:
+                self.stdout.write(self.style.ERROR("Seat inventory drifted"))
+                sys.exit(1)
+            self.stdout.write(self.style.SUCCESS("Seat inventory is correct"))
+            return
+
+        with transaction.atomic():
+            fixed = rebuild_inventory(performance_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(fixed)} performance counters")
+        )
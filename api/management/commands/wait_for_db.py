@@ -5,18 +5,36 @@ from django.core.management.base import BaseCommand
 from django.db import connection
 from django.db.utils import OperationalError
 
+from api.db import get_pool
+
 
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--poll_seconds", type=float, default=3)
         parser.add_argument("--max_retries", type=int, default=60)
 
+    @staticmethod
+    def check_pool(pool, timeout):
+        """Open the pool, wait until all min_size connections are up"""
+        from psycopg_pool import PoolTimeout
+
+        try:
+            pool.open(wait=True, timeout=timeout)
+        except PoolTimeout as ex:
+            # A pool that timed out is closed, the next attempt opens
+            # a new one
+            connection.close_pool()
+            raise OperationalError(ex) from ex
+
     def handle(self, *args, **options):
         max_retries = options["max_retries"]
         poll_seconds = options["poll_seconds"]
 
         for retry in range(max_retries):
+            pool = get_pool(connection)
             try:
+                if pool is not None:
+                    self.check_pool(pool, poll_seconds)
                 connection.ensure_connection()
             except OperationalError as ex:
                 self.stdout.write(
@@ -29,6 +47,12 @@ class Command(BaseCommand):
                 )
                 time.sleep(poll_seconds)
             else:
+                if pool is not None:
+                    self.stdout.write(
+                        "Connection pool ready: {size} connections".format(
+                            size=pool.get_stats()["pool_size"]
+                        )
+                    )
                 break
         else:
             self.stdout.write(self.style.ERROR("Database unavailable"))
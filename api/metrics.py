@@ -0,0 +1,325 @@
+"""
+Per-request query count and timings.
+
+``MetricsMiddleware`` measures every request:
+
+* ``db``: number and time of the SQL queries, through an execute
+  wrapper installed on every database connection, so the queries run
+  by ``sync_to_async`` threads under ASGI are counted too,
+* ``serialize``: rendering the response body,
+* ``total``: the whole request, middlewares included,
+
+tagged with the viewset and action (ex. ``PerformanceViewSet.list``)
+that served it. They are sent back in a ``Server-Timing`` header and
+added up per process for ``/metrics``, in the Prometheus text format.
+Every worker process has its own counters, Prometheus adds them up
+across the scraped targets.
+
+Viewsets can declare ``query_budgets = {"list": 4}``, requests running
+more queries are logged and counted in ``query_budget_exceeded_total``.
+A budget depending on the settings can be a function returning it.
+A budget counts the queries of the view, the user row loaded by the
+authentication class is added unless the class declares
+``queries = 0`` (ex. ``StatelessJWTAuthentication``). Browsable API
+pages are not budgeted. ``api.tests.metrics_tests`` checks the budgets
+on the real request paths.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import BrowsableAPIRenderer
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = "unmatched"
+        self.budget = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.view_returned = None
+        self.serialize_seconds = 0.0
+        self.total_seconds = 0.0
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} '
+            f'queries", serialize;dur={self.serialize_seconds * 1000:.1f}, '
+            f"total;dur={self.total_seconds * 1000:.1f}"
+        )
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def _install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorder():
+    """Time the queries of the connections of this thread or task"""
+    for connection in connections.all():
+        _install(connection)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+def authentication_queries(view_class):
+    """Queries the authentication classes of the view may run"""
+    return max(
+        (
+            getattr(authentication, "queries", 1)
+            for authentication in getattr(
+                view_class, "authentication_classes", ()
+            )
+        ),
+        default=0,
+    )
+
+
+def resolve_view(view_func, request):
+    """
+    Name (ViewSet.action, APIView.method or module.function) and query
+    budget of the view serving the request
+    """
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}", None
+
+    method = request.method.lower()
+    action = (getattr(view_func, "actions", None) or {}).get(method, method)
+    budget = getattr(view_class, "query_budgets", {}).get(action)
+    if callable(budget):
+        budget = budget()
+    if budget is not None:
+        budget += authentication_queries(view_class)
+    return f"{view_class.__name__}.{action}", budget
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(**labels):
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.views = {}
+
+    def record(self, request, response, metrics):
+        key = (metrics.view, request.method, response.status_code)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            view = self.views.setdefault(
+                metrics.view,
+                {
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "count": 0,
+                    "seconds": 0.0,
+                    "queries": 0,
+                    "db_seconds": 0.0,
+                    "serialize_seconds": 0.0,
+                    "over_budget": 0,
+                },
+            )
+            bucket = bisect_left(DURATION_BUCKETS, metrics.total_seconds)
+            if bucket < len(DURATION_BUCKETS):
+                view["buckets"][bucket] += 1
+            view["count"] += 1
+            view["seconds"] += metrics.total_seconds
+            view["queries"] += metrics.queries
+            view["db_seconds"] += metrics.db_seconds
+            view["serialize_seconds"] += metrics.serialize_seconds
+            view["over_budget"] += metrics.over_budget
+
+    def render(self):
+        """All the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            views = sorted(
+                (name, {**stats, "buckets": list(stats["buckets"])})
+                for name, stats in self.views.items()
+            )
+
+        lines = [
+            "# HELP http_requests_total Requests by view, method and status",
+            "# TYPE http_requests_total counter",
+        ]
+        for (view, method, status), count in requests:
+            labels = _labels(view=view, method=method, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request duration by view",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for view, stats in views:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats["buckets"]):
+                cumulative += count
+                labels = _labels(view=view, le=bound)
+                lines.append(
+                    f"http_request_duration_seconds_bucket{{{labels}}} "
+                    f"{cumulative}"
+                )
+            labels = _labels(view=view, le="+Inf")
+            lines.append(
+                f"http_request_duration_seconds_bucket{{{labels}}} "
+                f"{stats['count']}"
+            )
+            labels = _labels(view=view)
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} "
+                f"{stats['seconds']}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels}}} "
+                f"{stats['count']}"
+            )
+
+        for name, key, help_text in (
+            ("db_queries_total", "queries", "SQL queries by view"),
+            (
+                "db_query_duration_seconds_total",
+                "db_seconds",
+                "Time spent in SQL queries by view",
+            ),
+            (
+                "response_serialize_duration_seconds_total",
+                "serialize_seconds",
+                "Time spent rendering responses by view",
+            ),
+            (
+                "query_budget_exceeded_total",
+                "over_budget",
+                "Requests running more queries than the view budget",
+            ),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for view, stats in views:
+                lines.append(f"{name}{{{_labels(view=view)}}} {stats[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self._finish(request, response, metrics)
+
+    @staticmethod
+    def _start(request):
+        install_query_recorder()
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        return metrics, _current_metrics.set(metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Under ASGI this runs on the thread of the view
+        install_query_recorder()
+        request.metrics.view, request.metrics.budget = resolve_view(
+            view_func, request
+        )
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook
+        request.metrics.view_returned = time.perf_counter()
+        return response
+
+    @staticmethod
+    def _finish(request, response, metrics):
+        finished = time.perf_counter()
+        metrics.total_seconds = finished - metrics.started
+        if metrics.view_returned is not None:
+            metrics.serialize_seconds = finished - metrics.view_returned
+        renderer = getattr(response, "accepted_renderer", None)
+        if isinstance(renderer, BrowsableAPIRenderer):
+            # Its forms run queries of their own, budgets are for the API
+            metrics.budget = None
+        if metrics.over_budget:
+            logger.warning(
+                "%s ran %d queries, its budget is %d",
+                metrics.view,
+                metrics.queries,
+                metrics.budget,
+            )
+
+        server_timing = metrics.server_timing()
+        if response.has_header("Server-Timing"):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response["Server-Timing"] = server_timing
+        registry.record(request, response, metrics)
+        response.metrics = metrics
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_seat_inventory(apps, schema_editor):
+    Performance = apps.get_model("api", "Performance")
+    SeatInventory = apps.get_model("api", "SeatInventory")
+
+    SeatInventory.objects.bulk_create(
+        SeatInventory(performance_id=performance_id, tickets_sold=sold)
+        for performance_id, sold in Performance.objects.annotate(
+            sold=Count("tickets")
+        ).values_list("id", "sold")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('performance', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='api.performance')),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'seat inventories',
+            },
+        ),
+        migrations.RunPython(fill_seat_inventory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS api_play_name_trgm "
+    "ON api_play USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS api_play_description_trgm "
+    "ON api_play USING gin (description gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_play_description_trgm",
+    "DROP INDEX IF EXISTS api_play_name_trgm",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_play_search USING fts5("
+    "name, description, content='api_play', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER api_play_search_ai AFTER INSERT ON api_play BEGIN "
+    "INSERT INTO api_play_search(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER api_play_search_ad AFTER DELETE ON api_play BEGIN "
+    "INSERT INTO api_play_search(api_play_search, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER api_play_search_au AFTER UPDATE ON api_play BEGIN "
+    "INSERT INTO api_play_search(api_play_search, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO api_play_search(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO api_play_search(api_play_search) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_play_search_au",
+    "DROP TRIGGER IF EXISTS api_play_search_ad",
+    "DROP TRIGGER IF EXISTS api_play_search_ai",
+    "DROP TABLE IF EXISTS api_play_search",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        statements = statements_by_vendor.get(
+            schema_editor.connection.vendor, []
+        )
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_seatinventory"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_play_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='performance',
+            index=models.Index(fields=['show_time'], name='api_perf_show_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at'], name='api_reserv_user_created_idx'),
+        ),
+    ]
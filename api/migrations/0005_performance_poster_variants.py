@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performance',
+            name='poster_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:32
+
+import api.models
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_performance_poster_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='performance',
+            name='poster',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.poster_storage, upload_to=api.models.poster_image_file_path),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_performance_poster_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seatinventory',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_bookingrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleSnapshot',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('content', models.TextField(blank=True)),
+                ('etag', models.CharField(blank=True, max_length=34)),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('built_generation', models.PositiveIntegerField(blank=True, null=True)),
+                ('catalog_version', models.CharField(blank=True, max_length=100)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_schedulesnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='schedulesnapshot',
+            name='catalog_version',
+        ),
+    ]
@@ -7,6 +7,8 @@ from django.contrib.auth.models import User
 from django.db import models
 from rest_framework.exceptions import ValidationError
 
+from api.storage import poster_storage
+
 
 class Genre(models.Model):
     name = models.CharField(max_length=100)
@@ -66,12 +68,56 @@ class Performance(models.Model):
     poster = models.ImageField(
         null=True,
         blank=True,
-        upload_to=poster_image_file_path
+        upload_to=poster_image_file_path,
+        storage=poster_storage,
+    )
+    # Storage names of the resized posters, see api.posters
+    poster_variants = models.JSONField(
+        default=dict, blank=True, editable=False
     )
 
     def __str__(self) -> str:
         return f"{self.play.name} at {self.theatre_hall.name} on {self.show_time}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["show_time"], name="api_perf_show_time_idx"),
+        ]
+
+
+class SeatInventory(models.Model):
+    performance = models.OneToOneField(
+        Performance,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="inventory",
+    )
+    tickets_sold = models.PositiveIntegerField(default=0)
+    # Bumped on every sale and release, see api.booking optimistic
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.performance}: {self.tickets_sold} sold"
+
+    class Meta:
+        verbose_name_plural = "seat inventories"
+
+
+class ScheduleSnapshot(models.Model):
+    """Rendered performance list of one day, see api.schedule"""
+
+    date = models.DateField(primary_key=True)
+    content = models.TextField(blank=True)
+    etag = models.CharField(max_length=34, blank=True)
+    # Bumped by every change of the day, the snapshot is fresh while
+    # built_generation is the current one
+    generation = models.PositiveIntegerField(default=0)
+    built_generation = models.PositiveIntegerField(null=True, blank=True)
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Schedule of {self.date}"
+
 
 class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -82,6 +128,12 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="api_reserv_user_created_idx",
+            ),
+        ]
 
 
 class Ticket(models.Model):
@@ -140,3 +192,42 @@ class Ticket(models.Model):
         unique_together = ("performance", "row", "seat")
         ordering = ["row", "seat"]
 
+
+class BookingRequest(models.Model):
+    """A reservation accepted in queued booking mode, see api.booking_queue"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        CONFIRMED = "confirmed"
+        REJECTED = "rejected"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    # Requests are drained per performance, by the first ticket
+    performance = models.ForeignKey(
+        Performance, on_delete=models.CASCADE, related_name="+"
+    )
+    tickets = models.JSONField()
+    hold = models.CharField(max_length=32, blank=True)
+    status = models.CharField(
+        max_length=10, choices=Status, default=Status.PENDING
+    )
+    reservation = models.OneToOneField(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    errors = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} {self.status} {self.created_at}"
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["status", "performance", "id"],
+                name="api_booking_req_pending_idx",
+            ),
+        ]
@@ -1,7 +1,154 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import datetime
 
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
 
-class OrderPagination(PageNumberPagination):
-    page_size = 1
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a unique compound ordering (ex. created_at, id).
+    Every page is one range query on the ordering columns,
+    with no OFFSET and no COUNT(*), however deep the page is.
+    """
+
+    page_size = 10
     page_size_query_param = "page_size"
-    max_page_size = 20
+    max_page_size = 100
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _keyset_filter(ordering, position):
+        """(a, b) after (x, y) is: a > x OR (a = x AND b > y)"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return json.dumps(position, separators=(",", ":"))
+
+    def _page_queryset(self, queryset, request, view):
+        """Queryset of the page rows plus one, None if not paginated"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+
+        ordering = (
+            [self._invert(field) for field in self.ordering]
+            if self._reverse
+            else list(self.ordering)
+        )
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(
+                self._keyset_filter(ordering, self.cursor.position)
+            )
+        return queryset[:self.page_size + 1]
+
+    @property
+    def _reverse(self):
+        return bool(self.cursor and self.cursor.reverse)
+
+    def _set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self._reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views"""
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(cursor.position)
+            if (
+                not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or None in position
+            ):
+                raise ValueError("Bad position")
+            # Values the columns can not hold would fail in the query
+            position = [
+                self.model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(
+            self.page[0], self.ordering
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+
+class ReservationPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class PerformancePagination(KeysetPagination):
+    page_size = 20
+    ordering = ("show_time", "id")
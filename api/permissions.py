@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 
@@ -11,3 +13,15 @@ class IsAdminOrIfAuthenticatedReadOnly(BasePermission):
             )
             or (request.user and request.user.is_staff)
         )
+
+
+class HasMetricsToken(BasePermission):
+    """Bearer METRICS_TOKEN, nobody when no token is configured"""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, "METRICS_TOKEN", "")
+        if not token:
+            return False
+        return constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
@@ -0,0 +1,197 @@
+"""
+Poster processing pipeline.
+
+``upload_image`` only stores the uploaded file and queues the
+performance. A worker then builds every ``POSTER_PIPELINE["SIZES"]``
+thumbnail in every supported ``FORMATS`` image format, without the EXIF,
+XMP and other metadata of the upload, and records their storage names
+in ``Performance.poster_variants``::
+
+    {"thumbnail": {"webp": "uploads/posters/variants/3f/3f2a...9c.webp"}}
+
+Variants go to the content-addressed poster storage too, performances
+sharing a poster share its variants. Replaced variants are left to
+``gc_posters``.
+
+Queues:
+
+* ``ThreadPoolQueue`` runs jobs in a thread pool of the web process.
+* ``ProcessPoolQueue`` runs them in worker processes, off the GIL.
+* ``SyncQueue`` runs them right away, for tests and scripts.
+"""
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from api.storage import poster_storage
+
+DEFAULTS = {
+    "QUEUE": "api.posters.ThreadPoolQueue",
+    "WORKERS": 2,
+    # Name: longest side in pixels
+    "SIZES": {"thumbnail": 320, "medium": 960},
+    # Formats this Pillow build can not write (ex. AVIF) are skipped
+    "FORMATS": ["webp", "avif"],
+    "QUALITY": 80,
+}
+POSTERS_DIR = "uploads/posters"
+VARIANTS_DIR = f"{POSTERS_DIR}/variants"
+
+
+def get_setting(name):
+    return getattr(settings, "POSTER_PIPELINE", {}).get(name, DEFAULTS[name])
+
+
+def supported_formats():
+    Image.init()
+    return [
+        image_format
+        for image_format in get_setting("FORMATS")
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def _encode(image, image_format):
+    """Image bytes with no metadata: no exif, icc or xmp is passed on"""
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=get_setting("QUALITY"))
+    return buffer.getvalue()
+
+
+def build_variants(poster_file):
+    """Save every variant of an open poster file, return their names"""
+    with Image.open(poster_file) as original:
+        # Apply the EXIF orientation before the EXIF data is dropped
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    formats = supported_formats()
+    variants = {}
+    for name, size in get_setting("SIZES").items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[name] = {
+            image_format: poster_storage().save(
+                f"{VARIANTS_DIR}/{name}.{image_format}",
+                ContentFile(_encode(resized, image_format)),
+            )
+            for image_format in formats
+        }
+    return variants
+
+
+def variant_names(variants):
+    return [
+        name
+        for formats in variants.values()
+        for name in formats.values()
+    ]
+
+
+def poster_references():
+    """Number of performances naming each poster and variant file"""
+    from api.models import Performance
+
+    references = Counter()
+    rows = Performance.objects.values_list("poster", "poster_variants")
+    for poster, variants in rows.iterator():
+        if poster:
+            references[poster] += 1
+            references.update(variant_names(variants))
+    return references
+
+
+def process_poster(performance_id):
+    """Build the variants of the current poster of the performance"""
+    from api.cache import invalidate
+    from api.models import Performance
+    from api.schedule import mark_performances_stale
+
+    performance = (
+        Performance.objects.filter(pk=performance_id)
+        .only("poster")
+        .first()
+    )
+    if performance is None or not performance.poster:
+        return None
+
+    poster_name = performance.poster.name
+    with performance.poster.open("rb") as poster_file:
+        variants = build_variants(poster_file)
+
+    # Drop the result if another poster was uploaded meanwhile
+    updated = Performance.objects.filter(
+        pk=performance_id, poster=poster_name
+    ).update(poster_variants=variants)
+    if not updated:
+        return None
+    # update() sends no post_save for the catalog cache and the schedule
+    invalidate(Performance)
+    mark_performances_stale([performance_id])
+    return variants
+
+
+def _worker_job(performance_id):
+    try:
+        return process_poster(performance_id)
+    finally:
+        # Pool workers outlive requests, nothing closes their connections
+        connections.close_all()
+
+
+class SyncQueue:
+    def enqueue(self, performance_id):
+        process_poster(performance_id)
+
+
+class ThreadPoolQueue:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=get_setting("WORKERS"),
+            thread_name_prefix="poster",
+        )
+
+    def enqueue(self, performance_id):
+        return self.executor.submit(_worker_job, performance_id)
+
+
+def _setup_worker():
+    import django
+
+    django.setup()
+
+
+class ProcessPoolQueue:
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=get_setting("WORKERS"), initializer=_setup_worker
+        )
+
+    def enqueue(self, performance_id):
+        return self.executor.submit(_worker_job, performance_id)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_poster_queue():
+    path = get_setting("QUEUE")
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = import_string(path)()
+        return _queues[path]
+
+
+def queue_poster(performance):
+    """Process the poster once the upload is committed"""
+    transaction.on_commit(
+        lambda: get_poster_queue().enqueue(performance.pk)
+    )
@@ -0,0 +1,235 @@
+"""
+Read replica routing.
+
+``ReplicaMiddleware`` marks GET, HEAD and OPTIONS requests as read only,
+``ReplicaRouter`` sends their reads to one of the ``DB_REPLICAS["ALIASES"]``
+databases. Everything else stays on the primary (``default``):
+
+* writes, and every query of unsafe requests such as reservation
+  creation with its transaction,
+* reads inside an atomic block,
+* reads outside requests (management commands, shells, workers),
+* reads of a user who wrote in the last ``STICKY_SECONDS`` seconds, so
+  they see their own reservations before the replicas catch up. The
+  cache is asked once per request, when the user is first known.
+
+Replicas are picked round-robin or by the lowest replication lag,
+replicas lagging more than ``MAX_LAG`` seconds are skipped.
+"""
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+DEFAULTS = {
+    "ALIASES": [],
+    "SELECTION": "round_robin",
+    "MAX_LAG": 30,
+    "LAG_CHECK_INTERVAL": 5,
+    "STICKY_SECONDS": 5,
+    "CACHE_ALIAS": "default",
+}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Request being served when it may read from replicas
+_read_only_request = ContextVar("read_only_request", default=None)
+
+
+def get_setting(name):
+    return getattr(settings, "DB_REPLICAS", {}).get(name, DEFAULTS[name])
+
+
+def _sticky_key(user_id):
+    return f"db-replicas:sticky:{user_id}"
+
+
+def stick_to_primary(user_id):
+    """Read the user's data from the primary for a while"""
+    seconds = get_setting("STICKY_SECONDS")
+    if seconds:
+        caches[get_setting("CACHE_ALIAS")].set(
+            _sticky_key(user_id), True, seconds
+        )
+
+
+def is_sticky(user_id):
+    return bool(caches[get_setting("CACHE_ALIAS")].get(_sticky_key(user_id)))
+
+
+def _request_user_id(request):
+    """
+    Id of the authenticated user of the request, None while the user
+    is not known yet (ex. during JWT authentication itself)
+    """
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class _ReadOnlyRequest:
+    """A safe request, with the stickiness of its user once known"""
+
+    def __init__(self, request):
+        self.request = request
+        self.user_id = None
+        self.sticky = False
+
+    def is_sticky(self):
+        """Looked up once per request, the first time the user is known"""
+        if self.user_id is None:
+            self.user_id = _request_user_id(self.request)
+            if self.user_id is None:
+                return False
+            self.sticky = is_sticky(self.user_id)
+        return self.sticky
+
+
+class _ReplicaLag:
+    """Replication lag of every replica, measured every few seconds"""
+
+    QUERY = {
+        "postgresql": (
+            "SELECT COALESCE(EXTRACT(EPOCH FROM "
+            "now() - pg_last_xact_replay_timestamp()), 0)"
+        ),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lags = {}
+
+    def measure(self, alias):
+        connection = connections[alias]
+        query = self.QUERY.get(connection.vendor)
+        if query is None:
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            return float("inf")
+
+    def get(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            lag, measured_at = self._lags.get(alias, (None, 0))
+        if lag is None or now - measured_at > get_setting(
+            "LAG_CHECK_INTERVAL"
+        ):
+            lag = self.measure(alias)
+            with self._lock:
+                self._lags[alias] = (lag, now)
+        return lag
+
+
+replica_lag = _ReplicaLag()
+_round_robin = itertools.count()
+
+
+def select_replica(aliases):
+    """Replica to read from, None if no replica is usable"""
+    max_lag = get_setting("MAX_LAG")
+    if get_setting("SELECTION") == "least_lag":
+        alias = min(aliases, key=replica_lag.get)
+        return alias if replica_lag.get(alias) <= max_lag else None
+
+    for _ in range(len(aliases)):
+        alias = aliases[next(_round_robin) % len(aliases)]
+        if not max_lag or replica_lag.get(alias) <= max_lag:
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = get_setting("ALIASES")
+        request = _read_only_request.get()
+        if not aliases or request is None:
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Related objects come from the database of the instance
+            return instance._state.db
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        if request.is_sticky():
+            return DEFAULT_DB_ALIAS
+
+        return select_replica(aliases) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Let safe requests read from replicas and keep the reads of a user
+    on the primary for a while after they write
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_only_request.reset(token)
+        self._finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_only_request.reset(token)
+        self._finish(request, response)
+        return response
+
+    @staticmethod
+    def _start(request):
+        read_only = request.method in SAFE_METHODS
+        return _read_only_request.set(
+            _ReadOnlyRequest(request) if read_only else None
+        )
+
+    @staticmethod
+    def _finish(request, response):
+        if (
+            not get_setting("ALIASES")
+            or request.method in SAFE_METHODS
+            or response.status_code >= 400
+        ):
+            return
+        user_id = _request_user_id(request)
+        if user_id is not None:
+            stick_to_primary(user_id)
@@ -0,0 +1,145 @@
+"""
+Daily schedule snapshots.
+
+``GET /api/performances/?date=`` is answered from a ``ScheduleSnapshot``
+row holding the rendered JSON of the whole day, with an ETag so clients
+revalidate with ``If-None-Match`` and get a 304.
+
+Snapshots are rebuilt lazily, by the first read after a change:
+
+* saving or deleting a performance bumps the generation of its old and
+  new day,
+* selling or releasing tickets bumps the generation of the day of the
+  performance, see ``api.inventory.seats_changed``,
+* saving or deleting a play or a hall, shared by every day, bumps the
+  generation of every snapshot.
+
+Generations are bumped once the change commits, so the snapshot rows are
+never locked by booking transactions, and every process sees the same
+state.
+
+With ``SCHEDULE_SNAPSHOTS["AVAILABILITY_STEP"]`` above 1,
+``tickets_available`` is rounded down to a multiple of the step (exact
+below it) and a sale only refreshes the day when it changes the rounded
+value, so busy days are not rebuilt on every ticket.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from api.models import Performance, ScheduleSnapshot
+
+DEFAULTS = {
+    "ENABLED": True,
+    "AVAILABILITY_STEP": 1,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "SCHEDULE_SNAPSHOTS", {}).get(
+        name, DEFAULTS[name]
+    )
+
+
+def availability_bucket(tickets_available):
+    step = get_setting("AVAILABILITY_STEP")
+    if tickets_available < step:
+        return tickets_available
+    return tickets_available - tickets_available % step
+
+
+def _bump_generation(snapshots):
+    transaction.on_commit(
+        lambda: snapshots.update(generation=F("generation") + 1)
+    )
+
+
+def mark_stale(dates):
+    _bump_generation(ScheduleSnapshot.objects.filter(date__in=dates))
+
+
+def mark_all_stale():
+    _bump_generation(ScheduleSnapshot.objects.all())
+
+
+def mark_performances_stale(performance_ids):
+    mark_stale(
+        Performance.objects.filter(id__in=performance_ids)
+        .annotate(day=TruncDate("show_time"))
+        .values("day")
+    )
+
+
+def seats_changed(changes):
+    """Refresh the days of {performance_id: tickets sold} changes"""
+    if get_setting("AVAILABILITY_STEP") == 1:
+        mark_performances_stale(changes)
+        return
+
+    available = dict(
+        Performance.objects.filter(id__in=changes)
+        .annotate(
+            tickets_available=(
+                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+                - Coalesce(F("inventory__tickets_sold"), 0)
+            )
+        )
+        .values_list("id", "tickets_available")
+    )
+    mark_performances_stale(
+        [
+            performance_id
+            for performance_id, sold in changes.items()
+            if performance_id in available
+            and availability_bucket(available[performance_id])
+            != availability_bucket(available[performance_id] + sold)
+        ]
+    )
+
+
+def _create_placeholder(day):
+    """
+    Insert the empty snapshot of the day. bulk_create opens a
+    transaction, a BEGIN of its own on SQLite, so in autocommit it is a
+    plain INSERT.
+    """
+    if transaction.get_connection().in_atomic_block:
+        ScheduleSnapshot.objects.bulk_create(
+            [ScheduleSnapshot(date=day)], ignore_conflicts=True
+        )
+        return
+    try:
+        ScheduleSnapshot.objects.create(date=day)
+    except IntegrityError:
+        # Created by a concurrent request
+        pass
+
+
+def get_snapshot(day, render):
+    """The fresh snapshot of the day, rebuilt with render() if needed"""
+    snapshot = ScheduleSnapshot.objects.filter(date=day).first()
+    if snapshot is None:
+        # Exist before rendering, so changes made meanwhile bump it
+        _create_placeholder(day)
+        snapshot = ScheduleSnapshot(date=day)
+    elif snapshot.built_generation == snapshot.generation:
+        return snapshot
+
+    content = render()
+    snapshot.content = content.decode()
+    snapshot.etag = '"{}"'.format(
+        hashlib.md5(content, usedforsecurity=False).hexdigest()
+    )
+    snapshot.built_generation = snapshot.generation
+    snapshot.built_at = timezone.now()
+    ScheduleSnapshot.objects.filter(date=day).update(
+        content=snapshot.content,
+        etag=snapshot.etag,
+        built_generation=snapshot.built_generation,
+        built_at=snapshot.built_at,
+    )
+    return snapshot
@@ -0,0 +1,118 @@
+"""
+Play name and description search.
+
+PostgreSQL uses pg_trgm GIN indexes on ``api_play.name`` and
+``api_play.description``, which also serve ``ILIKE '%x%'`` filters.
+SQLite uses the ``api_play_search`` FTS5 table with the trigram
+tokenizer, kept in sync with ``api_play`` by triggers.
+Both are created in migration 0003.
+A ``?q=`` search matches the plays containing every term of at least
+three characters.
+"""
+import operator
+from functools import reduce
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "api_play_search"
+# Trigram tokenizer can not match anything shorter than one trigram
+FTS_MIN_LENGTH = 3
+# bm25 column weights for (name, description)
+FTS_WEIGHTS = (10.0, 1.0)
+LIKE_WILDCARDS = {"%", "_"}
+
+
+def _vendor(queryset):
+    # queryset.db would route the read and may measure the replication
+    # lag, on the event loop under ASGI. Replicas run the same engine.
+    return connections[queryset._db or DEFAULT_DB_ALIAS].vendor
+
+
+def _search_terms(query):
+    """Words of the query long enough to be matched by trigrams"""
+    return [term for term in query.split() if len(term) >= FTS_MIN_LENGTH]
+
+
+def _fts_match_expression(terms):
+    """Quote every term so user input is never parsed as FTS5 syntax"""
+    return " ".join(
+        '"{}"'.format(term.replace('"', '""')) for term in terms
+    )
+
+
+def play_name_filter(queryset, name, prefix=""):
+    """
+    Q object for a case-insensitive "name contains" filter on plays,
+    ``prefix`` is the lookup path to the play (ex. "play__")
+    """
+    if (
+        _vendor(queryset) == "sqlite"
+        and len(name) >= FTS_MIN_LENGTH
+        and not set(name) & LIKE_WILDCARDS
+    ):
+        return Q(
+            **{
+                f"{prefix}id__in": RawSQL(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE name LIKE %s",
+                    (f"%{name}%",),
+                )
+            }
+        )
+
+    return Q(**{f"{prefix}name__icontains": name})
+
+
+def search_plays(queryset, query):
+    """Filter plays by name and description, most relevant first"""
+    vendor = _vendor(queryset)
+    terms = _search_terms(query)
+
+    if vendor == "postgresql" and terms:
+        # Every term has to match the name or the description, like the
+        # implicit AND of the FTS5 query
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__trigram_word_similar=term)
+                | Q(description__trigram_word_similar=term)
+            )
+        search_rank = reduce(
+            operator.add,
+            (
+                TrigramWordSimilarity(term, "name") * 2
+                + TrigramWordSimilarity(term, "description")
+                for term in terms
+            ),
+        )
+        return queryset.annotate(search_rank=search_rank).order_by(
+            "-search_rank", "id"
+        )
+
+    match = _fts_match_expression(terms)
+    if vendor == "sqlite" and match:
+        weights = ", ".join(map(str, FTS_WEIGHTS))
+        return (
+            queryset.filter(
+                id__in=RawSQL(
+                    f"SELECT rowid FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s",
+                    (match,),
+                )
+            )
+            .annotate(
+                # bm25 is negative, the lower the better
+                search_rank=RawSQL(
+                    f"SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s "
+                    f"AND {FTS_TABLE}.rowid = api_play.id",
+                    (match,),
+                )
+            )
+            .order_by("-search_rank", "id")
+        )
+
+    return queryset.filter(
+        Q(name__icontains=query) | Q(description__icontains=query)
+    )
@@ -0,0 +1,64 @@
+import base64
+import hashlib
+
+from django.utils.http import quote_etag
+
+
+def seat_index(row, seat, seats_in_row):
+    """Position of a seat in the hall bitmap, row by row from (1, 1)"""
+    return (row - 1) * seats_in_row + (seat - 1)
+
+
+def in_hall(row, seat, rows, seats_in_row):
+    return 1 <= row <= rows and 1 <= seat <= seats_in_row
+
+
+def pack_seats(rows, seats_in_row, taken_seats):
+    """
+    Pack taken (row, seat) pairs into a bitset of rows * seats_in_row
+    bits, most significant bit first. Seats outside the hall (sold
+    before it was made smaller) are left out.
+    """
+    bitmap = bytearray((rows * seats_in_row + 7) // 8)
+    for row, seat in taken_seats:
+        if not in_hall(row, seat, rows, seats_in_row):
+            continue
+        index = seat_index(row, seat, seats_in_row)
+        bitmap[index // 8] |= 0x80 >> (index % 8)
+
+    return bytes(bitmap)
+
+
+def unpack_seats(bitmap, rows, seats_in_row):
+    """Inverse of pack_seats, yields taken (row, seat) pairs"""
+    for index in range(rows * seats_in_row):
+        if bitmap[index // 8] & (0x80 >> (index % 8)):
+            row, seat = divmod(index, seats_in_row)
+            yield row + 1, seat + 1
+
+
+def seat_map(theatre_hall, taken_seats):
+    taken_seats = [
+        (row, seat)
+        for row, seat in taken_seats
+        if in_hall(row, seat, theatre_hall.rows, theatre_hall.seats_in_row)
+    ]
+    bitmap = pack_seats(
+        theatre_hall.rows, theatre_hall.seats_in_row, taken_seats
+    )
+
+    return {
+        "rows": theatre_hall.rows,
+        "seats_in_row": theatre_hall.seats_in_row,
+        "taken": len(taken_seats),
+        "encoding": "bitset",
+        "seats": base64.b64encode(bitmap).decode("ascii"),
+    }
+
+
+def seat_map_etag(seat_map_data):
+    digest = hashlib.md5(
+        "{rows}:{seats_in_row}:{seats}".format(**seat_map_data).encode(),
+        usedforsecurity=False,
+    )
+    return quote_etag(digest.hexdigest())
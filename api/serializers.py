@@ -1,16 +1,24 @@
+from datetime import datetime
+
 from django.db import transaction
-from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.reverse import reverse
 
 from api.models import (
+    BookingRequest,
     Genre,
     Actor,
     Play,
     TheatreHall,
     Performance,
     Reservation,
+    SeatInventory,
     Ticket,
 )
+from api.booking import book_tickets, find_taken_seats
+from api.holds import get_hold_store, new_hold
+from api.storage import poster_storage
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -59,6 +67,23 @@ class PerformanceSerializer(serializers.ModelSerializer):
         fields = ("id", "play", "theatre_hall", "show_time")
 
 
+class PosterVariantsField(serializers.JSONField):
+    """Variant names to URLs: {"thumbnail": {"webp": url}}"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("read_only", True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            name: {
+                image_format: poster_storage().url(storage_name)
+                for image_format, storage_name in formats.items()
+            }
+            for name, formats in value.items()
+        }
+
+
 class PerformanceListSerializer(PerformanceSerializer):
     play = serializers.SlugRelatedField(
         slug_field="name",
@@ -69,6 +94,7 @@ class PerformanceListSerializer(PerformanceSerializer):
         read_only=True,
     )
     tickets_available = serializers.IntegerField()
+    poster_variants = PosterVariantsField()
 
     class Meta:
         model = Performance
@@ -77,7 +103,8 @@ class PerformanceListSerializer(PerformanceSerializer):
             "play",
             "theatre_hall",
             "show_time",
-            "tickets_available"
+            "tickets_available",
+            "poster_variants",
         )
 
 
@@ -93,7 +120,112 @@ class PerformancePosterSerializer(PerformanceSerializer):
         fields = ("id", "poster")
 
 
+class CachedPerformanceField(serializers.PrimaryKeyRelatedField):
+    """Loads each performance (with its hall) once per serializer"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault(
+            "queryset", Performance.objects.select_related("theatre_hall")
+        )
+        super().__init__(**kwargs)
+        self._cache = {}
+
+    def to_internal_value(self, data):
+        if data not in self._cache:
+            self._cache[data] = super().to_internal_value(data)
+        return self._cache[data]
+
+
+class PerformanceSeatsSerializer(serializers.Serializer):
+    rows = serializers.IntegerField(read_only=True)
+    seats_in_row = serializers.IntegerField(read_only=True)
+    taken = serializers.IntegerField(read_only=True)
+    encoding = serializers.CharField(read_only=True)
+    seats = serializers.CharField(
+        read_only=True,
+        help_text=(
+            "Base64 bitset of rows * seats_in_row bits, row by row, "
+            "most significant bit first. A set bit is a taken seat."
+        ),
+    )
+
+
+class SeatsUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the seats are not available."
+    default_code = "seats_unavailable"
+
+    def __init__(self, seats):
+        super().__init__()
+        # Keep row and seat numbers as integers in the payload
+        self.detail = {"detail": self.detail, "seats": seats}
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    id = serializers.CharField(read_only=True)
+    performance = serializers.IntegerField(read_only=True)
+    seats = SeatSerializer(many=True, allow_empty=False)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def create(self, validated_data):
+        performance = validated_data["performance"]
+        seats = [
+            (seat_data["row"], seat_data["seat"])
+            for seat_data in validated_data["seats"]
+        ]
+        if len(set(seats)) != len(seats):
+            raise ValidationError(
+                {"seats": "The same seat is requested more than once."}
+            )
+        for row, seat in seats:
+            Ticket.validate_ticket(
+                row, seat, performance.theatre_hall, ValidationError
+            )
+
+        tickets_data = [
+            {"performance": performance, "row": row, "seat": seat}
+            for row, seat in seats
+        ]
+        hold = new_hold(validated_data["user"].id, performance.id, seats)
+        store = get_hold_store()
+        unavailable = {
+            (performance.id, *seat) for seat in store.acquire(hold)
+        }
+        with transaction.atomic():
+            # Wait for the bookings of this performance holding the
+            # inventory row, see api.booking.recheck_holds
+            list(
+                SeatInventory.objects.select_for_update()
+                .filter(performance=performance)
+                .values_list("pk")
+            )
+            taken = find_taken_seats(tickets_data)
+        if taken and not unavailable:
+            store.release(hold["id"])
+        unavailable |= taken
+        if unavailable:
+            raise SeatsUnavailable(
+                [
+                    {"row": row, "seat": seat}
+                    for _, row, seat in sorted(unavailable)
+                ]
+            )
+
+        return {
+            **hold,
+            "expires_at": datetime.fromtimestamp(hold["expires_at"]),
+            "seats": [{"row": row, "seat": seat} for row, seat in seats],
+        }
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    performance = CachedPerformanceField()
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -107,6 +239,9 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "performance")
+        # Seat uniqueness is checked for the whole reservation at once
+        # in api.booking.book_tickets
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -114,20 +249,101 @@ class TicketListSerializer(TicketSerializer):
 
 
 class ReservationSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    tickets = TicketSerializer(
+        many=True, read_only=False, allow_empty=False, required=False
+    )
+    hold = serializers.CharField(
+        write_only=True,
+        required=False,
+        help_text="Confirm the seats of this seat hold instead of tickets",
+    )
 
     class Meta:
         model = Reservation
-        fields = ("id", "tickets", "created_at")
+        fields = ("id", "tickets", "hold", "created_at")
+
+    def validate(self, attrs):
+        hold_id = attrs.get("hold")
+        if not hold_id:
+            if not attrs.get("tickets"):
+                required = self.fields["tickets"].error_messages["required"]
+                raise ValidationError({"tickets": [required]})
+            return attrs
+        if attrs.get("tickets"):
+            raise ValidationError(
+                {"hold": "Send either tickets or a seat hold, not both."}
+            )
+
+        hold = get_hold_store().get(hold_id)
+        user = self.context["request"].user
+        performance = (
+            Performance.objects.select_related("theatre_hall")
+            .filter(pk=hold["performance"])
+            .first()
+            if hold and hold["user"] == user.id
+            else None
+        )
+        if performance is None:
+            raise ValidationError(
+                {"hold": "Seat hold does not exist or has expired."}
+            )
+
+        attrs["tickets"] = [
+            {"performance": performance, "row": row, "seat": seat}
+            for row, seat in hold["seats"]
+        ]
+        return attrs
 
     def create(self, validated_data):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
+            hold_id = validated_data.pop("hold", None)
             reservation = Reservation.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
+            book_tickets(reservation, tickets_data, hold_id=hold_id)
             return reservation
 
 
 class ReservationListSerializer(ReservationSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class BookingRequestSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingRequest
+        fields = (
+            "id",
+            "status",
+            "status_url",
+            "performance",
+            "tickets",
+            "reservation",
+            "errors",
+            "created_at",
+            "processed_at",
+        )
+        read_only_fields = fields
+
+    def get_status_url(self, booking_request) -> str:
+        return reverse(
+            "api:bookingrequest-detail",
+            kwargs={"pk": booking_request.pk},
+            request=self.context.get("request"),
+        )
+
+
+class TicketExportSerializer(serializers.Serializer):
+    performance = serializers.IntegerField(required=False)
+    theatre_hall = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_from = attrs.get("date_from")
+        date_to = attrs.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError(
+                {"date_to": "date_to must not be before date_from."}
+            )
+        return attrs
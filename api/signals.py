@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api import schedule
+from api.cache import connect_invalidation
+from api.inventory import (
+    record_moved_ticket,
+    record_released_ticket,
+    record_sold_tickets,
+    seats_changed,
+)
+from api.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    SeatInventory,
+    TheatreHall,
+    Ticket,
+)
+
+connect_invalidation(Genre, Actor, Play, TheatreHall)
+
+
+@receiver(post_save, sender=Performance)
+def create_seat_inventory(sender, instance, created, **kwargs):
+    if created:
+        SeatInventory.objects.get_or_create(performance=instance)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_performance(sender, instance, raw=False, **kwargs):
+    instance._sold_for = None
+    if instance.pk and not raw:
+        instance._sold_for = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("performance_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def sell_seat(sender, instance, created, **kwargs):
+    sold_for = getattr(instance, "_sold_for", None)
+    if created:
+        record_sold_tickets([instance])
+    elif sold_for is not None and sold_for != instance.performance_id:
+        record_moved_ticket(instance, sold_for)
+
+
+@receiver(post_delete, sender=Ticket)
+def release_seat(sender, instance, **kwargs):
+    record_released_ticket(instance)
+
+
+def _show_date(performance):
+    show_time = Performance._meta.get_field("show_time").to_python(
+        performance.show_time
+    )
+    return show_time.date()
+
+
+@receiver(pre_save, sender=Performance)
+def remember_schedule_date(sender, instance, raw=False, **kwargs):
+    instance._schedule_dates = set()
+    if instance.pk and not raw:
+        instance._schedule_dates.update(
+            show_time.date()
+            for show_time in Performance.objects.filter(
+                pk=instance.pk
+            ).values_list("show_time", flat=True)
+        )
+
+
+@receiver(post_save, sender=Performance)
+@receiver(post_delete, sender=Performance)
+def refresh_schedule(sender, instance, **kwargs):
+    schedule.mark_stale(
+        {_show_date(instance), *getattr(instance, "_schedule_dates", ())}
+    )
+
+
+@receiver(post_save, sender=Play)
+@receiver(post_delete, sender=Play)
+@receiver(post_save, sender=TheatreHall)
+@receiver(post_delete, sender=TheatreHall)
+def refresh_every_schedule(sender, **kwargs):
+    schedule.mark_all_stale()
+
+
+@receiver(seats_changed)
+def refresh_schedule_on_sale(sender, changes, **kwargs):
+    schedule.seats_changed(changes)
@@ -0,0 +1,82 @@
+"""
+Content-addressed poster storage.
+
+Every file is stored once under the sha256 of its content, so the same
+poster uploaded for every performance of a tour is one blob::
+
+    uploads/posters/3f/3f2a...9c.jpg
+
+A blob is shared by all the rows naming it and is never rewritten, so
+its URL is immutable and can be cached forever (see
+``api.views.serve_media``). Blobs no row names anymore are removed by the
+``gc_posters`` command.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+
+DIGEST_NAME = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+TEMP_NAME = re.compile(r"\.[0-9a-f]{32}\.tmp$")
+
+
+def content_digest(content):
+    """sha256 of a file, read chunk by chunk"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_content_addressed(name):
+    return DIGEST_NAME.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def digest_name(self, name, content):
+        """Keep the directory and extension of the name, hash the rest"""
+        directory = os.path.dirname(name)
+        _, extension = os.path.splitext(name)
+        digest = content_digest(content)
+        return os.path.join(
+            directory, digest[:2], f"{digest}{extension.lower()}"
+        ).replace("\\", "/")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        name = self.digest_name(name, content)
+        if self.exists(name):
+            # Same digest, same content. Refresh the time so gc_posters
+            # does not collect it before the new row is committed.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        # Write aside and move into place, a blob is never seen half
+        # written
+        temp_name = super()._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+    def walk(self, path=""):
+        """Names of all the files under path"""
+        directories, files = self.listdir(path)
+        for file_name in files:
+            yield f"{path}/{file_name}" if path else file_name
+        for directory in directories:
+            yield from self.walk(f"{path}/{directory}" if path else directory)
+
+
+def poster_storage():
+    return storages["posters"]
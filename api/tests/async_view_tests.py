@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.async_views import async_read_urls
+from api.cache import get_catalog_cache
+from api.models import Actor, Genre, Play
+from api.tests.reservation_tests import sample_performance
+from api.urls import router
+
+urlpatterns = [
+    path(
+        "api/",
+        include(
+            (
+                [
+                    *async_read_urls(router, ["plays", "performances"]),
+                    *router.urls,
+                ],
+                "api",
+            )
+        ),
+    ),
+]
+
+ASYNC_URLCONF = override_settings(ROOT_URLCONF=__name__)
+
+
+class AsyncReadViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        self.hamlet = hamlet = Play.objects.create(
+            name="Hamlet", description="Prince"
+        )
+        hamlet.genres.add(Genre.objects.create(name="Drama"))
+        hamlet.actors.add(
+            Actor.objects.create(first_name="Anna", last_name="Ørsted")
+        )
+        self.performances = [
+            sample_performance(play=hamlet, show_time=f"2024-09-0{day} 19:00")
+            for day in range(1, 4)
+        ]
+
+    def get_both(self, url_name, params=None, **kwargs):
+        url = reverse(url_name, kwargs=kwargs)
+        get_catalog_cache().clear()
+        expected = self.client.get(url, params)
+        get_catalog_cache().clear()
+        with ASYNC_URLCONF:
+            actual = self.client.get(url, params)
+        return expected, actual
+
+    def assert_same_response(
+        self, url_name, params=None, served_async=True, **kwargs
+    ):
+        expected, actual = self.get_both(url_name, params, **kwargs)
+        # The sync viewset answers with a DRF Response
+        self.assertEqual(not isinstance(actual, Response), served_async)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual["Content-Type"], expected["Content-Type"])
+        return actual
+
+    def test_performance_list_and_pages(self):
+        first = self.assert_same_response(
+            "api:performance-list", {"page_size": 2}
+        )
+        self.assertEqual(len(first.json()["results"]), 2)
+
+        next_url = first.json()["next"]
+        with ASYNC_URLCONF:
+            actual = self.client.get(next_url)
+        self.assertEqual(actual.content, self.client.get(next_url).content)
+
+    def test_performance_retrieve(self):
+        self.assert_same_response(
+            "api:performance-detail", pk=self.performances[0].id
+        )
+
+    def test_play_list_and_retrieve(self):
+        self.assert_same_response("api:play-list")
+        self.assert_same_response("api:play-list", {"name": "haml"})
+        self.assert_same_response("api:play-list", {"genres_mode": "every"})
+        self.assert_same_response(
+            "api:play-detail", pk=self.hamlet.id
+        )
+
+    def test_missing_object(self):
+        response = self.assert_same_response("api:play-detail", pk=999)
+        self.assertEqual(response.status_code, 404)
+
+    def test_requests_left_to_sync_view(self):
+        self.client.credentials()
+        response = self.assert_same_response(
+            "api:play-list", served_async=False
+        )
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_authenticate(self.user)
+        with ASYNC_URLCONF:
+            response = self.client.post(
+                reverse("api:play-list"), {"name": "Viy"}
+            )
+        self.assertEqual(response.status_code, 403)
+
+    def test_throttles_count_a_request_once(self):
+        # The browsable API is left to the sync view
+        for params, served_async in (
+            (None, True),
+            ({"format": "api"}, False),
+        ):
+            with self.subTest(params), mock.patch(
+                "api.throttling.UserSlidingWindowThrottle.allow_request",
+                return_value=True,
+            ) as allow_request:
+                _, response = self.get_both("api:play-list", params)
+
+            self.assertEqual(
+                not isinstance(response, Response), served_async
+            )
+            self.assertEqual(response.status_code, 200)
+            # Once for the plain request, once for the async URLconf one
+            self.assertEqual(allow_request.call_count, 2)
+
+    def test_throttled_on_the_async_path(self):
+        with mock.patch(
+            "api.throttling.UserSlidingWindowThrottle.allow_request",
+            return_value=False,
+        ), mock.patch(
+            "api.throttling.UserSlidingWindowThrottle.wait", return_value=1
+        ):
+            response = self.assert_same_response("api:play-list")
+
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,172 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.booking_queue import drain
+from api.models import BookingRequest, Reservation, SeatInventory, Ticket
+from api.tests.reservation_tests import RESERVATION_URL, sample_performance
+
+
+def status_url(booking_request_id):
+    return reverse(
+        "api:bookingrequest-detail", kwargs={"pk": booking_request_id}
+    )
+
+
+@override_settings(BOOKING={"QUEUED": True})
+class QueuedBookingTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def reserve(self, seats, performance=None):
+        performance = performance or self.performance
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": performance.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(RESERVATION_URL, payload, format="json")
+
+    def test_reservation_is_accepted_into_the_queue(self):
+        res = self.reserve([(1, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["status"], "pending")
+        self.assertTrue(res["Location"].endswith(status_url(res.data["id"])))
+        self.assertEqual(res.data["status_url"], res["Location"])
+        self.assertFalse(Reservation.objects.exists())
+
+        res = self.client.get(status_url(res.data["id"]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["status"], "pending")
+
+    def test_invalid_seats_are_rejected_at_once(self):
+        res = self.reserve([(11, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BookingRequest.objects.exists())
+
+    def test_drain_confirms_first_and_rejects_lost_seats(self):
+        first = self.reserve([(1, 1), (1, 2)]).data["id"]
+        second = self.reserve([(1, 2), (1, 3)]).data["id"]
+        third = self.reserve([(2, 1)]).data["id"]
+
+        # pending performances, the batch and its performances, one
+        # seat check, reservation, ticket and inventory writes, status
+        # update and the savepoints (the schedule waits for the commit)
+        with self.assertNumQueries(12):
+            self.assertEqual(drain(), 3)
+
+        confirmed = self.client.get(status_url(first)).data
+        self.assertEqual(confirmed["status"], "confirmed")
+        self.assertEqual(
+            Reservation.objects.get(pk=confirmed["reservation"]).user,
+            self.user,
+        )
+        rejected = self.client.get(status_url(second)).data
+        self.assertEqual(rejected["status"], "rejected")
+        self.assertIsNone(rejected["reservation"])
+        self.assertEqual(rejected["errors"]["tickets"][1], {})
+        self.assertIn("non_field_errors", rejected["errors"]["tickets"][0])
+        self.assertEqual(
+            self.client.get(status_url(third)).data["status"], "confirmed"
+        )
+        self.assertEqual(
+            SeatInventory.objects.get(pk=self.performance.id).tickets_sold, 3
+        )
+        self.assertEqual(drain(), 0)
+
+    def test_workers_own_their_performances(self):
+        other = sample_performance()
+        self.reserve([(1, 1)])
+        self.reserve([(1, 1)], performance=other)
+
+        self.assertEqual(drain(worker=other.id % 2, workers=2), 1)
+        self.assertEqual(
+            BookingRequest.objects.get(performance=other).status, "confirmed"
+        )
+        self.assertEqual(
+            BookingRequest.objects.get(performance=self.performance).status,
+            "pending",
+        )
+
+    def test_drain_batches_per_performance(self):
+        for seat in range(1, 6):
+            self.reserve([(1, seat)])
+
+        self.assertEqual(drain(batch_size=2), 2)
+        self.assertEqual(
+            BookingRequest.objects.filter(status="pending").count(), 3
+        )
+
+    def test_seat_sold_outside_the_queue_rejects_only_its_request(self):
+        first = self.reserve([(1, 1)]).data["id"]
+        second = self.reserve([(1, 2)]).data["id"]
+        Ticket.objects.create(
+            performance=self.performance,
+            reservation=Reservation.objects.create(user=self.user),
+            row=1,
+            seat=1,
+        )
+
+        # Sold after the batch seat check
+        with mock.patch(
+            "api.booking_queue.find_taken_seats", return_value=set()
+        ):
+            self.assertEqual(drain(), 2)
+
+        self.assertEqual(
+            BookingRequest.objects.get(pk=first).status, "rejected"
+        )
+        self.assertEqual(
+            BookingRequest.objects.get(pk=second).status, "confirmed"
+        )
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_status_of_others_is_hidden(self):
+        booking_request_id = self.reserve([(1, 1)]).data["id"]
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "other@theatre.com", "pass24word"
+            )
+        )
+
+        res = self.client.get(status_url(booking_request_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(BOOKING={"QUEUED": True, "POLL_INTERVAL": 2})
+    def test_clients_are_told_when_to_poll(self):
+        res = self.reserve([(1, 1)])
+        self.assertEqual(res["Retry-After"], "2")
+
+        url = status_url(res.data["id"])
+        self.assertEqual(self.client.get(url)["Retry-After"], "2")
+
+        drain()
+        self.assertNotIn("Retry-After", self.client.get(url))
+
+    def test_drain_command(self):
+        for seat in range(1, 4):
+            self.reserve([(1, seat)])
+        out = StringIO()
+
+        call_command("drain_bookings", "--once", stdout=out)
+
+        self.assertIn("Processed 3 booking requests", out.getvalue())
+        self.assertFalse(
+            BookingRequest.objects.filter(status="pending").exists()
+        )
@@ -0,0 +1,222 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import booking
+from api.inventory import find_drift
+from api.models import Performance, Reservation, SeatInventory, Ticket
+from api.tests.reservation_tests import RESERVATION_URL, sample_performance
+
+SEAT_TAKEN = {
+    "non_field_errors": [
+        "The fields performance, row, seat must make a unique set."
+    ]
+}
+
+
+class BookingStrategyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def reserve(self, seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(RESERVATION_URL, payload, format="json")
+
+    def test_every_strategy_books_and_counts(self):
+        for row, strategy in enumerate(booking.STRATEGIES, start=1):
+            with self.subTest(strategy), override_settings(
+                BOOKING={"STRATEGY": strategy}
+            ):
+                inventory = SeatInventory.objects.get(pk=self.performance.id)
+
+                res = self.reserve([(row, 1), (row, 2)])
+
+                self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(
+                    self.reserve([(row, 2)]).data["tickets"], [SEAT_TAKEN]
+                )
+                updated = SeatInventory.objects.get(pk=self.performance.id)
+                self.assertEqual(
+                    updated.tickets_sold, inventory.tickets_sold + 2
+                )
+                self.assertGreater(updated.version, inventory.version)
+        self.assertEqual(find_drift(), {})
+
+    @override_settings(BOOKING={"STRATEGY": "lock"})
+    def test_lock_creates_missing_inventory(self):
+        SeatInventory.objects.all().delete()
+
+        # Repairing the inventory is over the budget of a reservation
+        with self.assertLogs("api.metrics", "WARNING"):
+            res = self.reserve([(1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            SeatInventory.objects.get(pk=self.performance.id).tickets_sold, 1
+        )
+
+    def test_fail_fast_returns_seats_lost_after_the_check(self):
+        # The concurrent sale lands between the check and the INSERT
+        other = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            performance=self.performance, reservation=other, row=1, seat=2
+        )
+        with mock.patch(
+            "api.booking.find_taken_seats",
+            side_effect=[set(), {(self.performance.id, 1, 2)}],
+        ):
+            res = self.reserve([(1, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"], [{}, SEAT_TAKEN])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    @override_settings(BOOKING={"STRATEGY": "optimistic"})
+    def test_optimistic_rechecks_after_a_concurrent_sale(self):
+        other = Reservation.objects.create(user=self.user)
+        check_seats = booking.check_seats
+
+        def sell_after_check(tickets_data, hold_id=None):
+            check_seats(tickets_data, hold_id)
+            if not Ticket.objects.exists():
+                Ticket.objects.create(
+                    performance=self.performance,
+                    reservation=other,
+                    row=1,
+                    seat=1,
+                )
+
+        # A retry is over the budget of a reservation too
+        with mock.patch(
+            "api.booking.check_seats", side_effect=sell_after_check
+        ) as check, self.assertLogs("api.metrics", "WARNING"):
+            res = self.reserve([(1, 1)])
+
+        self.assertEqual(check.call_count, 2)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"], [SEAT_TAKEN])
+
+    @override_settings(
+        BOOKING={"STRATEGY": "optimistic", "RETRIES": 2, "BACKOFF": 0}
+    )
+    def test_optimistic_gives_up_with_conflict(self):
+        with mock.patch(
+            "api.booking._claim_versions", return_value=False
+        ) as claim:
+            res = self.reserve([(1, 1)])
+
+        self.assertEqual(claim.call_count, 3)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["detail"].code, "performance_busy")
+        self.assertFalse(Reservation.objects.exists())
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentBookingTest(TransactionTestCase):
+    """Many clients fighting for the same few seats"""
+
+    clients = 8
+    attempts = 5
+
+    def setUp(self):
+        self.performance = sample_performance()
+        self.users = [
+            get_user_model().objects.create_user(
+                f"user{index}@theatre.com", "pass24word"
+            )
+            for index in range(self.clients)
+        ]
+
+    def hammer(self, strategy):
+        statuses = []
+        barrier = threading.Barrier(self.clients)
+
+        def work(user, index):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for attempt in range(self.attempts):
+                    seat = (index + attempt) % 3 + 1
+                    res = client.post(
+                        RESERVATION_URL,
+                        {
+                            "tickets": [
+                                {
+                                    "row": attempt + 1,
+                                    "seat": seat,
+                                    "performance": self.performance.id,
+                                },
+                                {
+                                    "row": attempt + 1,
+                                    "seat": seat + 1,
+                                    "performance": self.performance.id,
+                                },
+                            ]
+                        },
+                        format="json",
+                    )
+                    statuses.append(res.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work, args=(user, index))
+            for index, user in enumerate(self.users)
+        ]
+        with override_settings(BOOKING={"STRATEGY": strategy}):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return statuses
+
+    def test_no_double_booking(self):
+        for strategy in booking.STRATEGIES:
+            with self.subTest(strategy):
+                Reservation.objects.all().delete()
+                SeatInventory.objects.filter(
+                    performance=self.performance
+                ).update(tickets_sold=0)
+
+                statuses = self.hammer(strategy)
+
+                self.assertEqual(len(statuses), self.clients * self.attempts)
+                self.assertLessEqual(
+                    set(statuses), {201, 400, 409}, statuses
+                )
+                self.assertIn(201, statuses)
+                tickets = list(
+                    Ticket.objects.values_list("performance", "row", "seat")
+                )
+                self.assertEqual(len(tickets), len(set(tickets)))
+                self.assertEqual(len(tickets), statuses.count(201) * 2)
+                self.assertEqual(
+                    find_drift([self.performance.id]), {}
+                )
+                self.assertEqual(
+                    Performance.objects.get(pk=self.performance.pk)
+                    .inventory.tickets_sold,
+                    len(tickets),
+                )
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.cache import get_catalog_cache
+from api.models import Genre, Play
+
+GENRE_URL = reverse("api:genre-list")
+PLAY_URL = reverse("api:play-list")
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        Genre.objects.create(name="Drama")
+        self.client.get(GENRE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(GENRE_URL)
+
+        self.assertEqual([genre["name"] for genre in res.data], ["Drama"])
+
+    def test_query_params_are_part_of_key(self):
+        Play.objects.create(name="Hamlet")
+        Play.objects.create(name="Macbeth")
+
+        self.client.get(PLAY_URL, {"name": "ham"})
+        res = self.client.get(PLAY_URL, {"name": "mac"})
+
+        self.assertEqual([play["name"] for play in res.data], ["Macbeth"])
+
+    def test_save_invalidates_cached_list(self):
+        genre = Genre.objects.create(name="Drama")
+        self.client.get(GENRE_URL)
+
+        genre.name = "Comedy"
+        genre.save()
+        res = self.client.get(GENRE_URL)
+
+        self.assertEqual([genre["name"] for genre in res.data], ["Comedy"])
+
+    def test_related_change_invalidates_plays(self):
+        play = Play.objects.create(name="Hamlet")
+        genre = Genre.objects.create(name="Drama")
+        self.client.get(PLAY_URL)
+
+        play.genres.add(genre)
+        res = self.client.get(PLAY_URL)
+        self.assertEqual(res.data[0]["genres"], ["Drama"])
+
+        genre.name = "Tragedy"
+        genre.save()
+        res = self.client.get(PLAY_URL)
+        self.assertEqual(res.data[0]["genres"], ["Tragedy"])
@@ -0,0 +1,133 @@
+import csv
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.exports import sold_tickets
+from api.models import Reservation, Ticket
+from api.tests.reservation_tests import sample_performance
+from user.authentication import add_claims
+
+
+def export_url(export_format):
+    return reverse("api:ticket-export", args=[export_format])
+
+
+class TicketExportTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.admin)
+
+        self.performance = sample_performance()
+        self.other_performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.admin)
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                performance=self.performance,
+                reservation=reservation,
+                row=1,
+                seat=seat,
+            )
+        Ticket.objects.create(
+            performance=self.other_performance,
+            reservation=reservation,
+            row=2,
+            seat=1,
+        )
+
+    def stream(self, export_format, **params):
+        response = self.client.get(export_url(export_format), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_per_performance(self):
+        rows = list(
+            csv.DictReader(
+                StringIO(self.stream("csv", performance=self.performance.id))
+            )
+        )
+
+        self.assertEqual([row["seat"] for row in rows], ["1", "2", "3"])
+        self.assertEqual(rows[0]["user"], "admin@theatre.com")
+        self.assertEqual(rows[0]["play"], "Sample play")
+
+    def test_ndjson_per_hall(self):
+        lines = self.stream(
+            "ndjson", theatre_hall=self.other_performance.theatre_hall_id
+        ).splitlines()
+
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record["performance"], self.other_performance.id)
+        self.assertEqual((record["row"], record["seat"]), (2, 1))
+
+    def test_date_range(self):
+        today = date.today().isoformat()
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        self.assertEqual(
+            len(self.stream("ndjson", date_from=today).splitlines()), 4
+        )
+        self.assertEqual(
+            len(self.stream("ndjson", date_to=today).splitlines()), 4
+        )
+        self.assertEqual(self.stream("ndjson", date_from=tomorrow), "")
+        self.assertEqual(self.stream("ndjson", date_to="2000-01-01"), "")
+
+        response = self.client.get(
+            export_url("csv"), {"date_from": today, "date_to": "2000-01-01"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_date_range_compares_the_column(self):
+        sql = str(
+            sold_tickets(
+                date_from=date(2024, 9, 1), date_to=date(2024, 9, 30)
+            ).query
+        )
+
+        self.assertIn('"api_reservation"."created_at" >= 2024-09-01', sql)
+        self.assertIn('"api_reservation"."created_at" < 2024-10-01', sql)
+
+    async def test_asgi_streams_asynchronously(self):
+        token = add_claims(AccessToken.for_user(self.admin), self.admin)
+        response = await self.async_client.get(
+            export_url("ndjson"),
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b"".join(lines).decode().count("\n"), 4)
+
+    def test_admin_only_and_known_formats(self):
+        self.assertEqual(self.client.get(export_url("xml")).status_code, 404)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "user@theatre.com",
+                "pass24word"
+            )
+        )
+        self.assertEqual(self.client.get(export_url("csv")).status_code, 403)
+
+    def test_command_streams_in_chunks(self):
+        out = StringIO()
+        call_command("export_tickets", "--chunk_size=1", stdout=out)
+
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(rows[0][:2], ["ticket", "reservation"])
+        self.assertEqual(len(rows), 5)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.cache import get_catalog_cache
+from api.fast_serializers import get_values_serializer
+from api.models import Actor, Genre, Play, Reservation, Ticket
+from api.serializers import (
+    PerformanceListSerializer,
+    PlayListDetailSerializer,
+    ReservationListSerializer,
+    TheatreHallSerializer,
+)
+from api.tests.reservation_tests import sample_performance
+
+PLAY_URL = reverse("api:play-list")
+PERFORMANCE_URL = reverse("api:performance-list")
+RESERVATION_URL = reverse("api:reservation-list")
+
+
+class FastSerializerParityTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+
+        drama = Genre.objects.create(name="Drama")
+        comedy = Genre.objects.create(name="Comedy")
+        actor = Actor.objects.create(first_name="Anna", last_name="Ørsted")
+        hamlet = Play.objects.create(name="Hamlet", description="Prince")
+        hamlet.genres.add(drama, comedy)
+        hamlet.actors.add(actor)
+        Play.objects.create(name="Empty", description=None)
+
+        performances = [
+            sample_performance(play=hamlet, show_time="2024-09-24 19:00"),
+            sample_performance(show_time="2024-09-25 19:30:15.5"),
+        ]
+        for index in range(3):
+            reservation = Reservation.objects.create(user=self.user)
+            for seat in range(1, index + 2):
+                Ticket.objects.create(
+                    reservation=reservation,
+                    performance=performances[index % 2],
+                    row=index + 1,
+                    seat=seat,
+                )
+        Reservation.objects.create(user=self.user)
+
+    def assert_same_content(self, url, params=None):
+        get_catalog_cache().clear()
+        with override_settings(API_FAST_SERIALIZERS=False):
+            expected = self.client.get(url, params)
+        get_catalog_cache().clear()
+        with override_settings(API_FAST_SERIALIZERS=True):
+            actual = self.client.get(url, params)
+
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_list_serializers_compile(self):
+        for serializer_class in (
+            PerformanceListSerializer,
+            PlayListDetailSerializer,
+            ReservationListSerializer,
+        ):
+            self.assertIsNotNone(get_values_serializer(serializer_class))
+
+    def test_property_field_is_not_compiled(self):
+        self.assertIsNone(get_values_serializer(TheatreHallSerializer))
+
+    def test_plays_identical(self):
+        self.assert_same_content(PLAY_URL)
+        self.assert_same_content(PLAY_URL, {"q": "hamlet"})
+
+    def test_performances_identical(self):
+        self.assert_same_content(PERFORMANCE_URL)
+        self.assert_same_content(PERFORMANCE_URL, {"page_size": 1})
+
+    def test_reservations_identical(self):
+        self.assert_same_content(RESERVATION_URL)
+        self.assert_same_content(RESERVATION_URL, {"page_size": 2})
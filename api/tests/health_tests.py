@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.db import pool_stats
+from user.authentication import add_claims
+
+HEALTH_URL = reverse("api:health")
+
+
+class HealthTest(TestCase):
+    def staff_token(self):
+        user = get_user_model().objects.create_superuser(
+            "admin@theatre.com", "pass24word"
+        )
+        return add_claims(AccessToken.for_user(user), user)
+
+    def test_health_without_credentials(self):
+        response = self.client.get(HEALTH_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"status": "ok"})
+
+    def test_staff_see_the_databases(self):
+        response = self.client.get(
+            HEALTH_URL, HTTP_AUTHORIZATION=f"Bearer {self.staff_token()}"
+        )
+
+        self.assertEqual(
+            response.data["databases"]["default"],
+            {"vendor": "sqlite", "available": True},
+        )
+
+    def test_database_errors_are_only_logged(self):
+        token = self.staff_token()
+        with mock.patch(
+            "django.db.backends.utils.CursorWrapper.execute",
+            side_effect=OperationalError("could not connect to db.internal"),
+        ), self.assertLogs("api.db", "ERROR") as logs:
+            response = self.client.get(
+                HEALTH_URL, HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.data["databases"]["default"],
+            {"vendor": "sqlite", "available": False},
+        )
+        self.assertNotIn("db.internal", response.content.decode())
+        self.assertIn("db.internal", "\n".join(logs.output))
+
+    def test_pool_saturation(self):
+        pool = SimpleNamespace(
+            min_size=2,
+            max_size=8,
+            get_stats=lambda: {
+                "pool_size": 4,
+                "pool_available": 1,
+                "requests_waiting": 0,
+            },
+        )
+
+        self.assertEqual(
+            pool_stats(SimpleNamespace(pool=pool)),
+            {
+                "min_size": 2,
+                "max_size": 8,
+                "size": 4,
+                "in_use": 3,
+                "waiting": 0,
+                "saturation": 0.375,
+            },
+        )
+        self.assertIsNone(pool_stats(SimpleNamespace()))
@@ -0,0 +1,167 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import booking
+from api.holds import MemoryHoldStore, new_hold
+from api.models import Reservation, Ticket
+from api.tests.reservation_tests import RESERVATION_URL, sample_performance
+
+
+def holds_url(performance_id):
+    return reverse("api:performance-holds", args=[performance_id])
+
+
+def release_url(performance_id, hold_id):
+    return reverse(
+        "api:performance-release-hold", args=[performance_id, hold_id]
+    )
+
+
+class SeatHoldTest(TestCase):
+    def setUp(self):
+        self.store = MemoryHoldStore()
+        patcher = mock.patch("api.holds._store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(
+            get_user_model().objects.create_user(
+                "other@theatre.com",
+                "pass24word"
+            )
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def hold(self, client, seats):
+        payload = {
+            "seats": [{"row": row, "seat": seat} for row, seat in seats]
+        }
+        return client.post(
+            holds_url(self.performance.id), payload, format="json"
+        )
+
+    def test_hold_and_confirm(self):
+        hold = self.hold(self.client, [(1, 1), (1, 2)])
+        self.assertEqual(hold.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(
+            RESERVATION_URL, {"hold": hold.data["id"]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [
+                (ticket["row"], ticket["seat"])
+                for ticket in res.data["tickets"]
+            ],
+            [(1, 1), (1, 2)],
+        )
+
+    def test_held_seat_conflicts(self):
+        self.hold(self.client, [(1, 1)])
+
+        res = self.hold(self.other_client, [(1, 2), (1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["seats"], [{"row": 1, "seat": 1}])
+
+    def test_held_seat_can_not_be_reserved_by_others(self):
+        self.hold(self.client, [(1, 1)])
+
+        res = self.other_client.post(
+            RESERVATION_URL,
+            {"tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id}
+            ]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_hold_taken_during_a_booking_fails_the_booking(self):
+        insert_tickets = booking.insert_tickets
+
+        def hold_after_check(reservation, tickets_data):
+            self.store.acquire(
+                new_hold(self.user.id, self.performance.id, [(1, 1)])
+            )
+            return insert_tickets(reservation, tickets_data)
+
+        with mock.patch(
+            "api.booking.insert_tickets", side_effect=hold_after_check
+        ):
+            res = self.other_client.post(
+                RESERVATION_URL,
+                {"tickets": [
+                    {"row": 1, "seat": 1, "performance": self.performance.id}
+                ]},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"],
+            [{"non_field_errors": [booking.SEAT_HELD_MESSAGE]}],
+        )
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_hold_of_a_sold_seat_is_released(self):
+        Ticket.objects.create(
+            performance=self.performance,
+            reservation=Reservation.objects.create(user=self.user),
+            row=1,
+            seat=1,
+        )
+
+        res = self.hold(self.client, [(1, 1), (1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["seats"], [{"row": 1, "seat": 1}])
+        self.assertEqual(
+            self.store.holders(self.performance.id, [(1, 1), (1, 2)]), {}
+        )
+
+    def test_hold_of_other_user_can_not_be_confirmed(self):
+        hold = self.hold(self.client, [(1, 1)])
+
+        res = self.other_client.post(
+            RESERVATION_URL, {"hold": hold.data["id"]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_release_hold(self):
+        hold = self.hold(self.client, [(1, 1)])
+
+        res = self.client.delete(
+            release_url(self.performance.id, hold.data["id"])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.hold(self.other_client, [(1, 1)]).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_sweeper_reaps_expired_holds(self):
+        hold = new_hold(self.user.id, self.performance.id, [(2, 2)], ttl=1)
+        self.store.acquire(hold)
+
+        with mock.patch("api.holds.time.time", return_value=time.time() + 2):
+            self.assertEqual(self.store.sweep(), 1)
+
+        self.assertEqual(self.store.holders(self.performance.id, [(2, 2)]), {})
@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    SeatInventory,
+    TheatreHall,
+)
+
+
+def season_record(day, play="Hamlet", **params):
+    record = {
+        "play": play,
+        "description": "Prince of Denmark",
+        "genres": ["Drama", "Tragedy"],
+        "actors": ["Anna Orsted", "Ivan Franko"],
+        "theatre_hall": "Blue",
+        "rows": 10,
+        "seats_in_row": 12,
+        "show_time": f"2024-09-{day:02d}T19:00",
+    }
+    record.update(params)
+    return record
+
+
+class ImportCatalogTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_jsonl(self, records):
+        path = os.path.join(self.directory, "season.jsonl")
+        with open(path, "w") as season_file:
+            for record in records:
+                season_file.write(json.dumps(record) + "\n")
+        return path
+
+    def import_catalog(self, path, *args):
+        out = StringIO()
+        call_command("import_catalog", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_resolves_natural_keys(self):
+        Genre.objects.create(name="Drama")
+        path = self.write_jsonl(
+            [
+                season_record(1),
+                season_record(2),
+                season_record(
+                    3, play="Viy", genres=["Horror"], actors=["Anna Orsted"]
+                ),
+            ]
+        )
+        self.import_catalog(path)
+
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(Actor.objects.count(), 2)
+        self.assertEqual(TheatreHall.objects.get().capacity, 120)
+        hamlet = Play.objects.get(name="Hamlet")
+        self.assertEqual(
+            sorted(hamlet.genres.values_list("name", flat=True)),
+            ["Drama", "Tragedy"],
+        )
+        self.assertEqual(
+            list(
+                Play.objects.get(name="Viy").actors.values_list(
+                    "last_name", flat=True
+                )
+            ),
+            ["Orsted"],
+        )
+        self.assertEqual(hamlet.performances.count(), 2)
+        self.assertEqual(SeatInventory.objects.count(), 3)
+
+    def test_import_is_idempotent(self):
+        path = self.write_jsonl([season_record(day) for day in (1, 2)])
+        self.import_catalog(path)
+        output = self.import_catalog(path, "--restart")
+
+        self.assertIn("Created 0 genres, 0 actors", output)
+        self.assertEqual(Performance.objects.count(), 2)
+        self.assertEqual(Play.genres.through.objects.count(), 2)
+
+    def test_queries_do_not_grow_with_records(self):
+        def count_queries(days):
+            # Nothing in common with the other import
+            tag = len(days)
+            path = self.write_jsonl(
+                [
+                    season_record(
+                        day,
+                        play=f"Play {tag}",
+                        genres=[f"Genre {tag}"],
+                        actors=[f"Actor {tag}"],
+                        theatre_hall=f"Hall {tag}",
+                    )
+                    for day in days
+                ]
+            )
+            with CaptureQueriesContext(connection) as queries:
+                self.import_catalog(path)
+            return len(queries)
+
+        self.assertEqual(
+            count_queries(range(1, 3)), count_queries(range(1, 29))
+        )
+
+    def test_csv(self):
+        path = os.path.join(self.directory, "season.csv")
+        with open(path, "w", newline="") as season_file:
+            writer = csv.DictWriter(season_file, season_record(1))
+            writer.writeheader()
+            writer.writerow(
+                {
+                    **season_record(1),
+                    "genres": "Drama|Tragedy",
+                    "actors": "Anna Orsted",
+                }
+            )
+        self.import_catalog(path)
+
+        self.assertEqual(Play.objects.get().genres.count(), 2)
+        self.assertEqual(Performance.objects.count(), 1)
+
+    def test_failed_import_resumes_from_checkpoint(self):
+        records = [season_record(day) for day in (1, 2)]
+        records.append(season_record(3, show_time="tomorrow"))
+        path = self.write_jsonl(records)
+
+        with self.assertRaisesMessage(CommandError, "Record 3"):
+            self.import_catalog(path, "--batch_size=2")
+        self.assertEqual(Performance.objects.count(), 2)
+        with open(f"{path}.checkpoint") as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)["line"], 2)
+
+        with self.assertRaisesMessage(CommandError, "Record 3"):
+            call_command(
+                "import_catalog", path, "--batch_size=2", stdout=StringIO()
+            )
+
+        self.write_jsonl(records[:2] + [season_record(3)])
+        output = self.import_catalog(path, "--batch_size=2")
+        self.assertIn("from the start", output)
+        self.assertEqual(Performance.objects.count(), 3)
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.views import PerformanceViewSet, ReservationViewSet
+
+
+def view_queryset(viewset_class, user, params):
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = viewset_class(request=request, action="list")
+    return view.get_queryset()
+
+
+class QueryPlanIndexTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+
+    def test_date_filter_uses_show_time_index(self):
+        queryset = view_queryset(
+            PerformanceViewSet, self.user, {"date": "2024-09-24"}
+        )
+
+        self.assertIn("api_perf_show_time_idx", queryset.explain())
+
+    def test_user_reservations_use_composite_index(self):
+        queryset = view_queryset(ReservationViewSet, self.user, {})
+
+        plan = queryset.explain()
+
+        self.assertIn("api_reserv_user_created_idx", plan)
+        self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)
@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Reservation, SeatInventory, Ticket
+from api.tests.reservation_tests import RESERVATION_URL, sample_performance
+
+
+def performance_detail_url(performance_id):
+    return reverse("api:performance-detail", args=[performance_id])
+
+
+class SeatInventoryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def test_inventory_created_with_performance(self):
+        self.assertEqual(self.performance.inventory.tickets_sold, 0)
+
+    def test_reservation_updates_tickets_available(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "performance": self.performance.id}
+                for seat in range(1, 4)
+            ]
+        }
+        self.client.post(RESERVATION_URL, payload, format="json")
+
+        res = self.client.get(performance_detail_url(self.performance.id))
+
+        self.assertEqual(res.data["tickets_available"], 97)
+
+    def test_deleting_reservation_releases_seats(self):
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.create(
+            reservation=reservation, performance=self.performance,
+            row=1, seat=1
+        )
+        reservation.delete()
+
+        self.performance.inventory.refresh_from_db()
+        self.assertEqual(self.performance.inventory.tickets_sold, 0)
+
+    def tickets_sold(self, performance):
+        return SeatInventory.objects.get(performance=performance).tickets_sold
+
+    def test_ticket_saved_outside_booking_is_counted(self):
+        ticket = Ticket.objects.create(
+            reservation=Reservation.objects.create(user=self.user),
+            performance=self.performance,
+            row=1,
+            seat=1,
+        )
+        self.assertEqual(self.tickets_sold(self.performance), 1)
+
+        ticket.delete()
+        self.assertEqual(self.tickets_sold(self.performance), 0)
+
+    def test_moved_ticket_moves_its_count(self):
+        ticket = Ticket.objects.create(
+            reservation=Reservation.objects.create(user=self.user),
+            performance=self.performance,
+            row=1,
+            seat=1,
+        )
+        other = sample_performance()
+
+        ticket.performance = other
+        ticket.save()
+        ticket.save()
+
+        self.assertEqual(self.tickets_sold(self.performance), 0)
+        self.assertEqual(self.tickets_sold(other), 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        reservation = Reservation.objects.create(user=self.user)
+        Ticket.objects.bulk_create(
+            Ticket(
+                reservation=reservation, performance=self.performance,
+                row=2, seat=seat
+            )
+            for seat in range(1, 6)
+        )
+
+        with self.assertRaises(SystemExit):
+            call_command("rebuild_inventory", "--check", stdout=StringIO())
+        call_command("rebuild_inventory", stdout=StringIO())
+
+        self.assertEqual(
+            SeatInventory.objects.get(
+                performance=self.performance
+            ).tickets_sold,
+            5,
+        )
+        call_command("rebuild_inventory", "--check", stdout=StringIO())
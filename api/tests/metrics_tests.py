@@ -0,0 +1,232 @@
+from itertools import product
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.booking import STRATEGIES
+from api.cache import get_catalog_cache
+from api.metrics import registry
+from api.models import Actor, Genre, Reservation, ScheduleSnapshot, Ticket
+from api.tests.query_budget import QueryBudgetMixin
+from api.tests.reservation_tests import sample_performance
+from api.views import PerformanceViewSet
+from user.authentication import StatelessJWTAuthentication
+
+METRICS_URL = reverse("metrics")
+HALL_URL = reverse("api:theatrehall-list")
+PERFORMANCE_URL = reverse("api:performance-list")
+RESERVATION_URL = reverse("api:reservation-list")
+AUTHENTICATION_CLASSES = (JWTAuthentication, StatelessJWTAuthentication)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        registry.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        sample_performance()
+
+    def test_server_timing(self):
+        response = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(response.metrics.view, "PerformanceViewSet.list")
+        self.assertEqual(response.metrics.queries, 1)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, '
+            r"total;dur=[\d.]+$",
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_prometheus_endpoint(self):
+        self.client.get(PERFORMANCE_URL)
+        self.client.get("/api/missing/")
+
+        body = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        ).content.decode()
+        self.assertIn(
+            'http_requests_total{view="PerformanceViewSet.list",'
+            'method="GET",status="200"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_requests_total{view="unmatched",method="GET",'
+            'status="404"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view='
+            '"PerformanceViewSet.list",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn(
+            'db_queries_total{view="PerformanceViewSet.list"} 1', body
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(
+            self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer wrong"
+            ).status_code,
+            403,
+        )
+
+        response = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_closed_without_token(self):
+        self.client.force_authenticate(None)
+
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+    async def test_async_requests_count_their_queries(self):
+        token = AccessToken.for_user(self.user)
+
+        with mock.patch(
+            "rest_framework.views.APIView.authentication_classes",
+            (JWTAuthentication,),
+        ):
+            response = await AsyncClient().get(
+                HALL_URL, headers={"Authorization": f"Bearer {token}"}
+            )
+
+        # The user row and the halls, run on the sync_to_async thread
+        self.assertEqual(response.metrics.queries, 2)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    def test_over_budget_is_logged_and_counted(self):
+        budgets = {**PerformanceViewSet.query_budgets, "list": 0}
+        with mock.patch.object(
+            PerformanceViewSet, "query_budgets", budgets
+        ), mock.patch.object(
+            PerformanceViewSet,
+            "authentication_classes",
+            (StatelessJWTAuthentication,),
+        ), self.assertLogs("api.metrics", "WARNING") as logs:
+            self.client.get(PERFORMANCE_URL)
+
+        self.assertIn("PerformanceViewSet.list ran 1 queries", logs.output[0])
+        self.assertIn(
+            'query_budget_exceeded_total{view="PerformanceViewSet.list"} 1',
+            registry.render(),
+        )
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Budgets of the real request paths, authenticated with a JWT like
+    the clients are, with and without stateless authentication
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        caches["state"].clear()
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            "admin@theatre.com",
+            "pass24word"
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        self.performances = [
+            sample_performance(show_time=f"2024-09-24 1{hour}:00")
+            for hour in range(3)
+        ]
+        for performance in self.performances:
+            performance.play.genres.add(Genre.objects.create(name="Drama"))
+            performance.play.actors.add(
+                Actor.objects.create(first_name="Anna", last_name="Orsted")
+            )
+            reservation = Reservation.objects.create(user=self.user)
+            Ticket.objects.create(
+                performance=performance, reservation=reservation, row=1, seat=1
+            )
+
+    @staticmethod
+    def authenticated_with(authentication):
+        return mock.patch(
+            "rest_framework.views.APIView.authentication_classes",
+            (authentication,),
+        )
+
+    def test_catalog_reads(self):
+        performance = self.performances[0]
+        for (url_name, kwargs, params), authentication in product(
+            (
+                ("genre-list", {}, None),
+                ("actor-list", {}, None),
+                ("theatrehall-list", {}, None),
+                ("play-list", {}, None),
+                ("play-detail", {"pk": performance.play_id}, None),
+                ("performance-list", {}, None),
+                ("performance-list", {}, {"date": "2024-09-24"}),
+                ("performance-detail", {"pk": performance.id}, None),
+                ("performance-seats", {"pk": performance.id}, None),
+            ),
+            AUTHENTICATION_CLASSES,
+        ):
+            with self.subTest(
+                url_name, params=params, authentication=authentication
+            ), self.authenticated_with(authentication):
+                get_catalog_cache().clear()
+                ScheduleSnapshot.objects.all().delete()
+                response = self.assertWithinQueryBudget(
+                    "get", reverse(f"api:{url_name}", kwargs=kwargs), params
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_reservations(self):
+        booking_modes = [
+            {"STRATEGY": strategy} for strategy in STRATEGIES
+        ] + [{"QUEUED": True}]
+        for row, (booking, authentication) in enumerate(
+            product(booking_modes, AUTHENTICATION_CLASSES), start=2
+        ):
+            with self.subTest(
+                booking=booking, authentication=authentication
+            ), self.authenticated_with(
+                authentication
+            ), override_settings(BOOKING=booking):
+                response = self.assertWithinQueryBudget(
+                    "post",
+                    RESERVATION_URL,
+                    {
+                        "tickets": [
+                            {
+                                "row": row,
+                                "seat": seat,
+                                "performance": self.performances[0].id,
+                            }
+                            for seat in range(1, 6)
+                        ]
+                    },
+                    format="json",
+                )
+                self.assertIn(response.status_code, (201, 202))
+
+                response = self.assertWithinQueryBudget(
+                    "get", RESERVATION_URL
+                )
+                self.assertEqual(response.status_code, 200)
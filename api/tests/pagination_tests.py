@@ -0,0 +1,108 @@
+import json
+from base64 import b64encode
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Reservation
+from api.tests.reservation_tests import sample_performance
+
+RESERVATION_URL = reverse("api:reservation-list")
+PERFORMANCE_URL = reverse("api:performance-list")
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+
+        created_at = datetime(2024, 9, 1, 12, 0)
+        reservations = [
+            Reservation.objects.create(user=self.user) for _ in range(5)
+        ]
+        # Same created_at everywhere, the id must break the tie
+        Reservation.objects.update(created_at=created_at)
+        self.reservation_ids = sorted(
+            (reservation.id for reservation in reservations), reverse=True
+        )
+
+    def walk(self, url, params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            pages.append([item["id"] for item in response.data["results"]])
+            if not response.data["next"]:
+                return pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_pages_follow_created_at_and_id(self):
+        pages, last = self.walk(RESERVATION_URL, {"page_size": 2})
+
+        self.assertEqual(
+            pages,
+            [
+                self.reservation_ids[:2],
+                self.reservation_ids[2:4],
+                self.reservation_ids[4:],
+            ],
+        )
+
+        previous = self.client.get(last.data["previous"])
+        self.assertEqual(
+            [item["id"] for item in previous.data["results"]],
+            self.reservation_ids[2:4],
+        )
+        self.assertIsNone(
+            self.client.get(previous.data["previous"]).data["previous"]
+        )
+
+    def test_deep_page_costs_no_count_or_offset(self):
+        first = self.client.get(RESERVATION_URL, {"page_size": 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(RESERVATION_URL, {"cursor": "garbage"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_position_is_not_found(self):
+        for position in (
+            ["yesterday", 1],
+            ["2024-09-01T12:00:00", "one"],
+            ["2024-09-01T12:00:00", None],
+            [["2024"], {"id": 1}],
+        ):
+            with self.subTest(position):
+                cursor = b64encode(
+                    urlencode({"p": json.dumps(position)}).encode()
+                ).decode()
+
+                response = self.client.get(
+                    RESERVATION_URL, {"cursor": cursor}
+                )
+
+                self.assertEqual(response.status_code, 404)
+
+    def test_performances_ordered_by_show_time(self):
+        late = sample_performance(show_time="2024-09-25 19:00")
+        early = sample_performance(show_time="2024-09-24 19:00")
+
+        pages, _ = self.walk(PERFORMANCE_URL, {"page_size": 1})
+
+        self.assertEqual(pages, [[early.id], [late.id]])
@@ -116,6 +116,35 @@ class AuthenticatedPlayTest(TestCase):
         self.assertIn(serializer2.data, response.data)
         self.assertNotIn(serializer3.data, response.data)
 
+    def test_filter_by_all_genres(self):
+        genre_1 = Genre.objects.create(name="Genre_1")
+        genre_2 = Genre.objects.create(name="Genre_2")
+
+        play_1 = sample_play(name="Sample play 1")
+        play_1.genres.add(genre_1, genre_2)
+
+        play_2 = sample_play(name="Sample play 2")
+        play_2.genres.add(genre_1)
+
+        response = self.client.get(
+            PLAY_URL, {"genres": f"{genre_1.id},{genre_2.id}",
+                       "genres_mode": "all"}
+        )
+
+        serializer1 = PlayListDetailSerializer(play_1)
+
+        self.assertEqual(response.data, [serializer1.data])
+
+    def test_filter_plays_by_unknown_genres_mode(self):
+        genre = Genre.objects.create(name="Genre")
+
+        response = self.client.get(
+            PLAY_URL, {"genres": genre.id, "genres_mode": "every"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("genres_mode", response.data)
+
     def test_create_play_forbidden(self):
         payload = {
             "name": "Movie",
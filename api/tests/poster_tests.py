@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.posters import supported_formats
+from api.storage import poster_storage
+from api.tests.reservation_tests import sample_performance
+from api.views import serve_media
+
+PERFORMANCE_URL = reverse("api:performance-list")
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def upload_image_url(performance_id):
+    return reverse("api:performance-upload-image", args=[performance_id])
+
+
+def sample_poster(size=(1200, 800), color="red"):
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG", exif=exif)
+    return SimpleUploadedFile(
+        "poster.jpg", buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    POSTER_PIPELINE={
+        "QUEUE": "api.posters.SyncQueue",
+        "SIZES": {"thumbnail": 320},
+        "FORMATS": ["webp", "avif"],
+    },
+)
+class PosterPipelineTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                "admin@theatre.com",
+                "pass24word"
+            )
+        )
+        self.performance = sample_performance()
+
+    def upload(self, performance=None, poster=None):
+        performance = performance or self.performance
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                upload_image_url(performance.id),
+                {"poster": poster or sample_poster()},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200)
+        performance.refresh_from_db()
+        return performance.poster_variants
+
+    def test_unsupported_formats_are_skipped(self):
+        self.assertIn("webp", supported_formats())
+        self.assertNotIn("tiff", supported_formats())
+
+    def test_thumbnail_is_resized_without_metadata(self):
+        variants = self.upload()
+
+        self.assertEqual(set(variants), {"thumbnail"})
+        self.assertEqual(set(variants["thumbnail"]), set(supported_formats()))
+        with poster_storage().open(variants["thumbnail"]["webp"]) as file:
+            with Image.open(file) as thumbnail:
+                self.assertEqual(thumbnail.format, "WEBP")
+                self.assertEqual(thumbnail.size, (320, 213))
+                self.assertFalse(thumbnail.getexif())
+
+    def test_same_poster_is_stored_once(self):
+        other = sample_performance()
+        variants = self.upload()
+        other_variants = self.upload(other)
+
+        other.refresh_from_db()
+        self.assertEqual(other.poster.name, self.performance.poster.name)
+        self.assertEqual(other_variants, variants)
+        blobs = os.listdir(os.path.dirname(self.performance.poster.path))
+        self.assertEqual(blobs, [os.path.basename(other.poster.name)])
+
+    def test_gc_deletes_only_orphans(self):
+        old_variants = self.upload()
+        old_poster = self.performance.poster.name
+        self.upload(poster=sample_poster(color="blue"))
+        # Uploaded before content addressing, not collected
+        legacy = "uploads/posters/play-legacy.jpg"
+        with open(poster_storage().path(legacy), "wb") as file:
+            file.write(b"legacy")
+
+        call_command("gc_posters", grace_seconds=3600, stdout=StringIO())
+        self.assertTrue(poster_storage().exists(old_poster))
+
+        call_command("gc_posters", grace_seconds=-60, stdout=StringIO())
+        self.assertFalse(poster_storage().exists(old_poster))
+        self.assertFalse(
+            poster_storage().exists(old_variants["thumbnail"]["webp"])
+        )
+        self.assertTrue(poster_storage().exists(legacy))
+        self.assertTrue(
+            poster_storage().exists(self.performance.poster.name)
+        )
+        for name in self.performance.poster_variants["thumbnail"].values():
+            self.assertTrue(poster_storage().exists(name))
+
+    def test_digest_urls_are_immutable(self):
+        self.upload()
+        response = serve_media(
+            RequestFactory().get("/"),
+            self.performance.poster.name,
+            document_root=MEDIA_ROOT,
+        )
+
+        self.assertEqual(
+            response["Cache-Control"],
+            "public, max-age=31536000, immutable",
+        )
+
+    def test_list_shows_variant_urls(self):
+        name = self.upload()["thumbnail"]["webp"]
+
+        response = self.client.get(PERFORMANCE_URL)
+        self.assertEqual(
+            response.json()["results"][0]["poster_variants"],
+            {"thumbnail": {"webp": poster_storage().url(name)}},
+        )
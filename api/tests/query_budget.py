@@ -0,0 +1,27 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Requests made with ``assertWithinQueryBudget`` fail the test when
+    they run more SQL queries than the ``query_budgets`` of their view
+    """
+
+    def assertWithinQueryBudget(self, method, path, data=None, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, **extra)
+
+        metrics = response.metrics
+        if metrics.budget is None:
+            self.fail(f"{metrics.view} declares no query budget")
+        if metrics.queries > metrics.budget:
+            executed = "\n".join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(queries, start=1)
+            )
+            self.fail(
+                f"{metrics.view} ran {metrics.queries} queries, its "
+                f"budget is {metrics.budget}:\n{executed}"
+            )
+        return response
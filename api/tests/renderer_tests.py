@@ -0,0 +1,59 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+SAMPLE = {
+    "id": 1,
+    "play": "Ромео і Джульєтта",
+    "show_time": datetime(2024, 9, 24, 19, 0, 5, 123456),
+    "created_at": datetime(2024, 9, 24, 19, 0),
+    "date": date(2024, 9, 24),
+    "price": Decimal("12.50"),
+    "label": gettext_lazy("Hall"),
+    "separator": "line\u2028paragraph\u2029",
+    "seats": {1: [1, 2], 2: []},
+    "empty": None,
+}
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE),
+        )
+
+    def test_indent_falls_back_to_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, "application/json; indent=2"),
+            JSONRenderer().render(SAMPLE, "application/json; indent=2"),
+        )
+
+    def test_unsupported_integer_falls_back(self):
+        data = {"big": 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def test_parse(self):
+        stream = io.BytesIO('{"tickets": [{"row": 1}], "name": "Ї"}'.encode())
+
+        self.assertEqual(
+            FastJSONParser().parse(stream),
+            {"tickets": [{"row": 1}], "name": "Ї"},
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{nope"))
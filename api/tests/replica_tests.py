@@ -0,0 +1,165 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.http import HttpRequest
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Play
+from api.replicas import (
+    ReplicaRouter,
+    _read_only_request,
+    _ReadOnlyRequest,
+    _ReplicaLag,
+    replica_lag,
+    select_replica,
+)
+from api.tests.async_view_tests import ASYNC_URLCONF
+from api.tests.reservation_tests import sample_performance
+from user.authentication import StatelessJWTAuthentication
+
+PLAY_URL = reverse("api:play-list")
+PERFORMANCE_URL = reverse("api:performance-list")
+RESERVATION_URL = reverse("api:reservation-list")
+
+REPLICA = "replica"
+
+
+@override_settings(
+    DB_REPLICAS={
+        "ALIASES": [REPLICA],
+        "STICKY_SECONDS": 5,
+        "CACHE_ALIAS": "default",
+    }
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    A second SQLite database stands in for the replica. It is added
+    after the test class set up, the test runner only knows databases
+    from the settings.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings[REPLICA] = connections.configure_settings(
+            {
+                "default": connections.settings["default"],
+                REPLICA: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": ":memory:",
+                },
+            }
+        )[REPLICA]
+        cls.databases = cls.databases | {REPLICA}
+        connections[REPLICA].creation.create_test_db(verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].creation.destroy_test_db(
+            ":memory:", verbosity=0
+        )
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        # Users stuck to the primary by the previous tests
+        caches["default"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def test_reads_of_safe_requests_go_to_replica(self):
+        # Nothing was written to the replica
+        response = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+    def test_writes_stay_on_primary_and_user_sticks_to_it(self):
+        response = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": 1,
+                        "performance": self.performance.id,
+                    }
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(RESERVATION_URL)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        other_user = get_user_model().objects.create_user(
+            "other@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(other_user)
+        response = self.client.get(PERFORMANCE_URL)
+        self.assertEqual(response.data["results"], [])
+
+    def test_stickiness_is_looked_up_once_per_request(self):
+        with mock.patch(
+            "api.replicas.is_sticky", return_value=True
+        ) as is_sticky:
+            response = self.client.get(RESERVATION_URL)
+
+        self.assertEqual(response.status_code, 200)
+        is_sticky.assert_called_once_with(self.user.id)
+
+    def test_async_search_measures_lag_off_the_event_loop(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        # The replica has no user rows, lag checks open a cursor as they
+        # do on PostgreSQL
+        with ASYNC_URLCONF, mock.patch(
+            "rest_framework.views.APIView.authentication_classes",
+            (StatelessJWTAuthentication,),
+        ), mock.patch.dict(
+            _ReplicaLag.QUERY, {"sqlite": "SELECT 0"}
+        ), mock.patch.object(replica_lag, "_lags", {}):
+            response = self.client.get(PLAY_URL, {"name": "Sample"})
+
+        self.assertNotIsInstance(response, Response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_reads_outside_safe_requests_use_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Play), "default")
+
+        token = _read_only_request.set(_ReadOnlyRequest(HttpRequest()))
+        try:
+            self.assertEqual(router.db_for_read(Play), REPLICA)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Play), "default")
+        finally:
+            _read_only_request.reset(token)
+        self.assertEqual(router.db_for_write(Play), "default")
+
+    def test_replica_selection(self):
+        aliases = [REPLICA, "default"]
+        self.assertEqual(
+            {select_replica(aliases) for _ in range(4)}, set(aliases)
+        )
+        with self.settings(
+            DB_REPLICAS={"ALIASES": aliases, "SELECTION": "least_lag"}
+        ):
+            self.assertEqual(select_replica(aliases), REPLICA)
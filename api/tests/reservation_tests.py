@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import (
+    Play,
+    Performance,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+
+RESERVATION_URL = reverse("api:reservation-list")
+
+
+def sample_performance(**params):
+    theatre_hall = TheatreHall.objects.create(
+        name="Blue", rows=10, seats_in_row=10
+    )
+    defaults = {
+        "show_time": "2024-09-24 14:00",
+        "play": Play.objects.create(name="Sample play"),
+        "theatre_hall": theatre_hall,
+    }
+    defaults.update(params)
+
+    return Performance.objects.create(**defaults)
+
+
+class ReservationCreateTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def reserve(self, seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(RESERVATION_URL, payload, format="json")
+
+    def test_group_booking_costs_constant_queries(self):
+        seats = [(row, seat) for row in range(1, 5) for seat in range(1, 11)]
+
+        # performance lookup, conflict check, reservation and ticket
+        # INSERTs, the savepoints around them, the inventory counter and
+        # the response tickets read (the schedule waits for the commit)
+        with self.assertNumQueries(10):
+            res = self.reserve(seats)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ticket.objects.filter(performance=self.performance).count(), 40
+        )
+
+    def test_taken_seat_rejected(self):
+        self.reserve([(1, 1)])
+
+        res = self.reserve([(1, 2), (1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"],
+            [
+                {},
+                {
+                    "non_field_errors": [
+                        "The fields performance, row, seat "
+                        "must make a unique set."
+                    ]
+                },
+            ],
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_duplicate_seat_in_request_rejected(self):
+        res = self.reserve([(2, 2), (2, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_seat_out_of_hall_range_keeps_error_payload(self):
+        res = self.reserve([(11, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"][0]["row"],
+            ["row number must be in available range: (1, rows): (1, 10)"],
+        )
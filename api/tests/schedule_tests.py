@@ -0,0 +1,218 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.cache import get_catalog_cache
+from api.models import Reservation, ScheduleSnapshot, Ticket
+from api.tests.reservation_tests import RESERVATION_URL, sample_performance
+from api.views import PerformanceViewSet
+
+PERFORMANCE_URL = reverse("api:performance-list")
+DAY = "2024-09-24"
+
+
+class ScheduleSnapshotTest(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance(show_time=f"{DAY} 14:00")
+
+    def schedule(self, day=DAY, **headers):
+        return self.client.get(PERFORMANCE_URL, {"date": day}, **headers)
+
+    def results(self, response):
+        return json.loads(response.content)["results"]
+
+    def sell(self, seats):
+        reservation = Reservation.objects.create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for row, seat in seats:
+                Ticket.objects.create(
+                    performance=self.performance,
+                    reservation=reservation,
+                    row=row,
+                    seat=seat,
+                )
+
+    def test_whole_day_is_served_from_the_snapshot(self):
+        play = self.performance.play
+        for hour in range(25):
+            sample_performance(
+                play=play, show_time=f"{DAY} {hour % 24:02}:{hour // 24:02}"
+            )
+        sample_performance(play=play, show_time="2024-09-25 14:00")
+
+        response = self.schedule()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(response.content)
+        self.assertIsNone(data["next"])
+        self.assertEqual(len(data["results"]), 26)
+        show_times = [row["show_time"] for row in data["results"]]
+        self.assertEqual(show_times, sorted(show_times))
+
+        with self.assertNumQueries(1):
+            cached = self.schedule()
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_same_rows_as_the_paginated_list(self):
+        paginated = self.client.get(
+            PERFORMANCE_URL, {"date": DAY, "page_size": 20}
+        )
+
+        self.assertNotIn("ETag", paginated)
+        self.assertEqual(self.results(self.schedule()), paginated.json()[
+            "results"
+        ])
+
+    def test_conditional_get(self):
+        etag = self.schedule()["ETag"]
+
+        response = self.schedule(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_sales_refresh_the_day(self):
+        etag = self.schedule()["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": 1,
+                            "seat": 1,
+                            "performance": self.performance.id,
+                        }
+                    ]
+                },
+                format="json",
+            )
+
+        response = self.schedule(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.results(response)[0]["tickets_available"], 99)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.all().delete()
+        self.assertEqual(
+            self.results(self.schedule())[0]["tickets_available"], 100
+        )
+
+    def test_moved_performance_leaves_its_old_day(self):
+        self.schedule()
+        self.schedule("2024-09-25")
+
+        self.performance.show_time = "2024-09-25 19:00"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performance.save()
+
+        self.assertEqual(self.results(self.schedule()), [])
+        self.assertEqual(
+            [row["id"] for row in self.results(self.schedule("2024-09-25"))],
+            [self.performance.id],
+        )
+
+    def test_renamed_play_refreshes_every_day(self):
+        self.schedule()
+
+        self.performance.play.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performance.play.save()
+
+        self.assertEqual(self.results(self.schedule())[0]["play"], "Renamed")
+
+    @override_settings(SCHEDULE_SNAPSHOTS={"AVAILABILITY_STEP": 10})
+    def test_availability_buckets_limit_refreshes(self):
+        self.assertEqual(
+            self.results(self.schedule())[0]["tickets_available"], 100
+        )
+
+        self.sell([(1, 1)])
+        self.assertEqual(
+            self.results(self.schedule())[0]["tickets_available"], 90
+        )
+        generation = ScheduleSnapshot.objects.get().generation
+
+        self.sell([(1, seat) for seat in range(2, 10)])
+        self.assertEqual(ScheduleSnapshot.objects.get().generation, generation)
+
+        self.sell([(1, 10), (2, 1)])
+        self.assertEqual(
+            self.results(self.schedule())[0]["tickets_available"], 80
+        )
+
+    def test_changes_wait_for_the_commit(self):
+        self.schedule()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ticket.objects.create(
+                performance=self.performance,
+                reservation=Reservation.objects.create(user=self.user),
+                row=1,
+                seat=1,
+            )
+            self.performance.theatre_hall.save()
+
+        self.assertEqual(ScheduleSnapshot.objects.get().generation, 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ScheduleSnapshot.objects.get().generation, 2)
+
+    def test_other_lists_skip_the_snapshot(self):
+        for params in (
+            {"date": DAY, "name": "Sample"},
+            {"date": DAY, "page_size": 5},
+            {"date": DAY, "format": "api"},
+        ):
+            with self.subTest(params):
+                response = self.client.get(PERFORMANCE_URL, params)
+                self.assertNotIn("ETag", response)
+        self.assertFalse(ScheduleSnapshot.objects.exists())
+
+    @override_settings(SCHEDULE_SNAPSHOTS={"ENABLED": False})
+    def test_disabled(self):
+        response = self.schedule()
+
+        self.assertNotIn("ETag", response)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+class ScheduleSnapshotBudgetTest(TransactionTestCase):
+    """Rebuilds in autocommit, as they run outside the tests"""
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "user@theatre.com",
+                "pass24word"
+            )
+        )
+        self.performance = sample_performance(show_time=f"{DAY} 14:00")
+
+    def test_rebuilds_stay_in_budget(self):
+        budget = PerformanceViewSet.query_budgets["list"]
+
+        built = self.client.get(PERFORMANCE_URL, {"date": DAY})
+        self.assertEqual(built.metrics.queries, budget)
+
+        self.performance.save()
+        rebuilt = self.client.get(PERFORMANCE_URL, {"date": DAY})
+        self.assertLess(rebuilt.metrics.queries, budget)
+        self.assertEqual(len(json.loads(rebuilt.content)["results"]), 1)
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.cache import get_catalog_cache
+from api.models import Play
+from api.search import search_plays
+from api.tests.reservation_tests import sample_performance
+
+PLAY_URL = reverse("api:play-list")
+PERFORMANCE_URL = reverse("api:performance-list")
+
+
+class PlaySearchTest(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        Play.objects.create(
+            name="Romeo and Juliet",
+            description="Two young lovers from feuding families",
+        )
+        Play.objects.create(
+            name="Hamlet",
+            description="A prince avenges his father, unlike Romeo",
+        )
+        Play.objects.create(name="Macbeth", description="Ambition")
+
+    def names(self, response):
+        return [play["name"] for play in response.data]
+
+    def test_name_filter_is_case_insensitive_substring(self):
+        res = self.client.get(PLAY_URL, {"name": "JULI"})
+
+        self.assertEqual(self.names(res), ["Romeo and Juliet"])
+
+    def test_short_name_filter(self):
+        res = self.client.get(PLAY_URL, {"name": "tH"})
+
+        self.assertEqual(self.names(res), ["Macbeth"])
+
+    def test_search_ranks_name_matches_first(self):
+        res = self.client.get(PLAY_URL, {"q": "romeo"})
+
+        self.assertEqual(self.names(res), ["Romeo and Juliet", "Hamlet"])
+
+    def test_search_matches_description_and_all_terms(self):
+        res = self.client.get(PLAY_URL, {"q": "young lovers"})
+
+        self.assertEqual(self.names(res), ["Romeo and Juliet"])
+
+    def test_search_sees_updated_play(self):
+        play = Play.objects.get(name="Macbeth")
+        play.name = "The Tragedy of Macbeth"
+        play.save()
+
+        res = self.client.get(PLAY_URL, {"q": "tragedy"})
+
+        self.assertEqual(self.names(res), ["The Tragedy of Macbeth"])
+
+    def test_performance_filter_by_play_name(self):
+        performance = sample_performance(
+            play=Play.objects.get(name="Hamlet")
+        )
+        sample_performance()
+
+        res = self.client.get(PERFORMANCE_URL, {"name": "hamle"})
+
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [performance.id]
+        )
+
+    def test_postgresql_search_filters_every_term(self):
+        with mock.patch("api.search._vendor", return_value="postgresql"):
+            queryset = search_plays(Play.objects.all(), "young lovers ab")
+
+        lookups = [
+            (lookup.lhs.target.name, lookup.rhs)
+            for where in queryset.query.where.children
+            for lookup in where.children
+        ]
+        self.assertEqual(
+            lookups,
+            [
+                ("name", "young"),
+                ("description", "young"),
+                ("name", "lovers"),
+                ("description", "lovers"),
+            ],
+        )
@@ -0,0 +1,87 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import Reservation, TheatreHall, Ticket
+from api.seating import unpack_seats
+from api.tests.reservation_tests import sample_performance
+
+
+def seats_url(performance_id):
+    return reverse("api:performance-seats", args=[performance_id])
+
+
+class PerformanceSeatsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in [(1, 1), (3, 7), (10, 10)]:
+            Ticket.objects.create(
+                reservation=reservation, performance=self.performance,
+                row=row, seat=seat
+            )
+
+    def test_seat_map_is_packed_bitset(self):
+        res = self.client.get(seats_url(self.performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken"], 3)
+        bitmap = base64.b64decode(res.data["seats"])
+        self.assertEqual(len(bitmap), 13)
+        self.assertEqual(
+            list(unpack_seats(bitmap, 10, 10)), [(1, 1), (3, 7), (10, 10)]
+        )
+
+    def test_seats_outside_the_hall_are_left_out(self):
+        # Rows and seats are only validated by Ticket.save()
+        Ticket.objects.bulk_create(
+            Ticket(
+                reservation=Reservation.objects.create(user=self.user),
+                performance=self.performance, row=row, seat=seat
+            )
+            for row, seat in [(0, 5), (5, 0)]
+        )
+        TheatreHall.objects.update(rows=9, seats_in_row=9)
+
+        res = self.client.get(seats_url(self.performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken"], 2)
+        self.assertEqual(
+            list(unpack_seats(base64.b64decode(res.data["seats"]), 9, 9)),
+            [(1, 1), (3, 7)],
+        )
+
+    def test_unchanged_seat_map_returns_not_modified(self):
+        etag = self.client.get(seats_url(self.performance.id))["ETag"]
+
+        res = self.client.get(
+            seats_url(self.performance.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_sold_seat_changes_etag(self):
+        etag = self.client.get(seats_url(self.performance.id))["ETag"]
+        Ticket.objects.create(
+            reservation=Reservation.objects.create(user=self.user),
+            performance=self.performance, row=5, seat=5
+        )
+
+        res = self.client.get(
+            seats_url(self.performance.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
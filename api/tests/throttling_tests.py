@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.tests.reservation_tests import sample_performance
+from api.throttling import (
+    ScopedSlidingWindowThrottle,
+    UserSlidingWindowThrottle,
+)
+
+RESERVATION_URL = reverse("api:reservation-list")
+
+
+class ClockedThrottle(UserSlidingWindowThrottle):
+    rate = "3/min"
+    now = 1000.0
+
+    def timer(self):
+        return ClockedThrottle.now
+
+
+class SlidingWindowThrottleTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.request = APIRequestFactory().get("/")
+        self.request.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        ClockedThrottle.now = 1000.0
+
+    def allow(self):
+        # A new throttle per request, like DRF does
+        throttle = ClockedThrottle()
+        return throttle.allow_request(self.request, None), throttle
+
+    def test_limit_and_wait(self):
+        for _ in range(3):
+            ClockedThrottle.now += 10
+            self.assertTrue(self.allow()[0])
+
+        allowed, throttle = self.allow()
+        self.assertFalse(allowed)
+        # 6 second buckets: the first request, in the 1008-1014 bucket,
+        # leaves the window when the 1068-1074 bucket starts
+        self.assertAlmostEqual(throttle.wait(), 1068 - 1030)
+
+        ClockedThrottle.now = 1068
+        self.assertTrue(self.allow()[0])
+        self.assertFalse(self.allow()[0])
+
+    def test_counters_are_not_per_instance(self):
+        self.assertEqual(
+            [self.allow()[0] for _ in range(4)], [True, True, True, False]
+        )
+
+
+class ScopedThrottleTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "user@theatre.com",
+                "pass24word"
+            )
+        )
+        self.performance = sample_performance()
+
+    def test_strict_booking_scope(self):
+        rates = {
+            **ScopedSlidingWindowThrottle.THROTTLE_RATES,
+            "booking": "2/min",
+        }
+        with mock.patch.object(
+            ScopedSlidingWindowThrottle, "THROTTLE_RATES", rates
+        ):
+            statuses = [
+                self.client.post(
+                    RESERVATION_URL,
+                    {
+                        "tickets": [
+                            {
+                                "row": 1,
+                                "seat": seat,
+                                "performance": self.performance.id,
+                            }
+                        ]
+                    },
+                    format="json",
+                ).status_code
+                for seat in range(1, 4)
+            ]
+            list_status = self.client.get(RESERVATION_URL).status_code
+
+        self.assertEqual(statuses, [201, 201, 429])
+        self.assertEqual(list_status, 200)
@@ -0,0 +1,128 @@
+"""
+Sliding window throttles on a shared cache.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per client
+and rewrites it on every request. Here the window is split into
+``buckets`` counters and a request costs one ``get_many`` of those
+counters and one ``incr``, whatever the rate. With a Redis cache
+(``THROTTLE_CACHE_ALIAS``) every worker process counts against the same
+limit.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    # Counters per window, the window may overrun by one bucket
+    buckets = 10
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+    @property
+    def bucket_seconds(self):
+        return self.duration / self.buckets
+
+    def _bucket_keys(self, now):
+        current = int(now // self.bucket_seconds)
+        return [
+            (bucket, f"{self.key}:{bucket}")
+            for bucket in range(current - self.buckets + 1, current + 1)
+        ]
+
+    def _increment(self, key):
+        timeout = self.duration + self.bucket_seconds
+        if self.cache.add(key, 1, timeout):
+            return
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # The bucket expired in between
+            self.cache.add(key, 1, timeout)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        bucket_keys = self._bucket_keys(self.now)
+        counts = self.cache.get_many([key for _, key in bucket_keys])
+        self.counts = [
+            (bucket, counts.get(key, 0)) for bucket, key in bucket_keys
+        ]
+
+        if sum(count for _, count in self.counts) >= self.num_requests:
+            return self.throttle_failure()
+
+        self._increment(bucket_keys[-1][1])
+        return self.throttle_success()
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Seconds until enough of the oldest requests leave the window"""
+        to_expire = sum(count for _, count in self.counts) - (
+            self.num_requests - 1
+        )
+        for bucket, count in self.counts:
+            to_expire -= count
+            if to_expire <= 0:
+                expires_at = (bucket + self.buckets) * self.bucket_seconds
+                return max(expires_at - self.now, 0)
+        return self.duration
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(UserRateThrottle, SlidingWindowThrottle):
+    pass
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowThrottle):
+    """
+    Limits per endpoint: ``throttle_scopes`` of the view maps actions to
+    a rate scope, other actions use its ``throttle_scope``. Views with
+    neither are not throttled by it.
+    """
+
+    def __init__(self):
+        # The rate depends on the view
+        pass
+
+    @staticmethod
+    def get_scope(view):
+        scopes = getattr(view, "throttle_scopes", {})
+        return scopes.get(
+            getattr(view, "action", None),
+            getattr(view, "throttle_scope", None),
+        )
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+
+        return self.cache_format % {"scope": self.scope, "ident": ident}
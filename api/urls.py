@@ -1,13 +1,18 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
 
+from api.async_views import async_read_urls
 from api.views import (
+    BookingRequestViewSet,
     GenreViewSet,
     ActorViewSet,
+    HealthView,
     PlayViewSet,
     PerformanceViewSet,
     ReservationViewSet,
     TheatreHallViewSet,
+    TicketExportView,
 )
 
 router = routers.DefaultRouter()
@@ -17,9 +22,17 @@ router.register("plays", PlayViewSet)
 router.register("theatre-halls", TheatreHallViewSet)
 router.register("performances", PerformanceViewSet)
 router.register("reservations", ReservationViewSet)
+router.register("booking-requests", BookingRequestViewSet)
 
 urlpatterns = [
+    path("", include(async_read_urls(router, settings.ASYNC_READ_ROUTES))),
     path("", include(router.urls)),
+    path("health/", HealthView.as_view(), name="health"),
+    path(
+        "exports/tickets.<str:export_format>",
+        TicketExportView.as_view(),
+        name="ticket-export",
+    ),
 ]
 
 app_name = "api"
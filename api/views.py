@@ -1,15 +1,42 @@
-from datetime import datetime
-
-from django.db.models import F, Count
+from datetime import datetime, timedelta
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views import static
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    AllowAny,
+    IsAuthenticated,
+    IsAdminUser,
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from api.booking import get_setting as get_booking_setting
+from api.booking_queue import enqueue
+from api.cache import CatalogCacheMixin
+from api.db import database_health
+from api.exports import (
+    FORMATS as EXPORT_FORMATS,
+    aexport_chunks,
+    export_chunks,
+    sold_tickets,
+)
+from api.fast_serializers import FastListMixin
+from api.holds import get_hold_store
+from api.metrics import registry
 from api.models import (
+    BookingRequest,
     Genre,
     Actor,
     Play,
@@ -17,8 +44,12 @@ from api.models import (
     Performance,
     Reservation,
 )
-from api.permissions import IsAdminOrIfAuthenticatedReadOnly
+from api.permissions import (
+    HasMetricsToken,
+    IsAdminOrIfAuthenticatedReadOnly,
+)
 from api.serializers import (
+    BookingRequestSerializer,
     GenreSerializer,
     ActorSerializer,
     PlaySerializer,
@@ -29,11 +60,26 @@ from api.serializers import (
     ReservationListSerializer,
     PerformanceListSerializer,
     PerformancePosterSerializer,
+    PerformanceSeatsSerializer,
+    SeatHoldSerializer,
+    TicketExportSerializer,
+)
+from api.pagination import PerformancePagination, ReservationPagination
+from api.posters import queue_poster
+from api.renderers import FastJSONRenderer
+from api.schedule import (
+    availability_bucket,
+    get_setting as get_schedule_setting,
+    get_snapshot,
 )
-from api.pagination import OrderPagination
+from api.search import play_name_filter, search_plays
+from api.seating import seat_map, seat_map_etag
+from api.storage import is_content_addressed
+from user.authentication import StatelessJWTAuthentication, load_user
 
 
 class GenreViewSet(
+    CatalogCacheMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -43,9 +89,12 @@ class GenreViewSet(
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    query_budgets = {"list": 1, "retrieve": 1}
 
 
 class ActorViewSet(
+    CatalogCacheMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -55,38 +104,89 @@ class ActorViewSet(
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    query_budgets = {"list": 1, "retrieve": 1}
 
 
-class PlayViewSet(viewsets.ModelViewSet):
+class PlayViewSet(CatalogCacheMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Play.objects.all().prefetch_related("actors", "genres")
     serializer_class = PlaySerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    cache_dependencies = (Genre, Actor)
+    query_budgets = {"list": 3, "retrieve": 3}
+    match_modes = ("any", "all")
 
     @staticmethod
     def _params_to_ints(qs):
         """Converts a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    @staticmethod
+    def _related_filters(through, field_name, ids, match_all=False):
+        """
+        EXISTS predicates on an M2M through table, so filtering
+        never multiplies play rows and no DISTINCT is needed
+        """
+        if match_all:
+            return [
+                Exists(
+                    through.objects.filter(
+                        play_id=OuterRef("pk"), **{field_name: related_id}
+                    )
+                )
+                for related_id in set(ids)
+            ]
+
+        return [
+            Exists(
+                through.objects.filter(
+                    play_id=OuterRef("pk"), **{f"{field_name}__in": ids}
+                )
+            )
+        ]
+
     def get_queryset(self):
         """Retrieve the plays with filters"""
         name = self.request.query_params.get("name")
+        query = self.request.query_params.get("q")
         genres = self.request.query_params.get("genres")
+        genres_mode = self.request.query_params.get("genres_mode", "any")
         actors = self.request.query_params.get("actors")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = queryset.filter(play_name_filter(queryset, name))
+
+        if query:
+            queryset = search_plays(queryset, query)
+
+        if genres_mode not in self.match_modes:
+            raise ValidationError(
+                {"genres_mode": "genres_mode must be any or all."}
+            )
 
         if genres:
             genres_ids = self._params_to_ints(genres)
-            queryset = queryset.filter(genres__id__in=genres_ids)
+            queryset = queryset.filter(
+                *self._related_filters(
+                    Play.genres.through,
+                    "genre_id",
+                    genres_ids,
+                    match_all=genres_mode == "all",
+                )
+            )
 
         if actors:
             actors_ids = self._params_to_ints(actors)
-            queryset = queryset.filter(actors__id__in=actors_ids)
+            queryset = queryset.filter(
+                *self._related_filters(
+                    Play.actors.through, "actor_id", actors_ids
+                )
+            )
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -101,6 +201,15 @@ class PlayViewSet(viewsets.ModelViewSet):
                 type={"type": "list", "items": {"type": "number"}},
                 description="Filter by genre id (ex. ?genres=2,5)",
             ),
+            OpenApiParameter(
+                "genres_mode",
+                type=OpenApiTypes.STR,
+                enum=["any", "all"],
+                description=(
+                    "Match plays with any (default) or all "
+                    "of the given genres (ex. ?genres_mode=all)"
+                ),
+            ),
             OpenApiParameter(
                 "actors",
                 type={"type": "list", "items": {"type": "number"}},
@@ -111,6 +220,14 @@ class PlayViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.STR,
                 description="Filter by play name (ex. ?name=julietta)",
             ),
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Search play names and descriptions, "
+                    "most relevant first (ex. ?q=romeo juliet)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -118,6 +235,7 @@ class PlayViewSet(viewsets.ModelViewSet):
 
 
 class TheatreHallViewSet(
+    CatalogCacheMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -127,21 +245,30 @@ class TheatreHallViewSet(
     queryset = TheatreHall.objects.all()
     serializer_class = TheatreHallSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    query_budgets = {"list": 1, "retrieve": 1}
 
 
-class PerformanceViewSet(viewsets.ModelViewSet):
+class PerformanceViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = (
         Performance.objects.all()
         .select_related("play", "theatre_hall")
         .annotate(
             tickets_available=(
                 F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
-                - Count("tickets")
+                - Coalesce(F("inventory__tickets_sold"), 0)
             )
         )
     )
     serializer_class = PerformanceSerializer
+    pagination_class = PerformancePagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    throttle_scopes = {"holds": "booking"}
+    # A ?date= list building its schedule snapshot runs 4: snapshot,
+    # placeholder insert (outside a transaction, see api.schedule),
+    # rendering and update
+    query_budgets = {"list": 4, "retrieve": 1, "seats": 2}
 
     @action(
         methods=["POST"],
@@ -156,20 +283,82 @@ class PerformanceViewSet(viewsets.ModelViewSet):
 
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        queue_poster(performance)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=["GET"], detail=True, url_path="seats")
+    def seats(self, request, pk=None):
+        """Occupancy of the whole hall as a packed bitset"""
+        performance = self.get_object()
+        taken_seats = performance.tickets.order_by().values_list(
+            "row", "seat"
+        )
+        data = seat_map(performance.theatre_hall, taken_seats)
+        etag = seat_map_etag(data)
+
+        known_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in known_etags or etag in known_etags:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        serializer = self.get_serializer(data)
+        return Response(serializer.data, headers={"ETag": etag})
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="holds",
+        permission_classes=[IsAuthenticated],
+    )
+    def holds(self, request, pk=None):
+        """Hold seats for a while before confirming them in a reservation"""
+        performance = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+
+        serializer.is_valid(raise_exception=True)
+        serializer.save(performance=performance, user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=["DELETE"],
+        detail=True,
+        url_path=r"holds/(?P<hold_id>[0-9a-f]+)",
+        permission_classes=[IsAuthenticated],
+    )
+    def release_hold(self, request, pk=None, hold_id=None):
+        """Release a seat hold before it expires"""
+        store = get_hold_store()
+        hold = store.get(hold_id)
+        if (
+            hold is None
+            or hold["user"] != request.user.id
+            or str(hold["performance"]) != pk
+        ):
+            raise Http404
+
+        store.release(hold_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     def get_queryset(self):
         date = self.request.query_params.get("date")
         name = self.request.query_params.get("name")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+            # A half-open range instead of show_time__date keeps the
+            # show_time index usable
+            day_start = datetime.strptime(date, "%Y-%m-%d")
+            queryset = queryset.filter(
+                show_time__gte=day_start,
+                show_time__lt=day_start + timedelta(days=1),
+            )
 
         if name:
-            queryset = queryset.filter(play__name__icontains=name)
+            queryset = queryset.filter(
+                play_name_filter(queryset, name, prefix="play__")
+            )
 
         return queryset
 
@@ -178,6 +367,10 @@ class PerformanceViewSet(viewsets.ModelViewSet):
             return PerformanceListSerializer
         if self.action == "upload_image":
             return PerformancePosterSerializer
+        if self.action == "seats":
+            return PerformanceSeatsSerializer
+        if self.action in ["holds", "release_hold"]:
+            return SeatHoldSerializer
 
         return self.serializer_class
 
@@ -193,16 +386,94 @@ class PerformanceViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.DATE,
                 description=(
                     "Filter by datetime of Performance "
-                    "(ex. ?date=2022-10-23)"
+                    "(ex. ?date=2022-10-23). Alone, it returns the whole "
+                    "day in one page, with an ETag"
                 ),
             ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        day = self.get_schedule_date()
+        if day is None:
+            return super().list(request, *args, **kwargs)
+
+        snapshot = get_snapshot(day, self.render_schedule)
+        known_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in known_etags or snapshot.etag in known_etags:
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": snapshot.etag},
+            )
+        return HttpResponse(
+            snapshot.content,
+            content_type=request.accepted_renderer.media_type,
+            headers={"ETag": snapshot.etag},
+        )
+
+    def get_schedule_date(self):
+        """Day of a plain ?date= JSON list, served from its snapshot"""
+        params = self.request.query_params
+        if (
+            self.action != "list"
+            or not get_schedule_setting("ENABLED")
+            or list(params) != ["date"]
+            or self.request.accepted_renderer.format != "json"
+        ):
+            return None
+        try:
+            return datetime.strptime(params["date"], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+    def get_values_serializer(self):
+        # Leave snapshot lists to the sync view under ASGI too
+        if self.get_schedule_date() is not None:
+            return None
+        return super().get_values_serializer()
+
+    def render_schedule(self):
+        """The whole day as a single page of the paginated list"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            *self.pagination_class.ordering
+        )
+        values_serializer = super().get_values_serializer()
+        if values_serializer is None:
+            results = self.get_serializer(queryset, many=True).data
+        else:
+            results = values_serializer.serialize(
+                queryset.values(*values_serializer.paths)
+            )
+        for performance in results:
+            performance["tickets_available"] = availability_bucket(
+                performance["tickets_available"]
+            )
+        return FastJSONRenderer().render(
+            {"next": None, "previous": None, "results": results}
+        )
+
+
+# Queries of a reservation of one performance: the user row (loaded by
+# the view under stateless authentication), performance, reservation,
+# seat check, tickets and inventory writes, savepoints, the schedule
+# update run once the booking commits and the tickets of the response.
+# lock adds its SELECT FOR UPDATE, optimistic its version read, a queued
+# reservation only stores its request.
+RESERVATION_CREATE_BUDGETS = {
+    "fail_fast": 12,
+    "lock": 13,
+    "optimistic": 13,
+    "queued": 2,
+}
+
+
+def reservation_create_budget():
+    if get_booking_setting("QUEUED"):
+        return RESERVATION_CREATE_BUDGETS["queued"]
+    return RESERVATION_CREATE_BUDGETS[get_booking_setting("STRATEGY")]
 
 
 class ReservationViewSet(
+    FastListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -212,12 +483,14 @@ class ReservationViewSet(
         "tickets__performance__theatre_hall"
     )
     serializer_class = ReservationSerializer
-    pagination_class = OrderPagination
+    pagination_class = ReservationPagination
     permission_classes = (IsAuthenticated,)
+    throttle_scopes = {"create": "booking"}
+    query_budgets = {"list": 5, "create": reservation_create_budget}
 
     def get_queryset(self):
         if self.action == "list":
-            return self.queryset.filter(user=self.request.user)
+            return self.queryset.filter(user_id=self.request.user.pk)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -225,5 +498,156 @@ class ReservationViewSet(
 
         return self.serializer_class
 
+    @extend_schema(
+        responses={
+            status.HTTP_201_CREATED: ReservationSerializer,
+            status.HTTP_202_ACCEPTED: BookingRequestSerializer,
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        if not get_booking_setting("QUEUED"):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        booking_request = enqueue(request.user.pk, serializer.validated_data)
+        data = BookingRequestSerializer(
+            booking_request, context=self.get_serializer_context()
+        ).data
+        return Response(
+            data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={
+                "Location": data["status_url"],
+                "Retry-After": get_booking_setting("POLL_INTERVAL"),
+            },
+        )
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user=load_user(self.request.user))
+
+
+class BookingRequestViewSet(mixins.RetrieveModelMixin, GenericViewSet):
+    """Reservations accepted in queued booking mode"""
+
+    queryset = BookingRequest.objects.all()
+    serializer_class = BookingRequestSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.queryset.filter(user_id=self.request.user.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] == BookingRequest.Status.PENDING:
+            response["Retry-After"] = get_booking_setting("POLL_INTERVAL")
+        return response
+
+
+class HealthView(APIView):
+    """
+    Database availability, with the state of every database and its
+    connection pool for staff
+    """
+
+    # Reads the token claims, a health check works without the database
+    authentication_classes = (StatelessJWTAuthentication,)
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        databases = {alias: database_health(alias) for alias in connections}
+        available = all(health["available"] for health in databases.values())
+
+        data = {"status": "ok" if available else "unavailable"}
+        if request.user.is_staff:
+            data["databases"] = databases
+        return Response(
+            data,
+            status=(
+                status.HTTP_200_OK
+                if available
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )
+
+
+class MetricsView(APIView):
+    """Request, query and timing counters in the Prometheus text format"""
+
+    authentication_classes = ()
+    permission_classes = (HasMetricsToken,)
+    throttle_classes = ()
+
+    @extend_schema(responses={(200, "text/plain"): OpenApiTypes.STR})
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class TicketExportView(APIView):
+    """Sold tickets as CSV or NDJSON, streamed from a server-side cursor"""
+
+    permission_classes = (IsAdminUser,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Accept: text/csv is fine, errors are still rendered as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "performance", type=OpenApiTypes.INT,
+                description="Only tickets of this performance",
+            ),
+            OpenApiParameter(
+                "theatre_hall", type=OpenApiTypes.INT,
+                description="Only tickets of performances in this hall",
+            ),
+            OpenApiParameter(
+                "date_from", type=OpenApiTypes.DATE,
+                description="Sold on or after (ex. ?date_from=2024-09-01)",
+            ),
+            OpenApiParameter(
+                "date_to", type=OpenApiTypes.DATE,
+                description="Sold on or before (ex. ?date_to=2024-09-30)",
+            ),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    )
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise Http404
+        filters = TicketExportSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+
+        content_type, _ = EXPORT_FORMATS[export_format]
+        chunks = (
+            aexport_chunks
+            if isinstance(request._request, ASGIRequest)
+            else export_chunks
+        )
+        response = StreamingHttpResponse(
+            chunks(sold_tickets(**filters.validated_data), export_format),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tickets.{export_format}"'
+        )
+        return response
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    ``django.views.static.serve`` for MEDIA_URL, content-addressed files
+    never change and are cached for a year
+    """
+    response = static.serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and is_content_addressed(path):
+        patch_cache_control(
+            response, public=True, max_age=31536000, immutable=True
+        )
+    return response
@@ -0,0 +1,44 @@
+"""
+Benchmarks for the theatre API.
+
+Every module is a script run from the project root, for example::
+
+    python -m benchmarks.play_filter_plans --plays 100000
+
+Benchmarks work on a throwaway test database created next to the
+configured one, so they never touch real data. Only ``benchmarks.data``
+writes into the configured database, when asked to, to load a running
+server with ``benchmarks.booking --url``.
+"""
+import os
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "theater_service_api.settings"
+    )
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Create and migrate a test database, destroy it afterwards"""
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
@@ -0,0 +1,158 @@
+"""
+Load test the read endpoints of a WSGI and an ASGI server.
+
+Start both servers on the same database, the ASGI one with the async
+read routes enabled::
+
+    gunicorn theater_service_api.wsgi -w 4 -b 127.0.0.1:8000
+    ASYNC_READ_ROUTES=performances,plays \\
+        uvicorn theater_service_api.asgi:application \\
+        --workers 4 --port 8001
+
+then run::
+
+    python -m benchmarks.asgi_vs_wsgi --email user@theatre.com \\
+        --password secret --concurrency 64 --duration 10 \\
+        --target wsgi=http://127.0.0.1:8000 \\
+        --target asgi=http://127.0.0.1:8001
+
+Every client keeps one HTTP/1.1 connection alive. Non 200 responses
+are counted as errors, mind the user throttle rate on long runs.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = (
+    "/api/performances/",
+    "/api/plays/",
+)
+
+
+def obtain_token(base_url, email, password):
+    request = urllib.request.Request(
+        f"{base_url}/token/",
+        data=json.dumps({"email": email, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["access"]
+
+
+async def read_response(reader):
+    """Status code of the next response, its body is read and dropped"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    return int(status_line.split()[1])
+
+
+async def client(base_url, paths, token, deadline, latencies, statuses):
+    url = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(
+        url.hostname, url.port or 80
+    )
+    requests = [
+        (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {url.netloc}\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode()
+        for path in paths
+    ]
+    index = 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            index += 1
+    finally:
+        writer.close()
+
+
+async def run(base_url, paths, token, concurrency, duration):
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            client(base_url, paths, token, deadline, latencies, statuses)
+            for _ in range(concurrency)
+        )
+    )
+    return latencies, statuses, time.perf_counter() - started
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def report(name, latencies, statuses, elapsed):
+    errors = sum(
+        count for status, count in statuses.items() if status != 200
+    )
+    print(
+        f"{name}: {len(latencies) / elapsed:.1f} req/s, "
+        f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+        f"{errors} errors {statuses}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        required=True,
+        metavar="NAME=URL",
+        help="Server to load, repeat for every server to compare",
+    )
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        base_url = base_url.rstrip("/")
+        token = obtain_token(base_url, args.email, args.password)
+        latencies, statuses, elapsed = asyncio.run(
+            run(base_url, paths, token, args.concurrency, args.duration)
+        )
+        report(name, latencies, statuses, elapsed)
+
+
+if __name__ == "__main__":
+    main()
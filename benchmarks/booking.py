@@ -0,0 +1,406 @@
+"""
+Load test of the booking API on synthetic data.
+
+In process, on a throwaway test database filled by ``benchmarks.data``::
+
+    python -m benchmarks.booking --scale small --output before.json
+
+Against a local server on a database filled with ``benchmarks.data``
+(raise its throttle rates, or the throttles end the run early)::
+
+    THROTTLE_RATE_USER=1000000/min THROTTLE_RATE_CATALOG=1000000/min \\
+    THROTTLE_RATE_BOOKING=1000000/min THROTTLE_RATE_ANON=1000000/min \\
+        gunicorn theater_service_api.wsgi -w 4 -b 127.0.0.1:8000
+    python -m benchmarks.booking --url http://127.0.0.1:8000 \\
+        --output after.json --baseline before.json
+
+Scenarios run one after the other, each for ``--duration`` seconds with
+``--concurrency`` clients, every client logged in as its own user:
+
+* ``catalog``: play details, play filters and the genre list,
+* ``performances_by_date``: the performance list of a random day,
+* ``seat_selection``: the seat map of a random performance,
+* ``reservations``: 1 to 4 free seats of ``--hot-performances``
+  performances, every client booking different seats.
+
+The JSON report holds the throughput and p50/p95/p99 latencies of every
+scenario, with the commit and the dataset they were measured on.
+``--baseline`` prints the change against an older report. In process
+runs on SQLite use a temporary database file, so concurrent writers wait
+for each other instead of failing.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from benchmarks import setup_django, test_database
+from benchmarks.data import (
+    DAYS,
+    START,
+    USER_PASSWORD,
+    add_scale_arguments,
+    dataset_size,
+    generate,
+    scale_from_arguments,
+    user_email,
+)
+
+UNTHROTTLED = "1000000/min"
+SCENARIOS = ("catalog", "performances_by_date", "seat_selection",
+             "reservations")
+
+
+class InProcessClient:
+    """Requests through the whole Django stack, without a server"""
+
+    def __init__(self, email):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        response = self.client.post(
+            "/token/",
+            {"email": email, "password": USER_PASSWORD},
+            format="json",
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+
+    def request(self, method, path, body=None):
+        response = self.client.generic(
+            method,
+            path,
+            json.dumps(body) if body is not None else "",
+            content_type="application/json",
+        )
+        return response.status_code
+
+    def close(self):
+        from django.db import connections
+
+        connections.close_all()
+
+
+class HttpClient:
+    """One keep-alive HTTP/1.1 connection to a running server"""
+
+    def __init__(self, base_url, email):
+        url = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(
+            url.hostname, url.port or 80, timeout=60
+        )
+        self.headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        status, data = self._send(
+            "POST", "/token/", {"email": email, "password": USER_PASSWORD}
+        )
+        if status != 200:
+            raise RuntimeError(f"Login of {email} failed with {status}")
+        self.headers["Authorization"] = f"Bearer {json.loads(data)['access']}"
+
+    def _send(self, method, path, body=None):
+        self.connection.request(
+            method,
+            path,
+            body=json.dumps(body).encode() if body is not None else None,
+            headers=self.headers,
+        )
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def request(self, method, path, body=None):
+        return self._send(method, path, body)[0]
+
+    def close(self):
+        self.connection.close()
+
+
+class Plan:
+    """Ids and free seats the scenarios pick their requests from"""
+
+    def __init__(self, rng, hot_performances):
+        from api.models import Genre, Performance, Play, Ticket
+
+        self.play_ids = list(Play.objects.values_list("id", flat=True))
+        self.genre_ids = list(Genre.objects.values_list("id", flat=True))
+        self.performance_ids = list(
+            Performance.objects.values_list("id", flat=True)
+        )
+        self.dates = [
+            (START + timedelta(days=day)).date() for day in range(DAYS)
+        ]
+
+        self.lock = threading.Lock()
+        self.free_seats = {}
+        hot = Performance.objects.filter(
+            id__in=rng.sample(
+                self.performance_ids,
+                min(hot_performances, len(self.performance_ids)),
+            )
+        ).values_list("id", "theatre_hall__rows", "theatre_hall__seats_in_row")
+        for performance_id, rows, seats_in_row in hot:
+            taken = set(
+                Ticket.objects.filter(
+                    performance_id=performance_id
+                ).values_list("row", "seat")
+            )
+            seats = [
+                (row, seat)
+                for row in range(1, rows + 1)
+                for seat in range(1, seats_in_row + 1)
+                if (row, seat) not in taken
+            ]
+            rng.shuffle(seats)
+            self.free_seats[performance_id] = seats
+
+    def take_seats(self, rng):
+        """Seats no other client will book, None when all are booked"""
+        with self.lock:
+            candidates = [
+                performance_id
+                for performance_id, seats in self.free_seats.items()
+                if seats
+            ]
+            if not candidates:
+                return None
+            performance_id = rng.choice(candidates)
+            seats = self.free_seats[performance_id]
+            count = min(rng.randint(1, 4), len(seats))
+            taken = [seats.pop() for _ in range(count)]
+        return performance_id, taken
+
+
+def catalog(plan, rng):
+    path = rng.choice(
+        (
+            f"/api/plays/{rng.choice(plan.play_ids)}/",
+            f"/api/plays/?genres={rng.choice(plan.genre_ids)}",
+            "/api/genres/",
+        )
+    )
+    return "GET", path, None, {200}
+
+
+def performances_by_date(plan, rng):
+    return (
+        "GET",
+        f"/api/performances/?date={rng.choice(plan.dates).isoformat()}",
+        None,
+        {200},
+    )
+
+
+def seat_selection(plan, rng):
+    performance_id = rng.choice(plan.performance_ids)
+    return "GET", f"/api/performances/{performance_id}/seats/", None, {200}
+
+
+def reservations(plan, rng):
+    seats = plan.take_seats(rng)
+    if seats is None:
+        return None
+    performance_id, taken = seats
+    body = {
+        "tickets": [
+            {"row": row, "seat": seat, "performance": performance_id}
+            for row, seat in taken
+        ]
+    }
+    # 202 in queued booking mode
+    return "POST", "/api/reservations/", body, {201, 202}
+
+
+def percentile(latencies, percent):
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100)[percent - 1]
+
+
+def run_scenario(scenario, plan, clients, duration, seed):
+    latencies = []
+    statuses = Counter()
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def work(client, rng):
+        client_latencies = []
+        client_statuses = Counter()
+        client_errors = 0
+        while time.perf_counter() < deadline:
+            call = scenario(plan, rng)
+            if call is None:
+                break
+            method, path, body, expected = call
+            started = time.perf_counter()
+            status = client.request(method, path, body)
+            client_latencies.append(time.perf_counter() - started)
+            client_statuses[status] += 1
+            client_errors += status not in expected
+        with lock:
+            latencies.extend(client_latencies)
+            statuses.update(client_statuses)
+            errors.append(client_errors)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=work, args=(client, random.Random(seed + index))
+        )
+        for index, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies or [0]) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        changes = ", ".join(
+            f"{key} {before[key]} -> {result[key]} "
+            f"({(result[key] - before[key]) / (before[key] or 1):+.0%})"
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"{name}: {changes}")
+
+
+def benchmark(args, make_client):
+    from django.db import connection
+
+    rng = random.Random(args.seed)
+    plan = Plan(rng, args.hot_performances)
+    clients = [
+        make_client(user_email(index)) for index in range(args.concurrency)
+    ]
+    try:
+        scenarios = {}
+        for name in args.scenarios:
+            scenario = globals()[name]
+            if args.warmup and name != "reservations":
+                run_scenario(scenario, plan, clients, args.warmup, args.seed)
+            scenarios[name] = run_scenario(
+                scenario, plan, clients, args.duration, args.seed
+            )
+            print(f"{name}: {scenarios[name]}")
+    finally:
+        for client in clients:
+            client.close()
+
+    return {
+        "commit": current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "database": connection.vendor,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+        "dataset": dataset_size(),
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--url",
+        help="Server to load, the data must already be in its database",
+    )
+    add_scale_arguments(parser)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        dest="scenarios",
+        help="Run only this scenario, repeat for several",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=1,
+        help="Unrecorded seconds before each read scenario",
+    )
+    parser.add_argument("--hot-performances", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Report to compare against")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    if args.url:
+        setup_django()
+        base_url = args.url.rstrip("/")
+        report = benchmark(args, lambda email: HttpClient(base_url, email))
+    else:
+        for scope in ("ANON", "USER", "CATALOG", "BOOKING"):
+            os.environ.setdefault(f"THROTTLE_RATE_{scope}", UNTHROTTLED)
+        setup_django()
+        from django.db import connection
+
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == "sqlite":
+                connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                    directory, "benchmark.sqlite3"
+                )
+            with test_database():
+                started = time.perf_counter()
+                size = generate(**scale_from_arguments(args), seed=args.seed)
+                print(
+                    f"Generated {size} in "
+                    f"{time.perf_counter() - started:.1f}s"
+                )
+                report = benchmark(args, InProcessClient)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(report, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Stress the reservation strategies of api.booking.
+
+Many clients book pairs of seats in a small hall at the same time, so
+most requests fight for the same seats::
+
+    python -m benchmarks.booking_strategies --clients 16 --attempts 50
+
+Every strategy is then checked for double-booked seats and seat
+inventory drift, and reports its throughput and latencies. Run it on
+PostgreSQL (DB_ENGINE=postgresql) for meaningful ``lock`` numbers,
+SQLite ignores ``SELECT ... FOR UPDATE`` and serializes every writer.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks import setup_django, test_database
+from benchmarks.booking import UNTHROTTLED, percentile
+from benchmarks.data import create_users
+
+
+def stress(strategy, performances, users, attempts, seed):
+    from django.db import connections
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from api.models import Reservation, SeatInventory
+
+    Reservation.objects.all().delete()
+    SeatInventory.objects.update(tickets_sold=0, version=0)
+
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(users))
+
+    def work(user, rng):
+        client = APIClient()
+        client.force_authenticate(user)
+        client_latencies = []
+        client_statuses = Counter()
+        barrier.wait()
+        try:
+            for _ in range(attempts):
+                performance = rng.choice(performances)
+                hall = performance.theatre_hall
+                row = rng.randint(1, hall.rows)
+                first = rng.randint(1, hall.seats_in_row - 1)
+                payload = {
+                    "tickets": [
+                        {"performance": performance.id, "row": row, "seat": s}
+                        for s in (first, first + 1)
+                    ]
+                }
+                started = time.perf_counter()
+                response = client.post(
+                    "/api/reservations/", payload, format="json"
+                )
+                client_latencies.append(time.perf_counter() - started)
+                client_statuses[response.status_code] += 1
+        finally:
+            connections.close_all()
+            with lock:
+                latencies.extend(client_latencies)
+                statuses.update(client_statuses)
+
+    threads = [
+        threading.Thread(
+            target=work, args=(user, random.Random(seed + index))
+        )
+        for index, user in enumerate(users)
+    ]
+    started = time.perf_counter()
+    with override_settings(BOOKING={"STRATEGY": strategy}):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "statuses": {
+            str(status): count for status, count in statuses.items()
+        },
+        "bookings_per_second": round(statuses[201] / elapsed, 1),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        **check_integrity(statuses[201]),
+    }
+
+
+def check_integrity(bookings):
+    from api.inventory import find_drift
+    from api.models import Ticket
+
+    seats = list(Ticket.objects.values_list("performance", "row", "seat"))
+    return {
+        "double_booked": len(seats) - len(set(seats)),
+        "lost_tickets": bookings * 2 - len(seats),
+        "inventory_drift": len(find_drift()),
+    }
+
+
+def main():
+    from api.booking import STRATEGIES
+
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--strategy",
+        action="append",
+        choices=STRATEGIES,
+        dest="strategies",
+        help="Stress only this strategy, repeat for several",
+    )
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument("--performances", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--seats_in_row", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+    # Lost seats are expected, only log server errors
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from api.models import Performance, Play, TheatreHall
+
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == "sqlite":
+            # A file shared by the client threads, whose transactions
+            # take the write lock up front instead of failing to upgrade
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                directory, "benchmark.sqlite3"
+            )
+            connection.settings_dict["OPTIONS"]["transaction_mode"] = (
+                "IMMEDIATE"
+            )
+        with test_database():
+            hall = TheatreHall.objects.create(
+                name="Stress", rows=args.rows, seats_in_row=args.seats_in_row
+            )
+            play = Play.objects.create(name="Stress")
+            performances = [
+                Performance.objects.create(
+                    play=play, theatre_hall=hall, show_time="2025-01-01 19:00"
+                )
+                for _ in range(args.performances)
+            ]
+            create_users(args.clients, batch_size=1000)
+            users = list(get_user_model().objects.order_by("id"))
+
+            report = {"database": connection.vendor}
+            for strategy in args.strategies or list(STRATEGIES):
+                report[strategy] = stress(
+                    strategy, performances, users, args.attempts, args.seed
+                )
+                print(f"{strategy}: {report[strategy]}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    for scope in ("USER", "BOOKING"):
+        os.environ.setdefault(f"THROTTLE_RATE_{scope}", UNTHROTTLED)
+    setup_django()
+    main()
@@ -0,0 +1,318 @@
+"""
+Synthetic catalog and sales data for the benchmarks.
+
+The same arguments and seed always give the same rows::
+
+    python -m benchmarks.data --scale large --i-know-this-writes
+
+fills the *configured* database, to benchmark a local server against
+it. ``benchmarks.booking`` calls ``generate`` on a throwaway test
+database instead.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import setup_django
+
+SCALES = {
+    "small": {
+        "genres": 20,
+        "actors": 500,
+        "plays": 200,
+        "halls": 50,
+        "performances": 2000,
+        "tickets": 50000,
+        "users": 200,
+    },
+    "medium": {
+        "genres": 40,
+        "actors": 2000,
+        "plays": 1000,
+        "halls": 200,
+        "performances": 10000,
+        "tickets": 300000,
+        "users": 1000,
+    },
+    "large": {
+        "genres": 60,
+        "actors": 5000,
+        "plays": 3000,
+        "halls": 1000,
+        "performances": 30000,
+        "tickets": 2000000,
+        "users": 5000,
+    },
+}
+
+START = datetime(2025, 1, 1)
+DAYS = 90
+SHOW_HOURS = (12, 15, 19)
+USER_PASSWORD = "bench-password"
+# Part of every hall left free for the reservation benchmark
+FREE_RATIO = 0.3
+
+
+def user_email(index):
+    return f"bench{index}@theatre.com"
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ids(model):
+    return list(model.objects.order_by("id").values_list("id", flat=True))
+
+
+def create_catalog(rng, genres, actors, plays, halls, batch_size):
+    from api.models import Actor, Genre, Play, TheatreHall
+
+    Genre.objects.bulk_create(
+        Genre(name=f"Genre {index}") for index in range(genres)
+    )
+    Actor.objects.bulk_create(
+        (
+            Actor(first_name=f"Actor{index}", last_name=f"Surname{index}")
+            for index in range(actors)
+        ),
+        batch_size=batch_size,
+    )
+    Play.objects.bulk_create(
+        (
+            Play(
+                name=f"Play {index}",
+                description=f"Play {index} " + "lorem ipsum " * 20,
+            )
+            for index in range(plays)
+        ),
+        batch_size=batch_size,
+    )
+    TheatreHall.objects.bulk_create(
+        (
+            TheatreHall(
+                name=f"Hall {index}",
+                rows=rng.randint(10, 30),
+                seats_in_row=rng.randint(10, 40),
+            )
+            for index in range(halls)
+        ),
+        batch_size=batch_size,
+    )
+
+    genre_ids, actor_ids = _ids(Genre), _ids(Actor)
+    play_ids = _ids(Play)
+    Play.genres.through.objects.bulk_create(
+        (
+            Play.genres.through(play_id=play_id, genre_id=genre_id)
+            for play_id in play_ids
+            for genre_id in rng.sample(genre_ids, 2)
+        ),
+        batch_size=batch_size,
+    )
+    Play.actors.through.objects.bulk_create(
+        (
+            Play.actors.through(play_id=play_id, actor_id=actor_id)
+            for play_id in play_ids
+            for actor_id in rng.sample(actor_ids, 6)
+        ),
+        batch_size=batch_size,
+    )
+    return play_ids
+
+
+def create_performances(rng, play_ids, performances, batch_size):
+    from api.models import Performance, TheatreHall
+
+    halls = list(TheatreHall.objects.values_list("id", flat=True))
+    Performance.objects.bulk_create(
+        (
+            Performance(
+                play_id=rng.choice(play_ids),
+                theatre_hall_id=rng.choice(halls),
+                show_time=START
+                + timedelta(
+                    days=rng.randrange(DAYS), hours=rng.choice(SHOW_HOURS)
+                ),
+            )
+            for _ in range(performances)
+        ),
+        batch_size=batch_size,
+    )
+
+
+def create_users(users, batch_size):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    # One hash for everyone, hashing is the slow part
+    password = make_password(USER_PASSWORD)
+    user_model = get_user_model()
+    user_model.objects.bulk_create(
+        (
+            user_model(email=user_email(index), password=password)
+            for index in range(users)
+        ),
+        batch_size=batch_size,
+    )
+    return _ids(user_model)
+
+
+def _seats_to_sell(tickets):
+    """(performance id, row, seat) sold, front rows first"""
+    from api.models import Performance
+
+    performances = list(
+        Performance.objects.order_by("id").values_list(
+            "id", "theatre_hall__rows", "theatre_hall__seats_in_row"
+        )
+    )
+    per_performance = -(-tickets // len(performances))
+    remaining = tickets
+    for performance_id, rows, seats_in_row in performances:
+        sellable = int(rows * seats_in_row * (1 - FREE_RATIO))
+        count = min(per_performance, sellable, remaining)
+        remaining -= count
+        for index in range(count):
+            row, seat = divmod(index, seats_in_row)
+            yield performance_id, row + 1, seat + 1
+        if not remaining:
+            return
+
+
+def create_sales(rng, tickets, user_ids, batch_size):
+    from api.models import Reservation, SeatInventory, Ticket
+
+    sold = {}
+    for batch in _batches(_seats_to_sell(tickets), batch_size):
+        # 1 to 6 tickets per reservation, never across performances
+        groups = []
+        group_size = 0
+        for performance_id, row, seat in batch:
+            if (
+                not groups
+                or groups[-1][0][0] != performance_id
+                or len(groups[-1]) == group_size
+            ):
+                groups.append([])
+                group_size = rng.randint(1, 6)
+            groups[-1].append((performance_id, row, seat))
+            sold[performance_id] = sold.get(performance_id, 0) + 1
+
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user_id=rng.choice(user_ids)) for _ in groups
+        )
+        Ticket.objects.bulk_create(
+            Ticket(
+                performance_id=performance_id,
+                reservation_id=reservation.id,
+                row=row,
+                seat=seat,
+            )
+            for reservation, group in zip(reservations, groups)
+            for performance_id, row, seat in group
+        )
+
+    SeatInventory.objects.bulk_create(
+        (
+            SeatInventory(performance_id=performance_id, tickets_sold=count)
+            for performance_id, count in sold.items()
+        ),
+        batch_size=batch_size,
+    )
+
+
+def generate(
+    genres,
+    actors,
+    plays,
+    halls,
+    performances,
+    tickets,
+    users,
+    seed=42,
+    batch_size=5000,
+):
+    """Create the rows, return how many of each"""
+    rng = random.Random(seed)
+    play_ids = create_catalog(rng, genres, actors, plays, halls, batch_size)
+    create_performances(rng, play_ids, performances, batch_size)
+    user_ids = create_users(users, batch_size)
+    create_sales(rng, tickets, user_ids, batch_size)
+    return dataset_size()
+
+
+def dataset_size():
+    from django.contrib.auth import get_user_model
+
+    from api.models import (
+        Actor,
+        Genre,
+        Performance,
+        Play,
+        Reservation,
+        TheatreHall,
+        Ticket,
+    )
+
+    return {
+        "genres": Genre.objects.count(),
+        "actors": Actor.objects.count(),
+        "plays": Play.objects.count(),
+        "halls": TheatreHall.objects.count(),
+        "performances": Performance.objects.count(),
+        "users": get_user_model().objects.count(),
+        "reservations": Reservation.objects.count(),
+        "tickets": Ticket.objects.count(),
+    }
+
+
+def add_scale_arguments(parser):
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for name in SCALES["small"]:
+        parser.add_argument(
+            f"--{name}", type=int, help=f"Override the {name} of the scale"
+        )
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def scale_from_arguments(args):
+    return {
+        name: getattr(args, name) or default
+        for name, default in SCALES[args.scale].items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    add_scale_arguments(parser)
+    parser.add_argument(
+        "--i-know-this-writes",
+        action="store_true",
+        required=True,
+        help="Confirm writing into the configured database",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import transaction
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        size = generate(**scale_from_arguments(args), seed=args.seed)
+    print(f"{size} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare the old JOIN + DISTINCT play filter with the EXISTS version.
+
+    python -m benchmarks.play_filter_plans --plays 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks import setup_django, test_database
+
+
+def create_plays(plays, genres, actors, per_play):
+    from api.models import Actor, Genre, Play
+
+    Genre.objects.bulk_create(
+        Genre(name=f"Genre {index}") for index in range(genres)
+    )
+    Actor.objects.bulk_create(
+        Actor(first_name="Actor", last_name=str(index))
+        for index in range(actors)
+    )
+    genre_ids = list(Genre.objects.values_list("id", flat=True))
+    actor_ids = list(Actor.objects.values_list("id", flat=True))
+
+    Play.objects.bulk_create(
+        (
+            Play(name=f"Play {index}", description="Lorem ipsum " * 50)
+            for index in range(plays)
+        ),
+        batch_size=5000,
+    )
+    play_ids = list(Play.objects.values_list("id", flat=True))
+
+    rng = random.Random(42)
+    Play.genres.through.objects.bulk_create(
+        (
+            Play.genres.through(play_id=play_id, genre_id=genre_id)
+            for play_id in play_ids
+            for genre_id in rng.sample(genre_ids, per_play)
+        ),
+        batch_size=5000,
+    )
+    Play.actors.through.objects.bulk_create(
+        (
+            Play.actors.through(play_id=play_id, actor_id=actor_id)
+            for play_id in play_ids
+            for actor_id in rng.sample(actor_ids, per_play)
+        ),
+        batch_size=5000,
+    )
+
+
+def old_queryset(genres_ids, actors_ids):
+    from api.models import Play
+
+    return (
+        Play.objects.filter(genres__id__in=genres_ids)
+        .filter(actors__id__in=actors_ids)
+        .distinct()
+    )
+
+
+def new_queryset(genres_ids, actors_ids, genres_mode):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.views import PlayViewSet
+
+    request = APIRequestFactory().get(
+        "/",
+        {
+            "genres": ",".join(map(str, genres_ids)),
+            "actors": ",".join(map(str, actors_ids)),
+            "genres_mode": genres_mode,
+        },
+    )
+    view = PlayViewSet(request=Request(request), action="list")
+    return view.get_queryset().prefetch_related(None)
+
+
+def measure(label, queryset, repeat):
+    print(f"== {label}")
+    print(queryset.explain())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count = len(list(queryset.values_list("id", flat=True)))
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{count} plays, {elapsed * 1000:.1f} ms per query\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plays", type=int, default=100_000)
+    parser.add_argument("--genres", type=int, default=30)
+    parser.add_argument("--actors", type=int, default=2000)
+    parser.add_argument("--per-play", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        create_plays(args.plays, args.genres, args.actors, args.per_play)
+        genres_ids, actors_ids = [1, 2, 3], list(range(1, 200))
+
+        measure(
+            "JOIN + DISTINCT",
+            old_queryset(genres_ids, actors_ids),
+            args.repeat,
+        )
+        measure(
+            "EXISTS, any genre",
+            new_queryset(genres_ids, actors_ids, "any"),
+            args.repeat,
+        )
+        measure(
+            "EXISTS, all genres",
+            new_queryset(genres_ids[:2], actors_ids, "all"),
+            args.repeat,
+        )
+
+
+if __name__ == "__main__":
+    main()
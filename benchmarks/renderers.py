@@ -0,0 +1,127 @@
+"""
+Compare JSONRenderer and FastJSONRenderer on the list serializers.
+
+    python -m benchmarks.renderers --performances 2000 --reservations 2000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import setup_django, test_database
+
+
+def create_data(performances, reservations, tickets_per_reservation):
+    from django.contrib.auth import get_user_model
+
+    from api.models import (
+        Performance,
+        Play,
+        Reservation,
+        TheatreHall,
+        Ticket,
+    )
+
+    user = get_user_model().objects.create_user("bench@theatre.com", "pass")
+    hall = TheatreHall.objects.create(name="Main", rows=50, seats_in_row=50)
+    play = Play.objects.create(name="Hamlet", description="Lorem ipsum")
+    start = datetime(2024, 9, 1, 19, 0)
+    Performance.objects.bulk_create(
+        Performance(
+            play=play,
+            theatre_hall=hall,
+            show_time=start + timedelta(hours=index),
+        )
+        for index in range(performances)
+    )
+    performance_ids = list(Performance.objects.values_list("id", flat=True))
+
+    Reservation.objects.bulk_create(
+        Reservation(user=user) for _ in range(reservations)
+    )
+    reservation_ids = list(Reservation.objects.values_list("id", flat=True))
+    tickets = []
+    for index in range(reservations * tickets_per_reservation):
+        # Spread tickets over performances, then over the hall seats
+        row, seat = divmod(index // len(performance_ids), hall.seats_in_row)
+        tickets.append(
+            Ticket(
+                reservation_id=reservation_ids[
+                    index // tickets_per_reservation
+                ],
+                performance_id=performance_ids[index % len(performance_ids)],
+                row=row + 1,
+                seat=seat + 1,
+            )
+        )
+    Ticket.objects.bulk_create(tickets, batch_size=5000)
+
+
+def serialized_lists():
+    from django.db.models import F
+
+    from api.models import Performance, Reservation
+    from api.serializers import (
+        PerformanceListSerializer,
+        ReservationListSerializer,
+    )
+
+    performances = Performance.objects.select_related(
+        "play", "theatre_hall"
+    ).annotate(
+        tickets_available=F("theatre_hall__rows")
+        * F("theatre_hall__seats_in_row")
+    )
+    reservations = Reservation.objects.prefetch_related(
+        "tickets__performance__play", "tickets__performance__theatre_hall"
+    )
+
+    return {
+        "performances": PerformanceListSerializer(
+            performances, many=True
+        ).data,
+        "reservations": ReservationListSerializer(
+            reservations, many=True
+        ).data,
+    }
+
+
+def measure(renderer, data, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        content = renderer.render(data)
+    return (time.perf_counter() - started) / repeat, len(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--performances", type=int, default=2000)
+    parser.add_argument("--reservations", type=int, default=2000)
+    parser.add_argument("--tickets-per-reservation", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from api.renderers import FastJSONRenderer
+
+    with test_database():
+        create_data(
+            args.performances,
+            args.reservations,
+            args.tickets_per_reservation,
+        )
+        for name, data in serialized_lists().items():
+            baseline, size = measure(JSONRenderer(), data, args.repeat)
+            fast, fast_size = measure(FastJSONRenderer(), data, args.repeat)
+            assert size == fast_size
+            print(
+                f"{name}: {len(data)} items, {size} bytes, "
+                f"JSONRenderer {baseline * 1000:.2f} ms, "
+                f"FastJSONRenderer {fast * 1000:.2f} ms "
+                f"({baseline / fast:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
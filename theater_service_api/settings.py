@@ -10,10 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / "subdir".
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "drf_spectacular",
     "user",
@@ -47,11 +49,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -80,11 +84,133 @@ WSGI_APPLICATION = "theater_service_api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite unless DB_ENGINE=postgresql. PostgreSQL connections come from
+# the psycopg 3 pool (DB_POOL=True, the default) or are kept open for
+# DB_CONN_MAX_AGE seconds; Django does not allow both at once.
+
+DB_ENGINE = config("DB_ENGINE", default="sqlite3")
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("POSTGRES_DB"),
+            "USER": config("POSTGRES_USER"),
+            "PASSWORD": config("POSTGRES_PASSWORD"),
+            "HOST": config("POSTGRES_HOST", default="localhost"),
+            "PORT": config("POSTGRES_PORT", default=5432, cast=int),
+            # With the pool: check every connection handed out by it
+            "CONN_HEALTH_CHECKS": config(
+                "DB_CONN_HEALTH_CHECKS", default=True, cast=bool
+            ),
+            "OPTIONS": {},
+        }
+    }
+
+    if config("DB_POOL", default=True, cast=bool):
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            # Seconds a request waits for a free connection
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),
+            "max_idle": config("DB_POOL_MAX_IDLE", default=600, cast=float),
+            "max_lifetime": config(
+                "DB_POOL_MAX_LIFETIME", default=3600, cast=float
+            ),
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = config(
+            "DB_CONN_MAX_AGE", default=60, cast=int
+        )
+
+    # Read replicas, same credentials as the primary
+    for number, host in enumerate(
+        config("POSTGRES_REPLICA_HOSTS", default="", cast=Csv()), start=1
+    ):
+        DATABASES[f"replica_{number}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
     }
+
+# Safe requests read from the replicas (see api/replicas.py)
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+
+DB_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    # "round_robin" or "least_lag"
+    "SELECTION": config("DB_REPLICA_SELECTION", default="round_robin"),
+    # Seconds of replication lag after which a replica is skipped
+    "MAX_LAG": config("DB_REPLICA_MAX_LAG", default=30, cast=int),
+    "LAG_CHECK_INTERVAL": 5,
+    # Seconds a user reads from the primary after writing
+    "STICKY_SECONDS": config("DB_REPLICA_STICKY_SECONDS", default=5, cast=int),
+    "CACHE_ALIAS": config("DB_REPLICA_CACHE", default="default"),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The "catalog" cache keeps serialized genre, actor, play and theatre hall
+# responses. Use django.core.cache.backends.redis.RedisCache in production
+# so that every worker shares it; LRU eviction there comes from the Redis
+# maxmemory-policy.
+
+CATALOG_CACHE_BACKEND = config(
+    "CATALOG_CACHE_BACKEND",
+    default="django.core.cache.backends.locmem.LocMemCache",
+)
+
+# The "state" cache keeps seat holds and token revocations, which are not
+# recomputable: losing a hold frees seats a customer is paying for,
+# losing a revocation lets a revoked access token in again. In
+# production it must be shared by every worker and never evict, ex. a
+# Redis of its own with maxmemory-policy noeviction, where a full memory
+# fails writes loudly.
+# Its local memory default never culls and only suits a single process.
+STATE_CACHE_BACKEND = config(
+    "STATE_CACHE_BACKEND",
+    default="django.core.cache.backends.locmem.LocMemCache",
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        "BACKEND": CATALOG_CACHE_BACKEND,
+        "LOCATION": config("CATALOG_CACHE_LOCATION", default="catalog"),
+        "TIMEOUT": config("CATALOG_CACHE_TTL", default=300, cast=int),
+        "OPTIONS": (
+            {
+                "MAX_ENTRIES": config(
+                    "CATALOG_CACHE_MAX_ENTRIES", default=1000, cast=int
+                )
+            }
+            if CATALOG_CACHE_BACKEND.endswith("LocMemCache")
+            else {}
+        ),
+    },
+    "state": {
+        "BACKEND": STATE_CACHE_BACKEND,
+        "LOCATION": config("STATE_CACHE_LOCATION", default="state"),
+        # Entries set their own expiry
+        "TIMEOUT": None,
+        "OPTIONS": (
+            {"MAX_ENTRIES": sys.maxsize}
+            if STATE_CACHE_BACKEND.endswith("LocMemCache")
+            else {}
+        ),
+    },
 }
 
 
@@ -126,6 +252,19 @@ STATIC_URL = "static/"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+# Posters are stored once per content digest (see api/storage.py)
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "posters": {
+        "BACKEND": "api.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -133,21 +272,108 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "user.User"
 
+# Authenticate from the access token claims without loading the user
+# (see user/authentication.py). Revoked access tokens are kept in
+# AUTH_REVOCATION_CACHE, which every worker must share and which must
+# never evict, so it is off until the "state" cache is configured.
+JWT_STATELESS_AUTH = config(
+    "JWT_STATELESS_AUTH",
+    default=not STATE_CACHE_BACKEND.endswith("LocMemCache"),
+    cast=bool,
+)
+AUTH_REVOCATION_CACHE = config("AUTH_REVOCATION_CACHE", default="state")
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        (
+            "user.authentication.StatelessJWTAuthentication"
+            if JWT_STATELESS_AUTH
+            else "rest_framework_simplejwt.authentication.JWTAuthentication"
+        ),
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle"
+        "api.throttling.AnonSlidingWindowThrottle",
+        "api.throttling.UserSlidingWindowThrottle",
+        "api.throttling.ScopedSlidingWindowThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
-        "anon": "100/day",
-        "user": "1000/day"
+        "anon": config("THROTTLE_RATE_ANON", default="100/day"),
+        "user": config("THROTTLE_RATE_USER", default="1000/day"),
+        # Per endpoint scopes, see throttle_scope(s) of the views
+        "catalog": config("THROTTLE_RATE_CATALOG", default="300/min"),
+        "booking": config("THROTTLE_RATE_BOOKING", default="30/min"),
     }
 }
 
+# Cache shared by the throttle counters of all workers
+THROTTLE_CACHE_ALIAS = config("THROTTLE_CACHE", default="default")
+
+# Seat holds (see api/holds.py). Use api.holds.CacheHoldStore with a
+# shared, non-evicting "state" cache when running more than one worker
+# process.
+SEAT_HOLDS = {
+    "STORE": config("SEAT_HOLD_STORE", default="api.holds.MemoryHoldStore"),
+    "CACHE_ALIAS": config("SEAT_HOLD_CACHE", default="state"),
+    "TTL": config("SEAT_HOLD_TTL", default=300, cast=int),
+    "SWEEP_INTERVAL": 30,
+}
+
+# How concurrent reservations of a performance are serialized
+# (see api/booking.py)
+BOOKING = {
+    "STRATEGY": config("BOOKING_STRATEGY", default="fail_fast"),
+    "SKIP_LOCKED": config("BOOKING_SKIP_LOCKED", default=False, cast=bool),
+    "RETRIES": config("BOOKING_RETRIES", default=3, cast=int),
+    # Answer reservations with 202 and book them in drain_bookings
+    "QUEUED": config("BOOKING_QUEUED", default=False, cast=bool),
+    "QUEUE_BATCH_SIZE": config(
+        "BOOKING_QUEUE_BATCH_SIZE", default=100, cast=int
+    ),
+}
+
+# Build read-only list responses straight from .values() rows
+# (see api/fast_serializers.py)
+API_FAST_SERIALIZERS = config("API_FAST_SERIALIZERS", default=True, cast=bool)
+
+# Rows fetched per round trip by the streaming ticket exports
+# (see api/exports.py)
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Bearer token Prometheus sends to /metrics, closed when empty
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Router prefixes whose list and retrieve are served by async views
+# under ASGI (see api/async_views.py), ex. "performances,plays"
+ASYNC_READ_ROUTES = config("ASYNC_READ_ROUTES", default="", cast=Csv())
+
+# Performance lists by ?date= served from a rendered snapshot of the day
+# (see api/schedule.py)
+SCHEDULE_SNAPSHOTS = {
+    "ENABLED": config("SCHEDULE_SNAPSHOTS", default=True, cast=bool),
+    "AVAILABILITY_STEP": config(
+        "SCHEDULE_AVAILABILITY_STEP", default=1, cast=int
+    ),
+}
+
+# Poster thumbnails built off the request (see api/posters.py). Use
+# api.posters.ProcessPoolQueue to keep image encoding off the web workers.
+POSTER_PIPELINE = {
+    "QUEUE": config("POSTER_QUEUE", default="api.posters.ThreadPoolQueue"),
+    "WORKERS": config("POSTER_WORKERS", default=2, cast=int),
+    "SIZES": {"thumbnail": 320, "medium": 960},
+    "FORMATS": ["webp", "avif"],
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Theater Service API",
     "DESCRIPTION": "Order theatre tickets",
@@ -164,6 +390,12 @@ SPECTACULAR_SETTINGS = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
-    "ROTATE_REFRESH_TOKENS": True
+    "ROTATE_REFRESH_TOKENS": True,
+    "TOKEN_OBTAIN_SERIALIZER": (
+        "user.serializers.ClaimsTokenObtainPairSerializer"
+    ),
+    "TOKEN_REFRESH_SERIALIZER": (
+        "user.serializers.ClaimsTokenRefreshSerializer"
+    ),
 }
 
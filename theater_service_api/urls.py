@@ -24,8 +24,11 @@ from drf_spectacular.views import (
     SpectacularAPIView,
 )
 
+from api.views import MetricsView, serve_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     path("api/", include("api.urls"), name="api"),
     path("", include("user.urls", namespace="user")),
     path("doc/", SpectacularAPIView.as_view(), name="schema"),
@@ -39,4 +42,6 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name="schema"),
         name="redoc"
     )
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(
+    settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
+)
@@ -0,0 +1,106 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the claims the API checks on every request (id,
+email, is_staff), so ``StatelessJWTAuthentication`` builds a token user
+from them without loading the user row. Tokens issued before a user was
+deactivated, deleted, demoted or changed password are rejected, see
+``user.signals``:
+
+* access tokens through a revocation entry in the "state" cache, kept
+  for the access token lifetime. The cache must be shared by every
+  worker and never evict, stateless authentication is off by default
+  until ``STATE_CACHE_BACKEND`` is configured,
+* refresh tokens, which outlive that entry, through
+  ``User.tokens_revoked_at``, read with the user row on refresh.
+"""
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import (
+    JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+# Sub-second issue time, iat alone can not tell whether a token was
+# issued before or after a revocation in the same second
+ISSUED_AT_CLAIM = "iat_precise"
+
+
+def _revocation_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def _revocation_cache():
+    return caches[getattr(settings, "AUTH_REVOCATION_CACHE", "state")]
+
+
+def _issued_at(token):
+    return token.get(ISSUED_AT_CLAIM, token.get("iat", 0))
+
+
+def revoke_tokens(user_id):
+    """Reject the access and refresh tokens of the user issued until now"""
+    revoked_at = time.time()
+    get_user_model().objects.filter(pk=user_id).update(
+        tokens_revoked_at=datetime.fromtimestamp(revoked_at)
+    )
+    # Older access tokens expire on their own after their lifetime
+    timeout = jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    _revocation_cache().set(_revocation_key(user_id), revoked_at, timeout)
+
+
+def is_revoked(user_id, token):
+    """Whether an access token was issued before a revocation"""
+    revoked_at = _revocation_cache().get(_revocation_key(user_id))
+    if revoked_at is None:
+        return False
+    return _issued_at(token) <= revoked_at
+
+
+def is_refresh_revoked(user, token):
+    """Whether a refresh token was issued before a revocation"""
+    if user.tokens_revoked_at is None:
+        return False
+    return _issued_at(token) <= user.tokens_revoked_at.timestamp()
+
+
+def add_claims(token, user):
+    """Claims the stateless authentication reads instead of the user row"""
+    token["email"] = user.email
+    token["is_staff"] = user.is_staff
+    token[ISSUED_AT_CLAIM] = time.time()
+    return token
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    # Never loads the user, see api.metrics
+    queries = 0
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if is_revoked(user.id, validated_token):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        return user
+
+
+def load_user(user):
+    """The user row of a request user, which may be a token user"""
+    user_model = get_user_model()
+    if isinstance(user, user_model):
+        return user
+
+    user = user_model.objects.filter(pk=user.pk).first()
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
@@ -43,6 +43,9 @@ class UserManager(BaseUserManager):
 class User(AbstractUser):
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    # Refresh tokens issued until then are rejected, see
+    # user.authentication.revoke_tokens
+    tokens_revoked_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
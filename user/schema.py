@@ -0,0 +1,7 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Same bearer token scheme as JWTAuthentication in the OpenAPI schema"""
+
+    target_class = "user.authentication.StatelessJWTAuthentication"
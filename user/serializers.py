@@ -1,5 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from user.authentication import add_claims, is_refresh_revoked
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,3 +39,43 @@ class UserSerializer(serializers.ModelSerializer):
             user.save()
 
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh the claims from the user row instead of copying them
+    from the refresh token, inactive users can not refresh
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = (
+            get_user_model()
+            .objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM])
+            .first()
+        )
+        if (
+            user is None
+            or not user.is_active
+            or is_refresh_revoked(user, refresh)
+        ):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        add_claims(refresh, user)
+        data = {"access": str(refresh.access_token)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return data
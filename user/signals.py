@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from user.authentication import revoke_tokens
+
+# Fields embedded in or guarding the access token claims
+AUTH_FIELDS = ("is_active", "is_staff", "password")
+
+
+@receiver(pre_save, sender=get_user_model())
+def detect_auth_change(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._auth_changed = False
+        return
+
+    stored = (
+        sender.objects.filter(pk=instance.pk).values(*AUTH_FIELDS).first()
+    )
+    instance._auth_changed = stored is not None and any(
+        stored[field] != getattr(instance, field) for field in AUTH_FIELDS
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_on_auth_change(sender, instance, **kwargs):
+    if getattr(instance, "_auth_changed", False):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_on_delete(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
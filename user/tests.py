@@ -1,3 +1,122 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.tests.reservation_tests import sample_performance
+from user.authentication import StatelessJWTAuthentication
+
+TOKEN_URL = reverse("user:token_obtain_pair")
+REFRESH_URL = reverse("user:token_refresh")
+ME_URL = reverse("user:manage")
+PERFORMANCE_URL = reverse("api:performance-list")
+RESERVATION_URL = reverse("api:reservation-list")
+
+
+class StatelessJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        # Off by default without a shared "state" cache
+        patcher = mock.patch(
+            "rest_framework.views.APIView.authentication_classes",
+            (StatelessJWTAuthentication,),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches["state"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@theatre.com",
+            "pass24word"
+        )
+        self.tokens = self.obtain_tokens()
+        self.authorize(self.tokens["access"])
+
+    def obtain_tokens(self):
+        response = self.client.post(
+            TOKEN_URL,
+            {"email": "user@theatre.com", "password": "pass24word"},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_reads_do_not_load_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(response.status_code, 200)
+        user_table = get_user_model()._meta.db_table
+        self.assertFalse(
+            any(user_table in query["sql"] for query in queries)
+        )
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(PERFORMANCE_URL).status_code, 401)
+        response = self.client.post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_stays_revoked_after_the_access_lifetime(self):
+        self.user.set_password("new24word")
+        self.user.save()
+        # The access token revocation entry expired
+        caches["state"].clear()
+
+        response = self.client.post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 401)
+
+        tokens = self.client.post(
+            TOKEN_URL,
+            {"email": "user@theatre.com", "password": "new24word"},
+        ).data
+        response = self.client.post(
+            REFRESH_URL, {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_staff_change_revokes_tokens(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(PERFORMANCE_URL).status_code, 401)
+
+        self.authorize(self.obtain_tokens()["access"])
+        response = self.client.post(
+            reverse("api:genre-list"), {"name": "Drama"}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_unrelated_change_keeps_tokens(self):
+        self.user.first_name = "Anna"
+        self.user.save()
+
+        self.assertEqual(self.client.get(PERFORMANCE_URL).status_code, 200)
+
+    def test_me_and_reservation_load_real_user(self):
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.data["email"], "user@theatre.com")
 
-# Create your tests here.
+        performance = sample_performance()
+        response = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": 1, "performance": performance.id}
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.user.reservation_set.count(), 1)